@@ -10,3 +10,41 @@ document.addEventListener('DOMContentLoaded', function () {
     menu.classList.toggle('open');
   });
 });
+
+// Contador da sala de avisos atualizado pelo canal de eventos do servidor.
+document.addEventListener('DOMContentLoaded', function () {
+  const card = document.querySelector('.card.notification[data-stream-url]');
+
+  if (!card || !window.EventSource) return;
+
+  function setCount(total) {
+    let badge = card.querySelector('.notification-count');
+    if (total <= 0) {
+      if (badge) badge.remove();
+      return;
+    }
+    if (!badge) {
+      badge = document.createElement('span');
+      badge.className = 'notification-count';
+      card.prepend(badge);
+    }
+    badge.textContent = total;
+  }
+
+  function currentCount() {
+    const badge = card.querySelector('.notification-count');
+    return badge ? parseInt(badge.textContent, 10) || 0 : 0;
+  }
+
+  const source = new EventSource(card.dataset.streamUrl);
+
+  source.addEventListener('aviso', function () {
+    setCount(currentCount() + 1);
+  });
+  source.addEventListener('notificacao', function (event) {
+    setCount(currentCount() + JSON.parse(event.data).novas);
+  });
+  source.addEventListener('contagem', function (event) {
+    setCount(JSON.parse(event.data).total);
+  });
+});
@@ -163,6 +163,71 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Regra de aprovação usada nos resumos de notas, boletins e exportações.
+# OPTIONS: weights (peso de cada bimestre), min_average e min_attendance
+# (0 a 1, None desliga). Depois de mudar, recalcule os resumos já gravados:
+# manage.py refresh_grade_summaries.
+GRADING_POLICY = {
+    "CLASS": "system.grading.GradingPolicy",
+    "OPTIONS": {
+        "weights": (1, 1, 1, 1),
+        "min_average": 6.0,
+        "min_attendance": None,
+    },
+}
+
+# Armazenamento das chamadas: "rows" (um AttendanceRecord por aluno) ou
+# "bitmap" (roster + bitset de presença na própria Attendance). Para trocar
+# com dados já gravados: manage.py convert_attendance_storage --to <modo>.
+ATTENDANCE_STORAGE = os.getenv("ATTENDANCE_STORAGE", "rows")
+
+# Avisos de faltas (comando send_absence_alerts).
+ABSENCE_ALERTS = {
+    "MAX_ABSENCE_RATE": 0.25,
+    "MAX_STREAK": 3,
+    "MIN_CLASSES": 4,
+}
+
+# Cache compartilhado pelos processos (web e worker); guarda o contador de
+# notificações. Por padrão é uma tabela no próprio banco (criada pela migração
+# 0019); para Redis, CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# e CACHE_LOCATION=redis://host:6379/0.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "sistema_escolar_cache"),
+    }
+}
+
+# Segundos até o contador de notificações não lidas ser recontado no banco.
+UNREAD_COUNT_TTL = 300
+
+# Fila de tarefas em segundo plano (tabela Task, comando run_worker).
+TASK_QUEUE = {
+    "MAX_ATTEMPTS": 3,
+    "RETRY_DELAY": 30,
+    "LOCK_TIMEOUT": 600,
+    "HEARTBEAT": 60,
+}
+
+# Retenção das notificações lidas (comando prune_notifications).
+NOTIFICATION_RETENTION = {
+    "DAYS": 180,
+    "BATCH_SIZE": 1000,
+    "PAUSE": 0.1,
+}
+
+# Eventos em tempo real (system/events.py), servidos pelo ASGI (uvicorn). Com
+# mais de um processo use EVENT_BROKER=postgres, que repassa os eventos entre
+# eles por LISTEN/NOTIFY.
+EVENT_STREAM = {
+    "BROKER": os.getenv("EVENT_BROKER", "memory"),
+    "KEEPALIVE": 15,
+    "MAX_AGE": 300,
+}
+
 JAZZMIN_SETTINGS = {
     "site_title": "Sistema Escolar",
     "show_ui_builder": True,
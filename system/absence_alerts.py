@@ -0,0 +1,200 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from notifications.models import Notification
+
+from .attendance import year_range
+from .models import AbsenceAlert, Attendance, AttendanceRecord, CustomUser, Subject
+from .notifications import build_notification, invalidate_unread_counts
+
+DEFAULT_ABSENCE_ALERTS = {
+    "MAX_ABSENCE_RATE": 0.25,
+    "MAX_STREAK": 3,
+    "MIN_CLASSES": 4,
+}
+
+# Uma passada sobre as chamadas do ano, em linhas e compactas (o roster é
+# expandido com unnest e a presença lida com get_bit). As sequências de
+# faltas saem da diferença entre dois ROW_NUMBER (ilhas de chamadas
+# consecutivas com o mesmo valor de present); depois tudo é agregado por
+# aluno e matéria. A sequência é a atual: a última ilha, se for de faltas.
+ABSENCE_STATS_SQL = """
+WITH sessions AS (
+    SELECT r.student_id, a.subject_id, a.date, a.id AS attendance_id, r.present
+    FROM {record} r
+    JOIN {attendance} a ON a.id = r.attendance_id
+    WHERE a.date >= %(start)s AND a.date < %(end)s
+    UNION ALL
+    SELECT
+        s.student_id,
+        a.subject_id,
+        a.date,
+        a.id,
+        get_bit(a.presence, (s.position - 1)::int) = 1
+    FROM {attendance} a
+    CROSS JOIN LATERAL unnest(a.roster) WITH ORDINALITY AS s(student_id, position)
+    WHERE a.presence IS NOT NULL AND a.date >= %(start)s AND a.date < %(end)s
+),
+marked AS (
+    SELECT
+        student_id,
+        subject_id,
+        present,
+        ROW_NUMBER() OVER (
+            PARTITION BY student_id, subject_id ORDER BY date, attendance_id
+        ) AS position,
+        ROW_NUMBER() OVER (
+            PARTITION BY student_id, subject_id ORDER BY date, attendance_id
+        ) - ROW_NUMBER() OVER (
+            PARTITION BY student_id, subject_id, present
+            ORDER BY date, attendance_id
+        ) AS island
+    FROM sessions
+),
+islands AS (
+    SELECT student_id, subject_id, present, COUNT(*) AS size, MAX(position) AS last
+    FROM marked
+    GROUP BY student_id, subject_id, present, island
+)
+SELECT
+    student_id,
+    subject_id,
+    SUM(size) AS classes,
+    COALESCE(SUM(size) FILTER (WHERE NOT present), 0) AS absences,
+    (ARRAY_AGG(CASE WHEN present THEN 0 ELSE size END ORDER BY last DESC))[1]
+        AS streak
+FROM islands
+GROUP BY student_id, subject_id
+"""
+
+
+def absence_alert_settings() -> dict:
+    return {**DEFAULT_ABSENCE_ALERTS, **getattr(settings, "ABSENCE_ALERTS", {})}
+
+
+def absence_stats(year: int):
+    """Gera (aluno, matéria, aulas, faltas, faltas seguidas até a última aula) do ano."""
+    sql = ABSENCE_STATS_SQL.format(
+        record=connection.ops.quote_name(AttendanceRecord._meta.db_table),
+        attendance=connection.ops.quote_name(Attendance._meta.db_table),
+    )
+    with connection.cursor() as cursor:
+        start, end = year_range(year)
+        cursor.execute(sql, {"start": start, "end": end})
+        yield from cursor
+
+
+def find_crossings(year: int, max_rate=None, max_streak=None, min_classes=None):
+    """
+    Alunos acima do limite em cada matéria: {(aluno, matéria, tipo): valor}.
+    A taxa de faltas só conta a partir de min_classes aulas registradas.
+    """
+    config = absence_alert_settings()
+    max_rate = config["MAX_ABSENCE_RATE"] if max_rate is None else max_rate
+    max_streak = config["MAX_STREAK"] if max_streak is None else max_streak
+    min_classes = config["MIN_CLASSES"] if min_classes is None else min_classes
+
+    crossings = {}
+    for student_id, subject_id, classes, absences, streak in absence_stats(year):
+        # SUM de bigint volta como numeric (Decimal) no Postgres
+        classes, absences = int(classes), int(absences)
+        rate = absences / classes
+        if classes >= min_classes and rate > max_rate:
+            crossings[(student_id, subject_id, AbsenceAlert.RATE)] = rate
+        if max_streak and streak >= max_streak:
+            crossings[(student_id, subject_id, AbsenceAlert.STREAK)] = streak
+    return crossings
+
+
+def _messages(kind, value, student, subject):
+    if kind == AbsenceAlert.RATE:
+        detail = f"{value:.0%} de faltas em {subject.name}"
+    else:
+        detail = f"{int(value)} faltas seguidas em {subject.name}"
+    return (
+        f"Você está com {detail}. Procure a coordenação.",
+        f"{student.first_name} {student.last_name} está com {detail}.",
+    )
+
+
+def send_absence_alerts(year: int, **limits) -> dict:
+    """
+    Calcula os limites de faltas de todos os alunos e avisa aluno e
+    professores da matéria apenas nos cruzamentos novos, com as
+    notificações inseridas em lote. Avisos de quem voltou ao limite são
+    apagados para que um novo cruzamento gere novo aviso.
+    """
+    crossings = find_crossings(year, **limits)
+    existing = set(
+        AbsenceAlert.objects.filter(year=year).values_list(
+            "student_id", "subject_id", "kind"
+        )
+    )
+    new = {key: value for key, value in crossings.items() if key not in existing}
+    resolved = existing - crossings.keys()
+
+    if not new:
+        _delete_alerts(year, resolved)
+        return {"alerts": 0, "notifications": 0, "resolved": len(resolved)}
+
+    subjects = Subject.objects.in_bulk({k[1] for k in new})
+    # o aviso sai em nome de quem fez a última chamada da matéria no ano
+    start, end = year_range(year)
+    responsible = dict(
+        Attendance.objects.filter(
+            subject_id__in=subjects, date__gte=start, date__lt=end
+        )
+        .order_by("subject_id", "-date", "-id")
+        .distinct("subject_id")
+        .values_list("subject_id", "teacher_id")
+    )
+    users = CustomUser.objects.in_bulk({k[0] for k in new} | set(responsible.values()))
+    teachers = {}
+    for subject_id, teacher_id in Subject.teachers.through.objects.filter(
+        subject_id__in=subjects
+    ).values_list("subject_id", "customuser_id"):
+        teachers.setdefault(subject_id, []).append(teacher_id)
+
+    alerts, notifications = [], []
+    for (student_id, subject_id, kind), value in new.items():
+        student, subject = users[student_id], subjects[subject_id]
+        actor = users[responsible[subject_id]]
+        alerts.append(
+            AbsenceAlert(
+                student=student, subject=subject, year=year, kind=kind, value=value
+            )
+        )
+        to_student, to_teacher = _messages(kind, value, student, subject)
+        verb = "Limite de faltas ultrapassado"
+        notifications.append(
+            build_notification(
+                student_id, actor, verb, to_student, target=subject, level="warning"
+            )
+        )
+        notifications.extend(
+            build_notification(
+                teacher_id, actor, verb, to_teacher, target=subject, level="warning"
+            )
+            for teacher_id in teachers.get(subject_id, [])
+        )
+
+    with transaction.atomic():
+        _delete_alerts(year, resolved)
+        AbsenceAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+        Notification.objects.bulk_create(notifications, batch_size=1000)
+        invalidate_unread_counts(n.recipient_id for n in notifications)
+
+    return {
+        "alerts": len(alerts),
+        "notifications": len(notifications),
+        "resolved": len(resolved),
+    }
+
+
+def _delete_alerts(year, keys):
+    if not keys:
+        return
+    key_filter = Q()
+    for student_id, subject_id, kind in keys:
+        key_filter |= Q(student_id=student_id, subject_id=subject_id, kind=kind)
+    AbsenceAlert.objects.filter(key_filter, year=year).delete()
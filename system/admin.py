@@ -1,15 +1,23 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
+from django.shortcuts import redirect, render
+from django.urls import path
+from django.utils import timezone
 
+from .forms import GradeImportForm
+from .grade_import import GradeImportError, import_grades
 from .models import (
+    Announcement,
     Attendance,
     AttendanceRecord,
     Bimonthly,
     CustomUser,
     Grade,
     Subject,
+    Task,
     Team,
 )
+from .tasks import enqueue
 
 
 @admin.register(CustomUser)
@@ -79,6 +87,36 @@ class CustomUserAdmin(UserAdmin):
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
     list_display = ("name", "year")
+    actions = ["gerar_boletins"]
+
+    @admin.action(description="Gerar boletins do último bimestre")
+    def gerar_boletins(self, request, queryset):
+        queued = 0
+        # anos num set: o DISTINCT levaria junto a ordenação da listagem
+        # (-pk) e repetiria o ano para cada turma
+        for year in sorted(set(queryset.values_list("year", flat=True))):
+            teams = queryset.filter(year=year)
+            bimonthly = (
+                Bimonthly.objects.filter(year=year, grade__team__in=teams)
+                .order_by("-number")
+                .values_list("number", flat=True)
+                .first()
+            )
+            if bimonthly is None:
+                messages.warning(request, f"Nenhuma nota lançada em {year}.")
+                continue
+            # gerados pelo worker (run_worker), fora da requisição
+            enqueue(
+                "generate_report_cards",
+                team_ids=list(teams.values_list("id", flat=True)),
+                year=year,
+                bimonthly=bimonthly,
+            )
+            queued += teams.count()
+        if queued:
+            messages.success(
+                request, f"Boletins de {queued} turma(s) na fila de geração."
+            )
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -149,11 +187,66 @@ class GradeAdmin(admin.ModelAdmin):
 
     ordering = ("bimonthly__year", "bimonthly__number", "team__name")
 
+    change_list_template = "admin/system/grade/change_list.html"
+
+    # Quantos erros de importação são exibidos na tela.
+    IMPORT_ERRORS_SHOWN = 20
+
     def student_name(self, obj):
         return f"{obj.student.first_name} {obj.student.last_name}"
 
     student_name.short_description = "Aluno"
 
+    def get_urls(self):
+        urls = [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="system_grade_import",
+            )
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect("admin:system_grade_changelist")
+
+        form = GradeImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            errors = []
+
+            def on_error(line, message):
+                if len(errors) < self.IMPORT_ERRORS_SHOWN:
+                    errors.append(f"Linha {line}: {message}")
+
+            file = form.cleaned_data["file"]
+            try:
+                result = import_grades(
+                    file,
+                    file.name,
+                    batch_size=form.cleaned_data["batch_size"],
+                    on_error=on_error,
+                )
+            except GradeImportError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(
+                    request,
+                    f"{result['created']} notas criadas, {result['updated']} "
+                    f"atualizadas, {result['errors']} linhas com erro.",
+                )
+                for error in errors:
+                    messages.warning(request, error)
+                return redirect("admin:system_grade_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "form": form,
+            "title": "Importar notas",
+        }
+        return render(request, "admin/system/grade/import_grades.html", context)
+
 
 class AttendanceRecordInline(admin.TabularInline):
     model = AttendanceRecord
@@ -168,6 +261,55 @@ class AttendanceAdmin(admin.ModelAdmin):
     list_filter = ("team", "subject", "teacher")
     date_hierarchy = "date"
     inlines = [AttendanceRecordInline]
+    # roster e bitset andam juntos; a chamada compacta é só leitura aqui
+    exclude = ("roster",)
+    readonly_fields = ("presencas",)
+
+    def get_inlines(self, request, obj):
+        if obj and obj.is_compact:
+            return []
+        return super().get_inlines(request, obj)
+
+    @admin.display(description="Presenças (armazenamento compacto)")
+    def presencas(self, obj):
+        if not obj or not obj.is_compact:
+            return "-"
+
+        presence = obj.presence_map()
+        names = {
+            pk: f"{first_name} {last_name}"
+            for pk, first_name, last_name in CustomUser.objects.filter(
+                id__in=presence
+            ).values_list("id", "first_name", "last_name")
+        }
+        absent = sorted(names.get(pk, str(pk)) for pk, p in presence.items() if not p)
+        return (
+            f"{len(presence) - len(absent)} presentes de {len(presence)}. "
+            f"Faltaram: {', '.join(absent) or 'ninguém'}."
+        )
 
 
 admin.site.register(Bimonthly)
+
+
+@admin.register(Announcement)
+class AnnouncementAdmin(admin.ModelAdmin):
+    list_display = ("title", "author", "created_at")
+    list_filter = ("teams",)
+    filter_horizontal = ("teams",)
+    date_hierarchy = "created_at"
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "run_after", "locked_by")
+    list_filter = ("status", "name")
+    readonly_fields = ("locked_by", "locked_at", "last_error", "finished_at")
+    actions = ["tentar_de_novo"]
+
+    @admin.action(description="Colocar de volta na fila")
+    def tentar_de_novo(self, request, queryset):
+        total = queryset.filter(status=Task.FAILED).update(
+            status=Task.PENDING, attempts=0, run_after=timezone.now()
+        )
+        messages.success(request, f"{total} tarefa(s) de volta na fila.")
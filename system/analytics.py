@@ -0,0 +1,91 @@
+import numpy as np
+
+from .grading import BIMONTHLYS_PER_YEAR, get_grading_policy
+from .models import AttendanceSummary, Grade
+
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAM_BINS = 10
+
+
+def _round(value):
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+
+def class_analytics(team, subject, year: int) -> dict:
+    """
+    Estatísticas de uma turma/matéria/ano calculadas com operações vetoriais
+    sobre todas as notas, buscadas em uma única consulta colunar.
+    """
+    rows = Grade.objects.filter(
+        team=team,
+        subject=subject,
+        bimonthly__year=year,
+        average__isnull=False,
+    ).values_list("student_id", "bimonthly__number", "average")
+
+    data = np.array(list(rows), dtype=float).reshape(-1, 3)
+    students, numbers, averages = data[:, 0], data[:, 1].astype(int), data[:, 2]
+
+    # Matriz aluno x bimestre montada por indexação, avaliada pela política.
+    student_keys, student_index = np.unique(students, return_inverse=True)
+    matrix = np.full((student_keys.size, BIMONTHLYS_PER_YEAR), np.nan)
+    matrix[student_index, numbers - 1] = averages
+    # aprovação com a mesma frequência anual do GradeSummary e do diário
+    policy = get_grading_policy()
+    attendance = None
+    if policy.min_attendance is not None:
+        rates = AttendanceSummary.objects.yearly_rates(
+            (int(student_id), subject.id, year) for student_id in student_keys
+        )
+        attendance = [
+            rates.get((int(student_id), subject.id, year), np.nan)
+            for student_id in student_keys
+        ]
+    result = policy.evaluate(matrix, attendance)
+    student_averages = result.average
+
+    size = BIMONTHLYS_PER_YEAR + 1
+    bimonthly_totals = np.bincount(numbers, weights=averages, minlength=size)[1:]
+    bimonthly_counts = np.bincount(numbers, minlength=size)[1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bimonthly_means = bimonthly_totals / bimonthly_counts
+
+    histogram, edges = np.histogram(
+        student_averages, bins=HISTOGRAM_BINS, range=(0.0, 10.0)
+    )
+
+    has_data = student_averages.size > 0
+    percentiles = (
+        np.percentile(student_averages, PERCENTILES)
+        if has_data
+        else [None] * len(PERCENTILES)
+    )
+
+    return {
+        "team": team.id,
+        "subject": subject.id,
+        "year": year,
+        "students": int(student_averages.size),
+        "grades": int(averages.size),
+        "mean": _round(student_averages.mean()) if has_data else None,
+        "median": _round(np.median(student_averages)) if has_data else None,
+        "std": _round(student_averages.std()) if has_data else None,
+        "min": _round(student_averages.min()) if has_data else None,
+        "max": _round(student_averages.max()) if has_data else None,
+        "percentiles": {str(p): _round(v) for p, v in zip(PERCENTILES, percentiles)},
+        "approval_rate": _round(result.approved.mean()) if has_data else None,
+        "histogram": [
+            {"start": _round(start), "end": _round(end), "count": int(count)}
+            for start, end, count in zip(edges[:-1], edges[1:], histogram)
+        ],
+        "bimonthlys": [
+            {
+                "number": number,
+                "mean": _round(mean) if count else None,
+                "count": int(count),
+            }
+            for number, (mean, count) in enumerate(
+                zip(bimonthly_means, bimonthly_counts), start=1
+            )
+        ],
+    }
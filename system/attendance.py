@@ -0,0 +1,166 @@
+import datetime
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Sum
+
+from .bitmaps import pack_roll_call, unpack_roll_call
+from .models import (
+    Attendance,
+    AttendanceRecord,
+    AttendanceSummary,
+    suspend_summary_refresh,
+)
+
+ROWS = "rows"
+BITMAP = "bitmap"
+
+
+def year_range(year: int):
+    """Intervalo [1º de janeiro, 1º de janeiro seguinte) para filtrar datas."""
+    return datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+
+
+def attendance_rates(year: int, student_ids) -> dict:
+    """
+    Frequência (0 a 1) por (aluno, matéria) dos alunos informados, somada a
+    partir do resumo mensal, que já cobre os dois tipos de armazenamento.
+    """
+    start, end = year_range(year)
+    rows = (
+        AttendanceSummary.objects.filter(
+            student_id__in=student_ids, month__gte=start, month__lt=end
+        )
+        .values_list("student_id", "subject_id")
+        .annotate(presences=Sum("presences"), absences=Sum("absences"))
+    )
+    return {
+        (student_id, subject_id): presences / (presences + absences)
+        for student_id, subject_id, presences, absences in rows
+        if presences + absences
+    }
+
+
+def attendance_storage() -> str:
+    """Armazenamento das chamadas novas: "rows" (padrão) ou "bitmap"."""
+    return getattr(settings, "ATTENDANCE_STORAGE", ROWS)
+
+
+def save_roll_calls(roll_calls: dict) -> None:
+    """
+    Grava chamadas {Attendance: {aluno: presente}} em uma transação e num
+    número fixo de consultas, qualquer que seja o tamanho do lote.
+
+    Chamadas compactas continuam compactas. No modo "bitmap", chamadas
+    ainda em linhas são convertidas ao serem gravadas de novo.
+    """
+    bitmap = attendance_storage() == BITMAP
+    compact = {a: p for a, p in roll_calls.items() if bitmap or a.is_compact}
+
+    with transaction.atomic():
+        rows = [
+            AttendanceRecord(attendance=attendance, student_id=student_id, present=p)
+            for attendance, presence in roll_calls.items()
+            if attendance not in compact
+            for student_id, p in presence.items()
+        ]
+        if rows:
+            AttendanceRecord.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["attendance", "student"],
+                update_fields=["present"],
+            )
+        if compact:
+            _save_compact(compact)
+
+
+def _save_compact(roll_calls: dict) -> None:
+    # linhas antigas das chamadas que estão virando compactas entram na mescla
+    legacy = AttendanceRecord.objects.filter(
+        attendance__in=[a for a in roll_calls if not a.is_compact]
+    )
+    previous = {}
+    for attendance_id, student_id, present in legacy.values_list(
+        "attendance_id", "student_id", "present"
+    ):
+        previous.setdefault(attendance_id, {})[student_id] = present
+
+    keys = set()
+    for attendance, presence in roll_calls.items():
+        current = (
+            attendance.presence_map()
+            if attendance.is_compact
+            else previous.get(attendance.pk, {})
+        )
+        merged = {**current, **presence}
+        attendance.roster, attendance.presence = pack_roll_call(merged)
+        month = attendance.date.replace(day=1)
+        keys.update((student_id, attendance.subject_id, month) for student_id in merged)
+
+    Attendance.objects.bulk_update(list(roll_calls), ["roster", "presence"])
+    if previous:
+        legacy.delete()
+    AttendanceSummary.objects.refresh(keys)
+
+
+def convert_attendances(to: str, batch_size: int = 500, progress=None) -> int:
+    """
+    Converte as chamadas já gravadas para o armazenamento informado, em
+    lotes com uma transação cada. Presenças e faltas não mudam, então o
+    resumo mensal não precisa ser recalculado. Devolve quantas chamadas
+    foram convertidas.
+    """
+    if to == BITMAP:
+        pending = Attendance.objects.filter(
+            presence__isnull=True, records__isnull=False
+        )
+    else:
+        pending = Attendance.objects.filter(presence__isnull=False)
+    pending = pending.distinct().order_by("pk")
+
+    converted, last_pk = 0, 0
+    while batch := list(pending.filter(pk__gt=last_pk)[:batch_size]):
+        last_pk = batch[-1].pk
+        with transaction.atomic(), suspend_summary_refresh():
+            if to == BITMAP:
+                _to_bitmap(batch)
+            else:
+                _to_rows(batch)
+        converted += len(batch)
+        if progress:
+            progress(converted)
+    return converted
+
+
+def _to_bitmap(attendances):
+    presence = {}
+    records = AttendanceRecord.objects.filter(attendance__in=attendances)
+    for attendance_id, student_id, present in records.values_list(
+        "attendance_id", "student_id", "present"
+    ):
+        presence.setdefault(attendance_id, {})[student_id] = present
+
+    for attendance in attendances:
+        attendance.roster, attendance.presence = pack_roll_call(
+            presence.get(attendance.pk, {})
+        )
+    Attendance.objects.bulk_update(attendances, ["roster", "presence"])
+    # delete do QuerySet base: o resumo não muda, não há o que recalcular
+    models.QuerySet.delete(records)
+
+
+def _to_rows(attendances):
+    AttendanceRecord.objects.bulk_create(
+        [
+            AttendanceRecord(attendance=attendance, student_id=student_id, present=p)
+            for attendance in attendances
+            for student_id, p in unpack_roll_call(
+                attendance.roster, attendance.presence
+            ).items()
+        ],
+        ignore_conflicts=True,
+    )
+    for attendance in attendances:
+        attendance.roster, attendance.presence = [], None
+    Attendance.objects.bulk_update(attendances, ["roster", "presence"])
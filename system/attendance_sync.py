@@ -0,0 +1,186 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Q
+
+from .attendance import save_roll_calls
+from .models import Attendance, AttendanceSync, CustomUser, Subject, Team
+
+MAX_SYNC_ITEMS = 100
+
+
+class AttendanceSyncError(Exception):
+    pass
+
+
+def _parse_item(item):
+    """Valida uma chamada do lote; devolve (chave, turma, matéria, data, registros)."""
+    if not isinstance(item, dict):
+        raise AttendanceSyncError("Cada chamada deve ser um objeto.")
+
+    key = str(item.get("key") or "").strip()
+    if not key or len(key) > 64:
+        raise AttendanceSyncError("Chave de idempotência ausente ou maior que 64.")
+
+    try:
+        team_id = int(item["team"])
+        subject_id = int(item["subject"])
+        date = datetime.date.fromisoformat(item["date"])
+        records = {
+            int(record["student"]): record["present"] for record in item["records"]
+        }
+    except (KeyError, TypeError, ValueError):
+        raise AttendanceSyncError(
+            "Campos team, subject, date (AAAA-MM-DD) e records são obrigatórios."
+        )
+
+    # bool("false") seria True: só aceita o booleano do JSON
+    if not all(isinstance(present, bool) for present in records.values()):
+        raise AttendanceSyncError("O campo present deve ser true ou false.")
+
+    if date > datetime.date.today():
+        raise AttendanceSyncError("A data da chamada não pode estar no futuro.")
+    if not records:
+        raise AttendanceSyncError("A chamada não tem alunos.")
+    return key, team_id, subject_id, date, records
+
+
+def sync_roll_calls(teacher, items) -> list:
+    """
+    Aplica um lote de chamadas feitas offline em uma transação, com
+    consultas em lote: chamadas existentes, permissões e matrículas são
+    buscadas de uma vez e as presenças gravadas juntas (save_roll_calls).
+
+    Cada item leva uma chave gerada no tablet; chaves já sincronizadas
+    devolvem "duplicate" sem reaplicar. Devolve um resultado por item,
+    na ordem recebida.
+    """
+    if not isinstance(items, list):
+        raise AttendanceSyncError("O corpo deve ter uma lista 'items'.")
+    if len(items) > MAX_SYNC_ITEMS:
+        raise AttendanceSyncError(f"Envie no máximo {MAX_SYNC_ITEMS} chamadas.")
+
+    results = [None] * len(items)
+    parsed = {}
+    for i, item in enumerate(items):
+        try:
+            parsed[i] = _parse_item(item)
+        except AttendanceSyncError as e:
+            key = item.get("key") if isinstance(item, dict) else None
+            results[i] = {"key": key, "error": str(e)}
+    if not parsed:
+        return results
+
+    with transaction.atomic():
+        # reenvios simultâneos do mesmo professor esperam aqui e, depois,
+        # encontram as chaves já gravadas pelo primeiro
+        list(
+            CustomUser.objects.select_for_update()
+            .filter(pk=teacher.pk)
+            .values_list("pk", flat=True)
+        )
+        synced = dict(
+            AttendanceSync.objects.filter(
+                teacher=teacher, key__in=[p[0] for p in parsed.values()]
+            ).values_list("key", "attendance_id")
+        )
+        pending = _classify(teacher, parsed, synced, results)
+        if not pending:
+            return results
+
+        attendances = _attendances_for(teacher, {p[1] for p in pending.values()})
+
+        roll_calls = {}
+        for key, session, session_records in pending.values():
+            # mesma chamada em itens diferentes: vale o último item
+            roll_calls.setdefault(attendances[session], {}).update(session_records)
+        save_roll_calls(roll_calls)
+
+        AttendanceSync.objects.bulk_create(
+            [
+                AttendanceSync(
+                    teacher=teacher, key=key, attendance=attendances[session]
+                )
+                for key, session, _ in pending.values()
+            ]
+        )
+
+    for i, (key, session, session_records) in pending.items():
+        results[i] = {
+            "key": key,
+            "status": "created",
+            "attendance": attendances[session].pk,
+            "records": len(session_records),
+        }
+    return results
+
+
+def _classify(teacher, parsed, synced, results) -> dict:
+    """
+    Preenche em results os itens já sincronizados ou recusados e devolve
+    os que devem ser gravados: {índice: (chave, (turma, matéria, data), registros)}.
+    Permissões e matrículas são buscadas de uma vez para o lote todo.
+    """
+    allowed = set(
+        Subject.team.through.objects.filter(
+            subject_id__in={p[2] for p in parsed.values()}
+        ).values_list("team_id", "subject_id")
+    )
+    if not teacher.is_superuser:
+        taught = set(
+            Subject.teachers.through.objects.filter(customuser=teacher).values_list(
+                "subject_id", flat=True
+            )
+        )
+        allowed = {pair for pair in allowed if pair[1] in taught}
+
+    members = set(
+        Team.members.through.objects.filter(
+            team_id__in={p[1] for p in parsed.values()}
+        ).values_list("team_id", "customuser_id")
+    )
+
+    pending, pending_keys = {}, set()
+    for i, (key, team_id, subject_id, date, records) in parsed.items():
+        if key in synced:
+            results[i] = {
+                "key": key,
+                "status": "duplicate",
+                "attendance": synced[key],
+            }
+        elif (team_id, subject_id) not in allowed:
+            results[i] = {"key": key, "error": "Turma ou matéria não permitida."}
+        elif outsiders := [s for s in records if (team_id, s) not in members]:
+            results[i] = {
+                "key": key,
+                "error": f"Alunos fora da turma: {', '.join(map(str, outsiders))}.",
+            }
+        elif key in pending_keys:
+            results[i] = {"key": key, "error": "Chave repetida no lote."}
+        else:
+            pending[i] = (key, (team_id, subject_id, date), records)
+            pending_keys.add(key)
+    return pending
+
+
+def _attendances_for(teacher, sessions) -> dict:
+    """
+    Chamadas do professor para cada (turma, matéria, data), criando em lote
+    as que faltam. Devolve {(turma, matéria, data): chamada}.
+    """
+    session_filter = Q()
+    for team_id, subject_id, date in sessions:
+        session_filter |= Q(team_id=team_id, subject_id=subject_id, date=date)
+    existing = Attendance.objects.filter(session_filter, teacher=teacher)
+
+    # a chamada do dia é única (unique_attendance_session): se fazer_chamada
+    # criar a mesma ao mesmo tempo, o conflito é ignorado e a releitura a acha
+    Attendance.objects.bulk_create(
+        [
+            Attendance(teacher=teacher, team_id=t, subject_id=s, date=d)
+            for t, s, d in sessions
+            - set(existing.values_list("team_id", "subject_id", "date"))
+        ],
+        ignore_conflicts=True,
+    )
+    return {(a.team_id, a.subject_id, a.date): a for a in existing.all()}
@@ -0,0 +1,27 @@
+import numpy as np
+
+# Bit i guarda a presença do i-ésimo aluno do roster. A ordem dos bits dentro
+# de cada byte é a do get_bit do Postgres (bit 0 = menos significativo), para
+# que o banco consiga ler o mesmo valor nas consultas agregadas.
+
+
+def pack_presence(flags) -> bytes:
+    return np.packbits(np.asarray(flags, dtype=bool), bitorder="little").tobytes()
+
+
+def unpack_presence(data, size: int) -> list:
+    bits = np.unpackbits(
+        np.frombuffer(bytes(data), dtype=np.uint8), count=size, bitorder="little"
+    )
+    return bits.astype(bool).tolist()
+
+
+def pack_roll_call(presence: dict):
+    """{aluno: presente} -> (roster ordenado, bitset)."""
+    roster = sorted(presence)
+    return roster, pack_presence([presence[student_id] for student_id in roster])
+
+
+def unpack_roll_call(roster, data) -> dict:
+    """(roster, bitset) -> {aluno: presente}."""
+    return dict(zip(roster, unpack_presence(data, len(roster))))
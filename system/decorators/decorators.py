@@ -74,3 +74,25 @@ def professor_required(view_func):
         return view_func(request, *args, **kwargs)
 
     return wrapper
+
+
+def staff_required(view_func):
+    """
+    Restringe o acesso à equipe da escola (is_staff ou superuser).
+    Usado nas exportações de dados.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        user = request.user
+
+        if not (user.is_staff or user.is_superuser):
+            logger.warning(f"Usuário sem permissão tentou acessar: {request.path}")
+            return redirect(
+                "acesso_negado",
+                mensagem="Apenas a coordenação tem acesso a esta página.",
+            )
+
+        return view_func(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,201 @@
+"""
+Eventos em tempo real para o navegador (Server-Sent Events).
+
+publish() entrega um evento a todas as conexões abertas que assinam um dos
+canais ("turma:<id>" e "usuario:<id>"); a view stream_notifications assina
+os canais do aluno e repassa os eventos. Com um processo só basta o broker
+em memória; com vários workers ASGI o broker "postgres" usa LISTEN/NOTIFY
+do próprio banco para levar o evento a todos os processos.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import select
+import threading
+import time
+
+import psycopg2
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_STREAM = {
+    # "memory" (um processo) ou "postgres" (vários workers)
+    "BROKER": "memory",
+    # comentário enviado quando nada acontece, para proxies não cortarem
+    "KEEPALIVE": 15,
+    # a conexão é encerrada depois disso e o navegador reconecta sozinho;
+    # limita assinaturas de clientes que sumiram sem avisar
+    "MAX_AGE": 300,
+    # eventos acumulados por conexão lenta antes de descartar
+    "QUEUE_SIZE": 100,
+}
+
+PG_CHANNEL = "sistema_escolar_eventos"
+# NOTIFY aceita até 8000 bytes; canais demais são divididos em mais de um
+PG_CHANNELS_PER_NOTIFY = 200
+
+
+def event_stream_settings() -> dict:
+    return {**DEFAULT_EVENT_STREAM, **getattr(settings, "EVENT_STREAM", {})}
+
+
+def team_channel(team_id) -> str:
+    return f"turma:{team_id}"
+
+
+def user_channel(user_id) -> str:
+    return f"usuario:{user_id}"
+
+
+class InProcessBroker:
+    """
+    Pub/sub dentro do processo. Cada assinatura é uma asyncio.Queue no loop
+    de quem assinou; publish() pode ser chamado de qualquer thread (as views
+    síncronas rodam fora do loop) e entrega com call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channels):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=event_stream_settings()["QUEUE_SIZE"])
+        subscription = (loop, queue)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                for channel in channels:
+                    subscribers = self._subscribers.get(channel)
+                    if subscribers is not None:
+                        subscribers.discard(subscription)
+                        if not subscribers:
+                            del self._subscribers[channel]
+
+    def publish(self, channels, event: dict) -> None:
+        self.deliver(channels, event)
+
+    def deliver(self, channels, event: dict) -> None:
+        with self._lock:
+            # quem assina mais de um dos canais recebe o evento uma vez só
+            targets = {
+                subscription
+                for channel in channels
+                for subscription in self._subscribers.get(channel, ())
+            }
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_put, queue, event)
+            except RuntimeError:
+                # loop já encerrado; a assinatura sai no finally de subscribe
+                pass
+
+
+def _put(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        logger.warning("Conexão de eventos lenta; evento descartado.")
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Para vários processos: publish() faz NOTIFY e cada processo que tem
+    assinantes mantém uma thread em LISTEN que repassa ao pub/sub local.
+    O NOTIFY só é entregue quando a transação de quem publicou confirma.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channels):
+        self._ensure_listener()
+        async with super().subscribe(channels) as queue:
+            yield queue
+
+    def publish(self, channels, event: dict) -> None:
+        channels = list(channels)
+        with connection.cursor() as cursor:
+            for start in range(0, len(channels), PG_CHANNELS_PER_NOTIFY):
+                payload = json.dumps(
+                    {
+                        "channels": channels[start : start + PG_CHANNELS_PER_NOTIFY],
+                        "event": event,
+                    }
+                )
+                cursor.execute("SELECT pg_notify(%s, %s)", [PG_CHANNEL, payload])
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="eventos-listen", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_once()
+            except psycopg2.Error:
+                logger.exception("Conexão LISTEN caiu; reconectando.")
+                time.sleep(1)
+
+    def _listen_once(self):
+        conn = psycopg2.connect(**connection.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {PG_CHANNEL}")
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    message = json.loads(conn.notifies.pop(0).payload)
+                    self.deliver(message["channels"], message["event"])
+        finally:
+            conn.close()
+
+
+BROKERS = {"memory": InProcessBroker, "postgres": PostgresBroker}
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = BROKERS[event_stream_settings()["BROKER"]]()
+    return _broker
+
+
+def publish(channels, kind: str, data: dict) -> None:
+    """
+    Publica o evento `kind` nos canais quando a transação atual confirmar;
+    fora de transação, na hora.
+    """
+    channels = list(channels)
+    if not channels:
+        return
+    event = {"type": kind, "data": data}
+    transaction.on_commit(lambda: get_broker().publish(channels, event))
+
+
+def format_event(event: dict, event_id=None) -> str:
+    """Mensagem no formato text/event-stream."""
+    lines = [f"event: {event['type']}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(event['data'])}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,267 @@
+import csv
+from itertools import islice
+
+import numpy as np
+from asgiref.sync import sync_to_async
+
+from .attendance import attendance_rates, year_range
+from .bitmaps import unpack_roll_call
+from .grading import get_grading_policy
+from .models import (
+    Attendance,
+    AttendanceRecord,
+    CustomUser,
+    FinalResult,
+    Grade,
+    GradeSummary,
+    YearClosing,
+)
+
+# Linhas buscadas por vez no cursor do servidor.
+EXPORT_CHUNK_SIZE = 2000
+# Chamadas compactas por vez (cada uma expande para a turma inteira).
+COMPACT_CHUNK_SIZE = 200
+
+GRADE_HEADER = [
+    "matricula",
+    "nome",
+    "sobrenome",
+    "turma",
+    "ano",
+    "materia",
+    "bimestre",
+    "nota_atividade",
+    "nota_avaliacao",
+    "media",
+    "data_lancamento",
+]
+
+ATTENDANCE_HEADER = [
+    "data",
+    "turma",
+    "materia",
+    "professor",
+    "matricula",
+    "nome",
+    "sobrenome",
+    "presente",
+]
+
+
+RESULT_HEADER = [
+    "matricula",
+    "nome",
+    "sobrenome",
+    "turma",
+    "ano",
+    "materia",
+    "notas_lancadas",
+    "media_final",
+    "frequencia",
+    "situacao",
+]
+
+
+class Echo:
+    """Pseudo-buffer: o csv.writer devolve a linha em vez de guardá-la."""
+
+    def write(self, value):
+        return value
+
+
+def grade_rows(year=None, team_id=None, subject_id=None):
+    qs = Grade.objects.all()
+    if year:
+        qs = qs.filter(bimonthly__year=year)
+    if team_id:
+        qs = qs.filter(team_id=team_id)
+    if subject_id:
+        qs = qs.filter(subject_id=subject_id)
+
+    return (
+        qs.order_by("pk")
+        .values_list(
+            "student__registration_number",
+            "student__first_name",
+            "student__last_name",
+            "team__name",
+            "bimonthly__year",
+            "subject__name",
+            "bimonthly__number",
+            "value_activity",
+            "value_proof",
+            "average",
+            "registration_date",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def attendance_rows(year=None, team_id=None, subject_id=None):
+    """Presenças em linhas e, em seguida, as das chamadas compactas."""
+    sessions = Attendance.objects.all()
+    if year:
+        start, end = year_range(year)
+        sessions = sessions.filter(date__gte=start, date__lt=end)
+    if team_id:
+        sessions = sessions.filter(team_id=team_id)
+    if subject_id:
+        sessions = sessions.filter(subject_id=subject_id)
+
+    yield from (
+        AttendanceRecord.objects.filter(attendance__in=sessions)
+        .order_by("pk")
+        .values_list(
+            "attendance__date",
+            "attendance__team__name",
+            "attendance__subject__name",
+            "attendance__teacher__registration_number",
+            "student__registration_number",
+            "student__first_name",
+            "student__last_name",
+            "present",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    compact = (
+        sessions.filter(presence__isnull=False)
+        .order_by("pk")
+        .values_list(
+            "date",
+            "team__name",
+            "subject__name",
+            "teacher__registration_number",
+            "roster",
+            "presence",
+        )
+        .iterator(chunk_size=COMPACT_CHUNK_SIZE)
+    )
+    while chunk := list(islice(compact, COMPACT_CHUNK_SIZE)):
+        students = {
+            pk: rest
+            for pk, *rest in CustomUser.objects.filter(
+                id__in={pk for row in chunk for pk in row[4]}
+            ).values_list("id", "registration_number", "first_name", "last_name")
+        }
+        for *session, roster, presence in chunk:
+            for student_id, present in unpack_roll_call(roster, presence).items():
+                if student_id in students:
+                    yield (*session, *students[student_id], present)
+
+
+def _status(approved, under_review) -> str:
+    if under_review:
+        return "Em análise"
+    return "Aprovado" if approved else "Reprovado"
+
+
+def _final_result_rows(year, team_id=None, subject_id=None):
+    """Situação final gravada no encerramento do ano, sem recalcular nada."""
+    qs = FinalResult.objects.filter(year=year)
+    if team_id:
+        qs = qs.filter(team_id=team_id)
+    if subject_id:
+        qs = qs.filter(subject_id=subject_id)
+
+    rows = (
+        qs.order_by("pk")
+        .values_list(
+            "student__registration_number",
+            "student__first_name",
+            "student__last_name",
+            "team__name",
+            "subject__name",
+            "grade_count",
+            "average",
+            "attendance",
+            "is_approved",
+            "is_under_review",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for (*student, team, subject, count, average, attendance, approved, review) in rows:
+        yield (
+            *student,
+            team,
+            year,
+            subject,
+            count,
+            round(average, 2) if average is not None else "",
+            round(attendance, 2) if attendance is not None else "",
+            _status(approved, review),
+        )
+
+
+def result_rows(year, team_id=None, subject_id=None):
+    """
+    Situação final por aluno/matéria. Os resumos são lidos em blocos e cada
+    bloco é avaliado de uma vez pela política de aprovação, com a frequência.
+    """
+    if YearClosing.objects.is_closed(year):
+        yield from _final_result_rows(year, team_id, subject_id)
+        return
+
+    qs = GradeSummary.objects.filter(year=year)
+    if team_id:
+        qs = qs.filter(team_id=team_id)
+    if subject_id:
+        qs = qs.filter(subject_id=subject_id)
+
+    summaries = (
+        qs.order_by("pk")
+        .values_list(
+            "student_id",
+            "subject_id",
+            "team_id",
+            "student__registration_number",
+            "student__first_name",
+            "student__last_name",
+            "team__name",
+            "subject__name",
+            "grade_count",
+            "bimonthly_averages",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    policy = get_grading_policy()
+    while chunk := list(islice(summaries, EXPORT_CHUNK_SIZE)):
+        rates = attendance_rates(year, {row[0] for row in chunk})
+        attendance = np.array(
+            [rates.get(row[:2], np.nan) for row in chunk], dtype=float
+        )
+        result = policy.evaluate(
+            policy.grades_matrix([row[9] for row in chunk]), attendance=attendance
+        )
+
+        for i, row in enumerate(chunk):
+            yield (
+                *row[3:7],
+                year,
+                row[7],
+                row[8],
+                round(float(result.average[i]), 2),
+                "" if np.isnan(attendance[i]) else round(float(attendance[i]), 2),
+                _status(result.approved[i], result.under_review[i]),
+            )
+
+
+def stream_csv(header, rows):
+    """Gera o CSV linha a linha para um StreamingHttpResponse."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+async def astream_csv(header, rows):
+    """
+    O mesmo CSV para o ASGI, que lê um iterador síncrono inteiro antes de
+    enviar o primeiro byte. As linhas saem do cursor em blocos, cada bloco
+    numa chamada à thread da requisição (a da conexão com o banco).
+    """
+    lines = stream_csv(header, rows)
+    next_chunk = sync_to_async(lambda: "".join(islice(lines, EXPORT_CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        yield chunk
@@ -116,15 +116,36 @@ class NotificationForm(forms.Form):
     content = forms.CharField(
         widget=forms.Textarea(attrs={"rows": 15}), label="Conteúdo"
     )
-    recipient = forms.ModelChoiceField(
-        queryset=Team.objects.none(), label="Destinatário"
+    recipients = forms.ModelMultipleChoiceField(
+        queryset=Team.objects.none(),
+        label="Turmas",
+        widget=forms.CheckboxSelectMultiple,
     )
 
     def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
         if user and getattr(user, "role", "").lower() == "professor":
-            self.fields["recipient"].queryset = Team.objects.filter(
+            self.fields["recipients"].queryset = Team.objects.filter(
                 subjects__teachers=user
             ).distinct()
         else:
-            self.fields["recipient"].queryset = Team.objects.none()
+            self.fields["recipients"].queryset = Team.objects.none()
+
+
+class GradeImportForm(forms.Form):
+    file = forms.FileField(
+        label="Planilha (.csv ou .xlsx)",
+        help_text=(
+            "Colunas: registration_number, subject, team, year, bimonthly, "
+            "value_activity, value_proof."
+        ),
+    )
+    batch_size = forms.IntegerField(
+        label="Tamanho do lote", min_value=1, max_value=10000, initial=1000
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if not file.name.lower().endswith((".csv", ".xlsx")):
+            raise forms.ValidationError("Envie um arquivo .csv ou .xlsx.")
+        return file
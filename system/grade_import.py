@@ -0,0 +1,249 @@
+import csv
+import io
+import math
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+
+from .models import Bimonthly, CustomUser, Grade, Subject, Team
+
+COLUMNS = (
+    "registration_number",
+    "subject",
+    "team",
+    "year",
+    "bimonthly",
+    "value_activity",
+    "value_proof",
+)
+
+
+class GradeImportError(Exception):
+    pass
+
+
+def iter_rows(file, filename: str):
+    """
+    Lê a planilha linha a linha, sem carregá-la inteira na memória.
+    Gera tuplas (número da linha, dicionário com as colunas).
+    """
+    if filename.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(h or "").strip().lower() for h in next(rows, [])]
+            _check_header(header)
+            for line, values in enumerate(rows, start=2):
+                if any(v not in (None, "") for v in values):
+                    yield line, dict(zip(header, values))
+        finally:
+            workbook.close()
+        return
+
+    if isinstance(file, io.TextIOBase):
+        text = file
+    else:
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+
+    sample = text.readline()
+    delimiter = ";" if sample.count(";") > sample.count(",") else ","
+    header = [
+        h.strip().lower() for h in next(csv.reader([sample], delimiter=delimiter))
+    ]
+    _check_header(header)
+    for line, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+        if any(v.strip() for v in values):
+            yield line, dict(zip(header, values))
+
+
+def _check_header(header):
+    missing = [c for c in COLUMNS if c not in header]
+    if missing:
+        raise GradeImportError(f"Colunas ausentes: {', '.join(missing)}")
+
+
+def _to_text(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value if value is not None else "").strip()
+
+
+def _to_int(value):
+    return int(float(_to_text(value)))
+
+
+def _to_float(value):
+    number = float(_to_text(value).replace(",", "."))
+    # "nan" e "inf" passam pelo float() e pelas comparações do Grade.clean
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+def _lookup(index: dict, key, label: str):
+    """Busca pelo nome; nomes repetidos no cadastro não escolhem ao acaso."""
+    ids = index.get(key)
+    if not ids:
+        raise GradeImportError(f"{label} não encontrada.")
+    if len(ids) > 1:
+        raise GradeImportError(f"{label} é ambígua: há {len(ids)} com esse nome.")
+    return ids[0]
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def import_grades(file, filename: str, batch_size: int = 1000, on_error=None):
+    """
+    Importa notas de um CSV/XLSX em lotes. Cada lote é validado em memória
+    com as mesmas regras de Grade.clean e gravado em uma transação.
+
+    Matérias, turmas e bimestres são carregados uma vez em mapas de busca;
+    alunos e notas existentes são buscados por lote, então a memória usada
+    depende do tamanho do lote, não do arquivo.
+
+    on_error(linha, mensagem) é chamado para cada linha rejeitada.
+    Retorna um dicionário com as contagens de criadas, atualizadas e erros.
+    """
+    subjects, teams = {}, {}
+    for pk, name in Subject.objects.values_list("id", "name"):
+        subjects.setdefault(name.strip().lower(), []).append(pk)
+    for pk, name, year in Team.objects.values_list("id", "name", "year"):
+        teams.setdefault((name.strip().lower(), year), []).append(pk)
+    # matérias de cada turma, como em add_grade
+    team_subjects = set(
+        Subject.team.through.objects.values_list("team_id", "subject_id")
+    )
+    bimonthlys = {
+        (number, year): pk
+        for pk, number, year in Bimonthly.objects.values_list("id", "number", "year")
+    }
+
+    result = {"created": 0, "updated": 0, "errors": 0}
+
+    def reject(line, message):
+        result["errors"] += 1
+        if on_error:
+            on_error(line, message)
+
+    for batch in _batches(iter_rows(file, filename), batch_size):
+        registration_numbers = {
+            _to_text(row.get("registration_number")) for _, row in batch
+        }
+        students = dict(
+            CustomUser.objects.filter(
+                registration_number__in=registration_numbers, role="aluno"
+            ).values_list("registration_number", "id")
+        )
+        members = set(
+            Team.members.through.objects.filter(
+                customuser_id__in=students.values()
+            ).values_list("team_id", "customuser_id")
+        )
+
+        parsed = {}
+        for line, row in batch:
+            registration_number = _to_text(row.get("registration_number"))
+            student_id = students.get(registration_number)
+            if student_id is None:
+                reject(
+                    line, f"Aluno com matrícula '{registration_number}' não encontrado."
+                )
+                continue
+
+            try:
+                year = _to_int(row.get("year"))
+                number = _to_int(row.get("bimonthly"))
+                value_activity = _to_float(row.get("value_activity"))
+                value_proof = _to_float(row.get("value_proof"))
+            except (TypeError, ValueError):
+                reject(line, "Ano, bimestre e notas devem ser numéricos.")
+                continue
+
+            try:
+                subject_id = _lookup(
+                    subjects,
+                    _to_text(row.get("subject")).lower(),
+                    f"Matéria '{row.get('subject')}'",
+                )
+                team_id = _lookup(
+                    teams,
+                    (_to_text(row.get("team")).lower(), year),
+                    f"Turma '{row.get('team')}' de {year}",
+                )
+            except GradeImportError as e:
+                reject(line, str(e))
+                continue
+            bimonthly_id = bimonthlys.get((number, year))
+            if bimonthly_id is None:
+                reject(line, f"Bimestre {number}/{year} não encontrado.")
+                continue
+            if (team_id, student_id) not in members:
+                reject(
+                    line,
+                    f"Aluno '{registration_number}' não pertence à turma "
+                    f"'{row.get('team')}'.",
+                )
+                continue
+            if (team_id, subject_id) not in team_subjects:
+                reject(
+                    line,
+                    f"Matéria '{row.get('subject')}' não é da turma "
+                    f"'{row.get('team')}'.",
+                )
+                continue
+
+            grade = Grade(
+                student_id=student_id,
+                subject_id=subject_id,
+                team_id=team_id,
+                bimonthly_id=bimonthly_id,
+                value_activity=value_activity,
+                value_proof=value_proof,
+            )
+            try:
+                grade.clean()
+            except ValidationError as e:
+                reject(line, " ".join(e.messages))
+                continue
+
+            grade.compute_average()
+            # Linhas repetidas no mesmo lote: vale a última.
+            parsed[(student_id, subject_id, team_id, bimonthly_id)] = grade
+
+        if not parsed:
+            continue
+
+        existing = {
+            (g.student_id, g.subject_id, g.team_id, g.bimonthly_id): g
+            for g in Grade.objects.filter(
+                student_id__in={k[0] for k in parsed},
+                subject_id__in={k[1] for k in parsed},
+                team_id__in={k[2] for k in parsed},
+                bimonthly_id__in={k[3] for k in parsed},
+            )
+        }
+
+        to_create, to_update = [], []
+        for key, grade in parsed.items():
+            current = existing.get(key)
+            if current is None:
+                to_create.append(grade)
+                continue
+            current.value_activity = grade.value_activity
+            current.value_proof = grade.value_proof
+            current.average = grade.average
+            to_update.append(current)
+
+        Grade.objects.bulk_save(
+            to_create, to_update, ["value_activity", "value_proof", "average"]
+        )
+        result["created"] += len(to_create)
+        result["updated"] += len(to_update)
+
+    return result
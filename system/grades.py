@@ -0,0 +1,45 @@
+from .models import FinalResult, GradeSummary, YearClosing
+
+
+def results_model(year: int):
+    """
+    Modelo de onde as páginas leem a situação dos alunos: o resultado final
+    imutável se o ano já foi encerrado, senão o resumo mantido a cada nota.
+    """
+    return FinalResult if YearClosing.objects.is_closed(year) else GradeSummary
+
+
+def get_subjects_with_grades(student, team, subjects):
+    """
+    Monta os cartões de disciplinas das páginas de notas a partir do
+    GradeSummary (ou do FinalResult, se o ano já foi encerrado), sem ler
+    as notas brutas.
+
+    Faz uma consulta para as disciplinas e outra para os resumos, agrupados
+    em memória por disciplina, qualquer que seja a quantidade de disciplinas.
+    """
+    summaries = {
+        s.subject_id: s
+        for s in results_model(team.year).objects.filter(
+            student=student, team=team, year=team.year
+        )
+    }
+
+    subjects_with_grades = []
+    max_bimonthlys = 0
+    for subject in subjects.order_by("name"):
+        summary = summaries.get(subject.id)
+        grade_count = summary.grade_count if summary else 0
+        if grade_count > max_bimonthlys:
+            max_bimonthlys = grade_count
+
+        subjects_with_grades.append(
+            {
+                "subject": subject,
+                "grades": summary.bimonthly_averages if summary else {},
+                "grade_count": grade_count,
+                "status": summary.status if summary else "Reprovado",
+                "media": summary.average if summary else None,
+            }
+        )
+    return subjects_with_grades, max_bimonthlys
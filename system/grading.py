@@ -0,0 +1,72 @@
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+BIMONTHLYS_PER_YEAR = 4
+
+DEFAULT_GRADING_POLICY = {
+    "CLASS": "system.grading.GradingPolicy",
+    "OPTIONS": {},
+}
+
+GradingResult = namedtuple("GradingResult", ["average", "approved", "under_review"])
+
+
+class GradingPolicy:
+    """
+    Regra de aprovação avaliada em lote sobre uma matriz de notas
+    (um aluno por linha, um bimestre por coluna, NaN onde não há nota).
+
+    - weights: peso de cada bimestre na média final.
+    - min_average: média mínima para aprovação.
+    - min_attendance: frequência mínima (0 a 1); None desliga a regra.
+
+    Resumos, exportações, boletins, estatísticas da turma e o encerramento
+    do ano avaliam sempre com a frequência anual do AttendanceSummary.
+    Não há regra de recuperação: o sistema não registra notas de recuperação.
+    """
+
+    def __init__(self, weights=(1, 1, 1, 1), min_average=6.0, min_attendance=None):
+        self.weights = np.asarray(weights, dtype=float)
+        self.min_average = min_average
+        self.min_attendance = min_attendance
+
+    @staticmethod
+    def grades_matrix(rows) -> np.ndarray:
+        """Converte dicionários {bimestre: média} na matriz de notas."""
+        matrix = np.full((len(rows), BIMONTHLYS_PER_YEAR), np.nan)
+        for i, averages in enumerate(rows):
+            for number, average in averages.items():
+                if average is not None:
+                    matrix[i, int(number) - 1] = average
+        return matrix
+
+    def evaluate(self, grades, attendance=None) -> GradingResult:
+        grades = np.asarray(grades, dtype=float).reshape(-1, BIMONTHLYS_PER_YEAR)
+        present = ~np.isnan(grades)
+        weights = np.where(present, self.weights, 0.0)
+        weight_total = weights.sum(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = np.nansum(grades * weights, axis=1) / weight_total
+        average[weight_total == 0] = np.nan
+
+        approved = average >= self.min_average
+        if self.min_attendance is not None and attendance is not None:
+            attendance = np.asarray(attendance, dtype=float)
+            # sem chamadas registradas a frequência não reprova
+            approved &= np.isnan(attendance) | (attendance >= self.min_attendance)
+
+        under_review = present.sum(axis=1) < BIMONTHLYS_PER_YEAR
+        return GradingResult(average, approved, under_review)
+
+
+@lru_cache(maxsize=None)
+def get_grading_policy() -> GradingPolicy:
+    """Política configurada em settings.GRADING_POLICY."""
+    config = getattr(settings, "GRADING_POLICY", DEFAULT_GRADING_POLICY)
+    policy_class = import_string(config.get("CLASS", DEFAULT_GRADING_POLICY["CLASS"]))
+    return policy_class(**config.get("OPTIONS", {}))
@@ -0,0 +1,220 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from system.bitmaps import pack_roll_call
+from system.models import (
+    Attendance,
+    AttendanceRecord,
+    CustomUser,
+    Subject,
+    Team,
+    suspend_summary_refresh,
+)
+
+# Faltas por aluno a partir das chamadas compactas, direto no banco.
+COMPACT_ABSENCES_SQL = """
+SELECT s.student_id, COUNT(*)
+FROM {attendance} a
+CROSS JOIN LATERAL unnest(a.roster) WITH ORDINALITY AS s(student_id, position)
+WHERE a.subject_id = %s AND get_bit(a.presence, (s.position - 1)::int) = 0
+GROUP BY s.student_id
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara tamanho em disco e tempo de consulta das chamadas em linhas "
+        "(AttendanceRecord) e no armazenamento compacto (bitmap). Os dados "
+        "sintéticos são criados numa transação desfeita no final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=1000)
+        parser.add_argument("--sessions", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--absence-rate", type=float, default=0.1)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._run(options)
+            transaction.set_rollback(True)
+
+    def _run(self, options):
+        rng = random.Random(options["seed"])
+        teacher, team, students = self._school(options["students"])
+        student_ids = [s.pk for s in students]
+        rows_subject = Subject.objects.create(name="Benchmark (linhas)")
+        bitmap_subject = Subject.objects.create(name="Benchmark (bitmap)")
+        roll_calls = [
+            {pk: rng.random() >= options["absence_rate"] for pk in student_ids}
+            for _ in range(options["sessions"])
+        ]
+        # uma chamada por dia (unique_attendance_session)
+        first_day = datetime.date(2000, 1, 1)
+        dates = [first_day + datetime.timedelta(days=i) for i in range(len(roll_calls))]
+
+        def new_sessions(subject):
+            return Attendance.objects.bulk_create(
+                Attendance(teacher=teacher, team=team, subject=subject, date=date)
+                for date in dates
+            )
+
+        tables = [AttendanceRecord._meta.db_table, Attendance._meta.db_table]
+        before = self._sizes(tables)
+        with suspend_summary_refresh():
+            rows_sessions = new_sessions(rows_subject)
+            AttendanceRecord.objects.bulk_create(
+                (
+                    AttendanceRecord(attendance=session, student_id=pk, present=p)
+                    for session, presence in zip(rows_sessions, roll_calls)
+                    for pk, p in presence.items()
+                ),
+                batch_size=5000,
+            )
+        after_rows = self._sizes(tables)
+
+        bitmap_sessions = Attendance.objects.bulk_create(
+            Attendance(
+                teacher=teacher,
+                team=team,
+                subject=bitmap_subject,
+                date=date,
+                roster=roster,
+                presence=presence,
+            )
+            for date, (roster, presence) in zip(dates, map(pack_roll_call, roll_calls))
+        )
+        after_bitmap = self._sizes(tables)
+
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+
+        size_rows = sum(after_rows[t] - before[t] for t in tables)
+        size_bitmap = sum(after_bitmap[t] - after_rows[t] for t in tables)
+
+        student = students[len(students) // 2]
+        rows_session, bitmap_session = rows_sessions[0], bitmap_sessions[0]
+        compact_sql = COMPACT_ABSENCES_SQL.format(
+            attendance=connection.ops.quote_name(Attendance._meta.db_table)
+        )
+
+        def compact_absences():
+            with connection.cursor() as cursor:
+                cursor.execute(compact_sql, [bitmap_subject.pk])
+                return cursor.fetchall()
+
+        timings = [
+            (
+                "faltas de um aluno",
+                lambda: list(
+                    AttendanceRecord.objects.filter(
+                        student=student, present=False, attendance__subject=rows_subject
+                    ).values_list("attendance__date", flat=True)
+                ),
+                lambda: list(
+                    Attendance.objects.absences_of(student)
+                    .filter(subject=bitmap_subject)
+                    .values_list("date", flat=True)
+                ),
+            ),
+            (
+                "leitura de uma chamada",
+                lambda: dict(
+                    AttendanceRecord.objects.filter(
+                        attendance=rows_session
+                    ).values_list("student_id", "present")
+                ),
+                lambda: Attendance.objects.get(pk=bitmap_session.pk).presence_map(),
+            ),
+            (
+                "faltas da turma por aluno",
+                lambda: list(
+                    AttendanceRecord.objects.filter(
+                        attendance__subject=rows_subject, present=False
+                    )
+                    .values_list("student_id")
+                    .annotate(total=Count("id"))
+                ),
+                compact_absences,
+            ),
+        ]
+
+        self.stdout.write(
+            f"{options['students']} alunos x {options['sessions']} chamadas "
+            f"({options['students'] * options['sessions']} presenças)\n"
+        )
+        self._line("métrica", "linhas", "bitmap", "razão")
+        self._line(
+            "tamanho em disco",
+            self._kb(size_rows),
+            self._kb(size_bitmap),
+            self._ratio(size_rows, size_bitmap),
+        )
+        for name, rows_query, bitmap_query in timings:
+            rows_ms = self._measure(rows_query, options["repeat"])
+            bitmap_ms = self._measure(bitmap_query, options["repeat"])
+            self._line(
+                name,
+                f"{rows_ms:.2f} ms",
+                f"{bitmap_ms:.2f} ms",
+                self._ratio(rows_ms, bitmap_ms),
+            )
+
+    def _school(self, total):
+        teacher = CustomUser.objects.create(
+            username="user_BPROF000",
+            registration_number="BPROF000",
+            first_name="Professor",
+            last_name="Benchmark",
+            role="professor",
+        )
+        team = Team.objects.create(name="Benchmark", year=2000)
+        students = CustomUser.objects.bulk_create(
+            CustomUser(
+                username=f"user_B{i:07d}",
+                registration_number=f"B{i:07d}",
+                first_name=f"Aluno{i}",
+                last_name="Benchmark",
+                role="aluno",
+            )
+            for i in range(total)
+        )
+        team.members.add(*students)
+        return teacher, team, students
+
+    def _sizes(self, tables):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname, pg_total_relation_size(oid) FROM pg_class "
+                "WHERE relname = ANY(%s)",
+                [tables],
+            )
+            return dict(cursor.fetchall())
+
+    def _measure(self, query, repeat):
+        query()  # aquece cache e plano
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    def _line(self, *columns):
+        self.stdout.write(
+            f"{columns[0]:<28}{columns[1]:>14}{columns[2]:>14}{columns[3]:>10}"
+        )
+
+    def _kb(self, size):
+        return f"{size / 1024:.0f} kB"
+
+    def _ratio(self, rows, bitmap):
+        return f"{rows / bitmap:.1f}x" if bitmap else "-"
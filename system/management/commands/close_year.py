@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from system.models import YearClosing
+from system.year_closing import close_year
+
+
+class Command(BaseCommand):
+    help = (
+        "Encerra o ano letivo gravando a situação final imutável de cada aluno. "
+        "Se for interrompido, basta executar de novo para retomar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", type=int)
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        year = options["year"]
+        if YearClosing.objects.is_closed(year):
+            raise CommandError(f"O ano {year} já foi encerrado.")
+
+        started = time.monotonic()
+        closing = close_year(
+            year,
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+            progress=lambda saved: self.stdout.write(f"{saved} resultados gravados..."),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ano {year} encerrado com {closing.total_results} resultados "
+                f"em {time.monotonic() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from system.attendance import BITMAP, ROWS, convert_attendances
+
+
+class Command(BaseCommand):
+    help = (
+        "Converte as chamadas gravadas entre o armazenamento em linhas e o "
+        "compacto (bitmap). Ajuste settings.ATTENDANCE_STORAGE para o mesmo modo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--to", choices=[ROWS, BITMAP], required=True)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        converted = convert_attendances(
+            options["to"],
+            batch_size=options["batch_size"],
+            progress=lambda total: self.stdout.write(
+                f"{total} chamadas convertidas..."
+            ),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{converted} chamadas convertidas para '{options['to']}' "
+                f"em {time.monotonic() - started:.1f}s."
+            )
+        )
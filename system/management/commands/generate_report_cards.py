@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from system.models import Team
+from system.report_cards import generate_report_cards
+from system.tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = "Gera os boletins em PDF de uma ou mais turmas (ou da escola toda)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, required=True)
+        parser.add_argument(
+            "--bimonthly", type=int, choices=[1, 2, 3, 4], required=True
+        )
+        parser.add_argument(
+            "--team",
+            type=int,
+            action="append",
+            dest="teams",
+            help="Id da turma. Pode ser repetido; sem ele, gera para a escola toda.",
+        )
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Só coloca a geração na fila; o comando run_worker executa.",
+        )
+
+    def handle(self, *args, **options):
+        teams = Team.objects.filter(year=options["year"])
+        if options["teams"]:
+            teams = teams.filter(id__in=options["teams"])
+        if not teams.exists():
+            raise CommandError("Nenhuma turma encontrada.")
+
+        if options["background"]:
+            task = enqueue(
+                "generate_report_cards",
+                team_ids=list(teams.values_list("id", flat=True)),
+                year=options["year"],
+                bimonthly=options["bimonthly"],
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Geração na fila (tarefa {task.pk}).")
+            )
+            return
+
+        started = time.monotonic()
+        paths = generate_report_cards(
+            teams, options["year"], options["bimonthly"], workers=options["workers"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(paths)} boletins gerados em {time.monotonic() - started:.1f}s."
+            )
+        )
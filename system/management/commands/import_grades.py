@@ -0,0 +1,51 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from system.grade_import import GradeImportError, import_grades
+
+
+class Command(BaseCommand):
+    help = "Importa notas de um arquivo CSV ou XLSX em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo .csv ou .xlsx")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--errors",
+            help="Grava as linhas rejeitadas neste CSV em vez de exibi-las.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        started = time.monotonic()
+
+        report = open(options["errors"], "w", newline="") if options["errors"] else None
+        writer = csv.writer(report) if report else None
+        if writer:
+            writer.writerow(["linha", "erro"])
+
+        def on_error(line, message):
+            if writer:
+                writer.writerow([line, message])
+            else:
+                self.stderr.write(f"Linha {line}: {message}")
+
+        try:
+            with open(path, "rb") as file:
+                result = import_grades(
+                    file, path, batch_size=options["batch_size"], on_error=on_error
+                )
+        except (OSError, GradeImportError) as e:
+            raise CommandError(str(e))
+        finally:
+            if report:
+                report.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result['created']} notas criadas, {result['updated']} atualizadas, "
+                f"{result['errors']} linhas com erro em {time.monotonic() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,60 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from system.notifications import (
+    notification_retention_settings,
+    prune_read_notifications,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove as notificações já lidas mais antigas que o prazo de retenção "
+        "(settings.NOTIFICATION_RETENTION), em lotes com transações curtas. "
+        "Com --archive, grava as removidas num arquivo JSON Lines antes."
+    )
+
+    def add_arguments(self, parser):
+        config = notification_retention_settings()
+        parser.add_argument("--days", type=int, default=config["DAYS"])
+        parser.add_argument("--batch-size", type=int, default=config["BATCH_SIZE"])
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=config["PAUSE"],
+            help="Segundos de espera entre os lotes.",
+        )
+        parser.add_argument(
+            "--archive",
+            metavar="ARQUIVO",
+            help="Acrescenta as notificações removidas a este arquivo .jsonl.",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - datetime.timedelta(days=options["days"])
+        started = time.monotonic()
+
+        def progress(total):
+            self.stdout.write(f"{total} notificações removidas...")
+
+        prune = dict(
+            before=before,
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            progress=progress,
+        )
+        if options["archive"]:
+            with open(options["archive"], "a", encoding="utf-8") as archive:
+                removed = prune_read_notifications(archive=archive, **prune)
+        else:
+            removed = prune_read_notifications(**prune)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{removed} notificações lidas anteriores a "
+                f"{before:%d/%m/%Y} removidas em {time.monotonic() - started:.1f}s."
+            )
+        )
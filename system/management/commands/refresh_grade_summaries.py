@@ -0,0 +1,41 @@
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from system.models import Grade, GradeSummary
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os resumos de notas (GradeSummary) com a política de "
+        "aprovação atual. Rode depois de mudar settings.GRADING_POLICY."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        grades, summaries = Grade.objects.all(), GradeSummary.objects.all()
+        if options["year"]:
+            grades = grades.filter(bimonthly__year=options["year"])
+            summaries = summaries.filter(year=options["year"])
+
+        # resumos sem notas também entram, para serem apagados
+        keys = GradeSummary.objects.keys_for_queryset(grades) | set(
+            summaries.values_list("student_id", "subject_id", "team_id", "year")
+        )
+        keys = iter(keys)
+        total = 0
+        while batch := list(islice(keys, options["batch_size"])):
+            GradeSummary.objects.refresh(batch)
+            total += len(batch)
+            self.stdout.write(f"{total} resumos recalculados...")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total} resumos recalculados em {time.monotonic() - started:.1f}s."
+            )
+        )
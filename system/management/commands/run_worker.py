@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from system.tasks import work, worker_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa as tarefas em segundo plano da fila (tabela Task). Vários "
+        "workers podem rodar ao mesmo tempo; cada tarefa é reservada por um só."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Segundos de espera quando a fila está vazia.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Processa o que estiver pronto e sai, em vez de ficar esperando.",
+        )
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        processed = 0
+        self.stdout.write(f"Worker {worker} iniciado.")
+        try:
+            while True:
+                done = work(worker, batch_size=options["batch_size"])
+                processed += done
+                if not done:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"{processed} tarefas processadas."))
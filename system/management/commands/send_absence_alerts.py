@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from system.absence_alerts import send_absence_alerts
+
+
+class Command(BaseCommand):
+    help = (
+        "Avisa alunos e professores sobre quem passou do limite de faltas. "
+        "Feito para rodar agendado (cron); só avisa cruzamentos novos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, default=None)
+        parser.add_argument(
+            "--max-rate",
+            type=float,
+            default=None,
+            help="Taxa máxima de faltas (0 a 1). Padrão: settings.ABSENCE_ALERTS.",
+        )
+        parser.add_argument(
+            "--max-streak",
+            type=int,
+            default=None,
+            help="Faltas seguidas que geram aviso. Padrão: settings.ABSENCE_ALERTS.",
+        )
+        parser.add_argument("--min-classes", type=int, default=None)
+
+    def handle(self, *args, **options):
+        year = options["year"] or timezone.now().year
+
+        started = time.monotonic()
+        result = send_absence_alerts(
+            year,
+            max_rate=options["max_rate"],
+            max_streak=options["max_streak"],
+            min_classes=options["min_classes"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result['alerts']} alertas novos, {result['notifications']} "
+                f"notificações e {result['resolved']} alertas encerrados "
+                f"em {time.monotonic() - started:.1f}s."
+            )
+        )
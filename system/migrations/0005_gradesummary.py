@@ -0,0 +1,106 @@
+# Generated by Django 4.2.27 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_summaries(apps, schema_editor):
+    Grade = apps.get_model("system", "Grade")
+    GradeSummary = apps.get_model("system", "GradeSummary")
+
+    averages_by_key = {}
+    rows = Grade.objects.filter(average__isnull=False).values_list(
+        "student_id",
+        "subject_id",
+        "team_id",
+        "bimonthly__year",
+        "bimonthly__number",
+        "average",
+    )
+    for student_id, subject_id, team_id, year, number, average in rows.iterator():
+        key = (student_id, subject_id, team_id, year)
+        averages_by_key.setdefault(key, {})[str(number)] = average
+
+    summaries = []
+    for (student_id, subject_id, team_id, year), averages in averages_by_key.items():
+        total = sum(averages.values())
+        average = total / len(averages)
+        summaries.append(
+            GradeSummary(
+                student_id=student_id,
+                subject_id=subject_id,
+                team_id=team_id,
+                year=year,
+                grade_count=len(averages),
+                grade_total=total,
+                average=average,
+                bimonthly_averages=dict(sorted(averages.items())),
+                is_approved=average >= 6,
+                is_under_review=len(averages) < 4,
+            )
+        )
+    GradeSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0004_rename_value_grade_value_proof_grade_average"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GradeSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.IntegerField()),
+                ("grade_count", models.PositiveSmallIntegerField(default=0)),
+                ("grade_total", models.FloatField(default=0)),
+                ("average", models.FloatField(blank=True, null=True)),
+                ("bimonthly_averages", models.JSONField(blank=True, default=dict)),
+                ("is_approved", models.BooleanField(default=False)),
+                ("is_under_review", models.BooleanField(default=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="grade_summaries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="system.subject"
+                    ),
+                ),
+                (
+                    "team",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="system.team",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="gradesummary",
+            constraint=models.UniqueConstraint(
+                fields=("student", "subject", "team", "year"),
+                name="unique_grade_summary",
+            ),
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.27 on 2026-10-18 19:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0005_gradesummary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="YearClosing",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.IntegerField(unique=True)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("total_results", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="FinalResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.IntegerField()),
+                ("grade_count", models.PositiveSmallIntegerField()),
+                ("average", models.FloatField(blank=True, null=True)),
+                ("bimonthly_averages", models.JSONField(blank=True, default=dict)),
+                ("attendance", models.FloatField(blank=True, null=True)),
+                ("is_approved", models.BooleanField()),
+                ("is_under_review", models.BooleanField()),
+                ("closed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="final_results",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT, to="system.subject"
+                    ),
+                ),
+                (
+                    "team",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="system.team",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="finalresult",
+            constraint=models.UniqueConstraint(
+                fields=("student", "subject", "team", "year"),
+                name="unique_final_result",
+            ),
+        ),
+    ]
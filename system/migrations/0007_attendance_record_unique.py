@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-18 20:01
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_records(apps, schema_editor):
+    AttendanceRecord = apps.get_model("system", "AttendanceRecord")
+
+    # Mantém o registro mais recente de cada aluno por chamada.
+    latest = (
+        AttendanceRecord.objects.values("attendance_id", "student_id")
+        .annotate(last_id=Max("id"))
+        .values_list("last_id", flat=True)
+    )
+    AttendanceRecord.objects.exclude(id__in=latest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0006_year_closing_final_result"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_records, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="attendancerecord",
+            constraint=models.UniqueConstraint(
+                fields=("attendance", "student"), name="unique_attendance_record"
+            ),
+        ),
+    ]
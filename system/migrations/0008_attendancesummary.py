@@ -0,0 +1,85 @@
+# Generated by Django 4.2.27 on 2026-10-18 20:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def build_summaries(apps, schema_editor):
+    AttendanceRecord = apps.get_model("system", "AttendanceRecord")
+    AttendanceSummary = apps.get_model("system", "AttendanceSummary")
+
+    rows = (
+        AttendanceRecord.objects.values_list(
+            "student_id", "attendance__subject_id", TruncMonth("attendance__date")
+        )
+        .annotate(
+            presences=Count("id", filter=Q(present=True)),
+            absences=Count("id", filter=Q(present=False)),
+        )
+        .order_by()
+    )
+    AttendanceSummary.objects.bulk_create(
+        (
+            AttendanceSummary(
+                student_id=student_id,
+                subject_id=subject_id,
+                month=month,
+                presences=presences,
+                absences=absences,
+            )
+            for student_id, subject_id, month, presences, absences in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0007_attendance_record_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttendanceSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("presences", models.PositiveIntegerField(default=0)),
+                ("absences", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attendance_summaries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="system.subject"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="attendancesummary",
+            constraint=models.UniqueConstraint(
+                fields=("student", "subject", "month"), name="unique_attendance_summary"
+            ),
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
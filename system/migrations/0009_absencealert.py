@@ -0,0 +1,63 @@
+# Generated by Django 4.2.27 on 2026-10-18 20:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0008_attendancesummary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AbsenceAlert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.IntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("frequencia", "Frequência abaixo do mínimo"),
+                            ("sequencia", "Faltas seguidas"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("value", models.FloatField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="absence_alerts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="system.subject"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="absencealert",
+            constraint=models.UniqueConstraint(
+                fields=("student", "subject", "year", "kind"),
+                name="unique_absence_alert",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.27 on 2026-10-18 20:13
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0009_absencealert"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="attendance",
+            name="date",
+            field=models.DateField(default=datetime.date.today),
+        ),
+        migrations.CreateModel(
+            name="AttendanceSync",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=64)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "attendance",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="syncs",
+                        to="system.attendance",
+                    ),
+                ),
+                (
+                    "teacher",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="attendancesync",
+            constraint=models.UniqueConstraint(
+                fields=("teacher", "key"), name="unique_attendance_sync"
+            ),
+        ),
+    ]
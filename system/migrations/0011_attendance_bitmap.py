@@ -0,0 +1,82 @@
+# Generated by Django 4.2.27 on 2026-10-18 20:17
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+from system.bitmaps import pack_roll_call, unpack_roll_call
+
+BATCH_SIZE = 500
+
+
+def rows_to_bitmap(apps, schema_editor):
+    """Converte as chamadas existentes se o modo configurado for "bitmap"."""
+    if getattr(settings, "ATTENDANCE_STORAGE", "rows") != "bitmap":
+        return
+
+    Attendance = apps.get_model("system", "Attendance")
+    AttendanceRecord = apps.get_model("system", "AttendanceRecord")
+
+    pending = Attendance.objects.filter(records__isnull=False).distinct().order_by("pk")
+    last_pk = 0
+    while batch := list(pending.filter(pk__gt=last_pk)[:BATCH_SIZE]):
+        last_pk = batch[-1].pk
+        presence = {}
+        records = AttendanceRecord.objects.filter(attendance__in=batch)
+        for attendance_id, student_id, present in records.values_list(
+            "attendance_id", "student_id", "present"
+        ):
+            presence.setdefault(attendance_id, {})[student_id] = present
+        for attendance in batch:
+            attendance.roster, attendance.presence = pack_roll_call(
+                presence[attendance.pk]
+            )
+        Attendance.objects.bulk_update(batch, ["roster", "presence"])
+        records.delete()
+
+
+def bitmap_to_rows(apps, schema_editor):
+    """Volta as chamadas compactas para linhas antes de remover os campos."""
+    Attendance = apps.get_model("system", "Attendance")
+    AttendanceRecord = apps.get_model("system", "AttendanceRecord")
+
+    compact = Attendance.objects.filter(presence__isnull=False).order_by("pk")
+    for attendance in compact.iterator(chunk_size=BATCH_SIZE):
+        AttendanceRecord.objects.bulk_create(
+            AttendanceRecord(
+                attendance_id=attendance.pk, student_id=student_id, present=present
+            )
+            for student_id, present in unpack_roll_call(
+                attendance.roster, attendance.presence
+            ).items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0010_attendance_sync"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attendance",
+            name="presence",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="attendance",
+            name="roster",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(), blank=True, default=list, size=None
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["roster"], name="attendance_roster_gin"
+            ),
+        ),
+        migrations.RunPython(rows_to_bitmap, bitmap_to_rows),
+    ]
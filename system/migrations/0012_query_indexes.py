@@ -0,0 +1,172 @@
+# Generated by Django 4.2.27 on 2026-10-18 20:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+import django.db.models.deletion
+import numpy as np
+
+from system.grading import get_grading_policy
+
+
+def remove_duplicate_grades(apps, schema_editor):
+    Bimonthly = apps.get_model("system", "Bimonthly")
+    Grade = apps.get_model("system", "Grade")
+    GradeSummary = apps.get_model("system", "GradeSummary")
+
+    # Mantém a nota mais recente de cada aluno por matéria, turma e bimestre.
+    duplicated = list(
+        Grade.objects.values("student_id", "subject_id", "team_id", "bimonthly_id")
+        .annotate(total=Count("id"), last_id=Max("id"))
+        .filter(total__gt=1)
+        .values_list("student_id", "subject_id", "team_id", "bimonthly_id", "last_id")
+    )
+    if not duplicated:
+        return
+
+    years = dict(Bimonthly.objects.values_list("id", "year"))
+    keys = set()
+    for student_id, subject_id, team_id, bimonthly_id, last_id in duplicated:
+        Grade.objects.filter(
+            student_id=student_id,
+            subject_id=subject_id,
+            team_id=team_id,
+            bimonthly_id=bimonthly_id,
+        ).exclude(id=last_id).delete()
+        keys.add((student_id, subject_id, team_id, years[bimonthly_id]))
+
+    # Os sinais do app não rodam em migrações: refaz o resumo das chaves
+    # afetadas com as notas que ficaram, avaliadas pela política de aprovação
+    # configurada, como em GradeSummary.fill_many.
+    keys = list(keys)
+    averages_list = [
+        dict(
+            Grade.objects.filter(
+                student_id=student_id,
+                subject_id=subject_id,
+                team_id=team_id,
+                bimonthly__year=year,
+                average__isnull=False,
+            ).values_list("bimonthly__number", "average")
+        )
+        for student_id, subject_id, team_id, year in keys
+    ]
+    policy = get_grading_policy()
+    attendance = None
+    if policy.min_attendance is not None:
+        AttendanceSummary = apps.get_model("system", "AttendanceSummary")
+        attendance = [
+            _yearly_rate(AttendanceSummary, student_id, subject_id, year)
+            for student_id, subject_id, _, year in keys
+        ]
+    result = policy.evaluate(policy.grades_matrix(averages_list), attendance)
+
+    for i, (key, averages) in enumerate(zip(keys, averages_list)):
+        student_id, subject_id, team_id, year = key
+        average = result.average[i]
+        GradeSummary.objects.filter(
+            student_id=student_id, subject_id=subject_id, team_id=team_id, year=year
+        ).update(
+            grade_count=len(averages),
+            grade_total=sum(averages.values()),
+            average=None if np.isnan(average) else float(average),
+            bimonthly_averages={str(n): averages[n] for n in sorted(averages)},
+            is_approved=bool(result.approved[i]),
+            is_under_review=bool(result.under_review[i]),
+        )
+
+
+def _yearly_rate(AttendanceSummary, student_id, subject_id, year):
+    """Frequência anual a partir do resumo mensal; NaN sem chamadas."""
+    totals = AttendanceSummary.objects.filter(
+        student_id=student_id, subject_id=subject_id, month__year=year
+    ).aggregate(presences=Sum("presences"), absences=Sum("absences"))
+    classes = (totals["presences"] or 0) + (totals["absences"] or 0)
+    return totals["presences"] / classes if classes else np.nan
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0011_attendance_bitmap"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_grades, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["teacher", "team", "subject", "date"],
+                name="attendance_session_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendancerecord",
+            index=models.Index(
+                fields=["student", "present"], name="attendance_record_student_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="grade",
+            index=models.Index(
+                fields=["team", "subject", "bimonthly"], name="grade_team_subject_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="grade",
+            constraint=models.UniqueConstraint(
+                fields=("student", "subject", "team", "bimonthly"), name="unique_grade"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="attendance",
+            name="teacher",
+            field=models.ForeignKey(
+                db_index=False,
+                limit_choices_to={"role": "professor"},
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="attendancerecord",
+            name="attendance",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="records",
+                to="system.attendance",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="attendancerecord",
+            name="student",
+            field=models.ForeignKey(
+                db_index=False,
+                limit_choices_to={"role": "aluno"},
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="grade",
+            name="student",
+            field=models.ForeignKey(
+                db_index=False,
+                limit_choices_to={"role": "aluno"},
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="grade",
+            name="team",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="system.team",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0014_announcements"),
+    ]
+
+    operations = [
+        # matrículas novas (CustomUserManager.allocate_registration_numbers)
+        migrations.RunSQL(
+            "CREATE SEQUENCE system_customuser_registration_seq "
+            "MINVALUE 1 MAXVALUE 99999999 NO CYCLE",
+            "DROP SEQUENCE system_customuser_registration_seq",
+        ),
+    ]
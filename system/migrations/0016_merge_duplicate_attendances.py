@@ -0,0 +1,84 @@
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import Count, F
+
+from system.bitmaps import pack_roll_call, unpack_roll_call
+
+
+def _presence(AttendanceRecord, attendance) -> dict:
+    if attendance.presence is not None:
+        return unpack_roll_call(attendance.roster, attendance.presence)
+    return dict(
+        AttendanceRecord.objects.filter(attendance_id=attendance.pk).values_list(
+            "student_id", "present"
+        )
+    )
+
+
+def merge_duplicate_sessions(apps, schema_editor):
+    """
+    Junta chamadas repetidas do mesmo dia na mais antiga: alunos que só
+    aparecem nas repetidas passam para ela e as chaves de sincronização
+    apontam para ela. Presenças que constavam nas duas saem do resumo.
+    """
+    Attendance = apps.get_model("system", "Attendance")
+    AttendanceRecord = apps.get_model("system", "AttendanceRecord")
+    AttendanceSync = apps.get_model("system", "AttendanceSync")
+    AttendanceSummary = apps.get_model("system", "AttendanceSummary")
+
+    sessions = ("teacher_id", "team_id", "subject_id", "date")
+    duplicated = (
+        Attendance.objects.values(*sessions)
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    for session in duplicated:
+        kept, *extras = Attendance.objects.filter(
+            **{field: session[field] for field in sessions}
+        ).order_by("id")
+        presence = _presence(AttendanceRecord, kept)
+        dropped = Counter()
+        for extra in extras:
+            for student_id, present in _presence(AttendanceRecord, extra).items():
+                if student_id in presence:
+                    dropped[student_id, present] += 1
+                else:
+                    presence[student_id] = present
+
+        if kept.presence is not None:
+            kept.roster, kept.presence = pack_roll_call(presence)
+            kept.save(update_fields=["roster", "presence"])
+        else:
+            AttendanceRecord.objects.bulk_create(
+                [
+                    AttendanceRecord(
+                        attendance_id=kept.pk, student_id=student_id, present=present
+                    )
+                    for student_id, present in presence.items()
+                ],
+                ignore_conflicts=True,
+            )
+
+        for (student_id, present), count in dropped.items():
+            field = "presences" if present else "absences"
+            AttendanceSummary.objects.filter(
+                student_id=student_id,
+                subject_id=kept.subject_id,
+                month=kept.date.replace(day=1),
+            ).update(**{field: F(field) - count})
+
+        AttendanceSync.objects.filter(attendance__in=extras).update(attendance=kept)
+        Attendance.objects.filter(pk__in=[extra.pk for extra in extras]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0015_registration_sequence"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_sessions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # separada de 0016: o Postgres não altera a tabela na mesma transação
+    # em que apagou linhas com chaves estrangeiras pendentes
+    dependencies = [
+        ("system", "0016_merge_duplicate_attendances"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="attendance",
+            name="attendance_session_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="attendance",
+            constraint=models.UniqueConstraint(
+                fields=("teacher", "team", "subject", "date"),
+                name="unique_attendance_session",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.27 on 2026-10-18 21:22
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0017_attendance_session_unique"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="attendance",
+            name="roster",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.BigIntegerField(), blank=True, default=list, size=None
+            ),
+        ),
+    ]
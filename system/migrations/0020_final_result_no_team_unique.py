@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_results(apps, schema_editor):
+    FinalResult = apps.get_model("system", "FinalResult")
+
+    # retomadas do close_year regravavam os resultados sem turma; fica o
+    # primeiro de cada aluno/matéria/ano
+    first = (
+        FinalResult.objects.filter(team__isnull=True)
+        .values("student_id", "subject_id", "year")
+        .annotate(first_id=Min("id"))
+        .values_list("first_id", flat=True)
+    )
+    FinalResult.objects.filter(team__isnull=True).exclude(id__in=first).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0019_cache_table"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="finalresult",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(team__isnull=True),
+                fields=("student", "subject", "year"),
+                name="unique_final_result_no_team",
+            ),
+        ),
+    ]
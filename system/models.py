@@ -1,14 +1,139 @@
+import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
 from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
 
-from .utiuls.functions import generate_unique_registration_number, send_welcome_email
+from .bitmaps import unpack_roll_call
+from .grading import get_grading_policy
 
 # senha_geral: Abc123@00
 
+# Desliga a atualização por linha dos resumos (GradeSummary, AttendanceSummary)
+# enquanto um caminho em lote recalcula tudo de uma vez no final.
+summary_refresh_suspended = ContextVar("summary_refresh_suspended", default=False)
+
+
+@contextmanager
+def suspend_summary_refresh():
+    token = summary_refresh_suspended.set(True)
+    try:
+        yield
+    finally:
+        summary_refresh_suspended.reset(token)
+
+
+# Matrículas novas saem desta sequência, em ordem e sem repetir. Matrículas
+# antigas (sorteadas ou digitadas) que caem no caminho são puladas.
+REGISTRATION_SEQUENCE = "system_customuser_registration_seq"
+
+ALLOCATE_REGISTRATION_SQL = """
+SELECT number FROM (
+    SELECT lpad(nextval('{sequence}')::text, 8, '0') AS number
+    FROM generate_series(1, %s)
+) AS reserved
+WHERE NOT EXISTS (
+    SELECT 1 FROM {table} u WHERE u.registration_number = reserved.number
+)
+ORDER BY number
+"""
+
 
 class CustomUserManager(BaseUserManager):
+    def allocate_registration_numbers(self, count: int, taken=()) -> list:
+        """
+        Reserva `count` matrículas livres de 8 dígitos numa consulta: um bloco
+        da sequência, menos as que já pertencem a alguém (ou estão em
+        `taken`). Só consulta de novo para repor as puladas.
+        """
+        connection = connections[self.db]
+        sql = ALLOCATE_REGISTRATION_SQL.format(
+            sequence=REGISTRATION_SEQUENCE,
+            table=connection.ops.quote_name(self.model._meta.db_table),
+        )
+        taken = set(taken)
+        numbers = []
+        with connection.cursor() as cursor:
+            while len(numbers) < count:
+                cursor.execute(sql, [count - len(numbers)])
+                numbers += [n for (n,) in cursor.fetchall() if n not in taken]
+        return numbers
+
+    def bulk_create_users(self, users, password=None, batch_size: int = 1000):
+        """
+        Cria muitos usuários de uma vez: matrículas (as que faltam) reservadas
+        num bloco, username derivado delas, senha inicial com um único hash
+        (sem senha, o usuário fica sem senha utilizável), INSERTs em lote e os
+        e-mails de boas-vindas na fila. Devolve os usuários criados.
+
+        Um username derivado que já pertence a alguém (usuário antigo
+        renomeado) faz o usuário receber outra matrícula; se o username ou
+        a matrícula vieram prontos, levanta ValueError.
+        """
+        # import local: system.tasks importa os modelos
+        from .tasks import task_queue_settings
+
+        users = list(users)
+        derived = [user for user in users if not user.username]
+        automatic = {id(user) for user in derived if not user.registration_number}
+        pending = [user for user in users if not user.registration_number]
+        taken = {user.registration_number for user in users}
+        while True:
+            numbers = self.allocate_registration_numbers(len(pending), taken=taken)
+            taken.update(numbers)
+            for user, number in zip(pending, numbers):
+                user.registration_number = number
+            for user in derived:
+                user.username = f"user_{user.registration_number}"
+
+            in_use = set(
+                self.filter(username__in=[user.username for user in users]).values_list(
+                    "username", flat=True
+                )
+            )
+            clashes = [user for user in users if user.username in in_use]
+            if not clashes:
+                break
+            fixed = sorted(u.username for u in clashes if id(u) not in automatic)
+            if fixed:
+                raise ValueError(f"Usernames já em uso: {', '.join(fixed)}")
+            pending = clashes
+
+        password_hash = make_password(password) if password else None
+        max_attempts = task_queue_settings()["MAX_ATTEMPTS"]
+        for user in users:
+            if not user.password:
+                if password_hash:
+                    user.password = password_hash
+                else:
+                    user.set_unusable_password()
+
+        with transaction.atomic(using=self.db):
+            created = self.bulk_create(users, batch_size=batch_size)
+            # a tarefa não faz nada para quem não tem e-mail
+            Task.objects.bulk_create(
+                (
+                    Task(
+                        name="welcome_email",
+                        payload={"user_id": user.pk},
+                        max_attempts=max_attempts,
+                    )
+                    for user in created
+                    if user.email
+                ),
+                batch_size=batch_size,
+            )
+        return created
+
     def create_user(
         self, registration_number, email=None, password=None, **extra_fields
     ):
@@ -56,6 +181,8 @@ class CustomUser(AbstractUser):
         ("professor", "Professor"),
     ]
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    # marca d'água dos avisos das turmas: tudo até aqui conta como lido
+    announcements_read_at = models.DateTimeField(null=True, blank=True)
 
     USERNAME_FIELD = "registration_number"
     REQUIRED_FIELDS = ["first_name", "last_name", "email"]
@@ -69,21 +196,18 @@ class CustomUser(AbstractUser):
         is_new = self._state.adding
         # Garantir primeiro um registration_number único, depois gerar username a partir dele.
         if not self.registration_number:
-            self.registration_number = generate_unique_registration_number()
-            while CustomUser.objects.filter(
-                registration_number=self.registration_number
-            ).exists():
-                self.registration_number = generate_unique_registration_number()
+            self.registration_number = CustomUser.objects.allocate_registration_numbers(
+                1
+            )[0]
         if not self.username:
             self.username = f"user_{self.registration_number}"
-        if is_new:
-            try:
-                send_welcome_email(
-                    self.first_name, self.email, self.registration_number
-                )
-            except Exception:
-                pass
         super().save(*args, **kwargs)
+        if is_new:
+            # import local: system.tasks importa os modelos
+            from .tasks import enqueue
+
+            # e-mail enviado pelo worker (system/tasks.py), fora da requisição
+            enqueue("welcome_email", user_id=self.pk)
 
 
 class Team(models.Model):
@@ -129,18 +253,136 @@ class Subject(models.Model):
                 )
 
 
+class GradeQuerySet(models.QuerySet):
+    """
+    Mantém o GradeSummary sincronizado também nos caminhos em lote,
+    que não disparam os sinais de save/delete.
+    """
+
+    SUMMARY_KEY_FIELDS = {
+        "student",
+        "student_id",
+        "subject",
+        "subject_id",
+        "team",
+        "team_id",
+        "bimonthly",
+        "bimonthly_id",
+    }
+
+    def by_bimonthly(self, student, subject, team, year: int) -> dict:
+        """
+        Notas do aluno na matéria/turma no ano letivo, indexadas pelo id do
+        bimestre, em uma única consulta.
+        """
+        grades = (
+            self.filter(
+                student=student, subject=subject, team=team, bimonthly__year=year
+            )
+            .select_related("bimonthly")
+            .order_by("bimonthly__number")
+        )
+        return {grade.bimonthly_id: grade for grade in grades}
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        GradeSummary.objects.refresh_for_grades(objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        keys = set()
+        if set(fields) & self.SUMMARY_KEY_FIELDS:
+            keys = GradeSummary.objects.keys_for_queryset(
+                self.filter(pk__in=[obj.pk for obj in objs])
+            )
+        with suspend_summary_refresh():
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+        keys |= GradeSummary.objects.keys_for_grades(objs)
+        GradeSummary.objects.refresh(keys)
+        return rows
+
+    def bulk_save(self, to_create, to_update, fields):
+        """
+        Grava notas novas e alteradas em uma única transação e recalcula os
+        resumos uma só vez. As notas alteradas não podem mudar de chave.
+        """
+        with transaction.atomic():
+            with suspend_summary_refresh():
+                if to_update:
+                    super().bulk_update(to_update, fields)
+                if to_create:
+                    super().bulk_create(to_create)
+            GradeSummary.objects.refresh_for_grades([*to_create, *to_update])
+
+    bulk_save.alters_data = True
+
+    def update(self, **kwargs):
+        if summary_refresh_suspended.get():
+            return super().update(**kwargs)
+
+        pks = list(self.values_list("pk", flat=True))
+        keys = GradeSummary.objects.keys_for_queryset(self)
+        rows = super().update(**kwargs)
+        keys |= GradeSummary.objects.keys_for_queryset(Grade.objects.filter(pk__in=pks))
+        GradeSummary.objects.refresh(keys)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        keys = GradeSummary.objects.keys_for_queryset(self)
+        with suspend_summary_refresh():
+            result = super().delete()
+        GradeSummary.objects.refresh(keys)
+        return result
+
+    delete.alters_data = True
+
+
 class Grade(models.Model):
+    # sem índice próprio nas FKs cobertas pelo início dos índices compostos
     student = models.ForeignKey(
-        "CustomUser", on_delete=models.CASCADE, limit_choices_to={"role": "aluno"}
+        "CustomUser",
+        on_delete=models.CASCADE,
+        limit_choices_to={"role": "aluno"},
+        db_index=False,
     )
     subject = models.ForeignKey("Subject", on_delete=models.CASCADE)
-    team = models.ForeignKey("Team", on_delete=models.CASCADE, null=True, blank=True)
+    team = models.ForeignKey(
+        "Team", on_delete=models.CASCADE, null=True, blank=True, db_index=False
+    )
     value_activity = models.FloatField()
     value_proof = models.FloatField()
     average = models.FloatField(null=True, blank=True)
     bimonthly = models.ForeignKey("Bimonthly", on_delete=models.CASCADE)
     registration_date = models.DateTimeField(auto_now_add=True)
 
+    objects = GradeQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "subject", "team", "bimonthly"],
+                name="unique_grade",
+            )
+        ]
+        indexes = [
+            # diário de classe e estatísticas: notas da turma numa matéria
+            models.Index(
+                fields=["team", "subject", "bimonthly"], name="grade_team_subject_idx"
+            )
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda a chave original para atualizar o resumo antigo se ela mudar.
+        instance._loaded_summary_key = instance.summary_row()
+        return instance
+
+    def summary_row(self):
+        return (self.student_id, self.subject_id, self.team_id, self.bimonthly_id)
+
     def __str__(self):
         return f"{self.student.first_name} {self.student.last_name} ({self.bimonthly}) - {self.subject.name}: {self.average}"
 
@@ -150,8 +392,12 @@ class Grade(models.Model):
         if self.value_activity > 10.0 or self.value_proof > 10.0:
             raise ValidationError("Nenhuma nota pode ser maior que 10.0.")
 
-    def save(self, *args, **kwargs):
+    def compute_average(self) -> float:
         self.average = (self.value_activity + self.value_proof) / 2
+        return self.average
+
+    def save(self, *args, **kwargs):
+        self.compute_average()
         super().save(*args, **kwargs)
 
 
@@ -170,26 +416,834 @@ class Bimonthly(models.Model):
         return f"{self.number}º Bimestre/{self.year}"
 
 
+class GradeSummaryManager(models.Manager):
+    def keys_for_grades(self, grades):
+        return self.keys_for_rows(
+            (g.student_id, g.subject_id, g.team_id, g.bimonthly_id) for g in grades
+        )
+
+    def keys_for_rows(self, rows):
+        """
+        Converte linhas (aluno, matéria, turma, bimestre) em chaves
+        (aluno, matéria, turma, ano) do resumo.
+        """
+        rows = list(rows)
+        years = dict(
+            Bimonthly.objects.filter(id__in={r[3] for r in rows}).values_list(
+                "id", "year"
+            )
+        )
+        return {
+            (student_id, subject_id, team_id, years[bimonthly_id])
+            for student_id, subject_id, team_id, bimonthly_id in rows
+            if bimonthly_id in years
+        }
+
+    def keys_for_queryset(self, queryset):
+        return set(
+            queryset.values_list(
+                "student_id", "subject_id", "team_id", "bimonthly__year"
+            ).distinct()
+        )
+
+    def refresh_for_grades(self, grades):
+        self.refresh(self.keys_for_grades(grades))
+
+    def refresh(self, keys):
+        """
+        Recalcula os resumos das chaves informadas a partir das notas.
+        Custa um número fixo de consultas, independente de quantas chaves.
+        """
+        keys = set(keys)
+        if not keys:
+            return
+
+        key_filter = models.Q()
+        for student_id, subject_id, team_id, year in keys:
+            key_filter |= models.Q(
+                student_id=student_id,
+                subject_id=subject_id,
+                team_id=team_id,
+                year=year,
+            )
+
+        grades_by_key = {key: {} for key in keys}
+        grade_rows = Grade.objects.filter(
+            student_id__in={k[0] for k in keys},
+            subject_id__in={k[1] for k in keys},
+            bimonthly__year__in={k[3] for k in keys},
+        ).values_list(
+            "student_id",
+            "subject_id",
+            "team_id",
+            "bimonthly__year",
+            "bimonthly__number",
+            "average",
+        )
+        for student_id, subject_id, team_id, year, number, average in grade_rows:
+            key = (student_id, subject_id, team_id, year)
+            if key in grades_by_key and average is not None:
+                grades_by_key[key][str(number)] = average
+
+        existing = {
+            (s.student_id, s.subject_id, s.team_id, s.year): s
+            for s in self.filter(key_filter)
+        }
+
+        to_create, to_update, to_delete = [], [], []
+        for key, averages in grades_by_key.items():
+            summary = existing.get(key)
+            if not averages:
+                if summary:
+                    to_delete.append(summary.pk)
+                continue
+
+            if summary is None:
+                summary = self.model(
+                    student_id=key[0], subject_id=key[1], team_id=key[2], year=key[3]
+                )
+                to_create.append(summary)
+            else:
+                to_update.append(summary)
+
+        summaries = [*to_create, *to_update]
+        attendance = None
+        if get_grading_policy().min_attendance is not None:
+            rates = AttendanceSummary.objects.yearly_rates(keys)
+            attendance = [
+                rates.get((s.student_id, s.subject_id, s.year), np.nan)
+                for s in summaries
+            ]
+        GradeSummary.fill_many(
+            summaries,
+            [
+                grades_by_key[(s.student_id, s.subject_id, s.team_id, s.year)]
+                for s in summaries
+            ],
+            attendance,
+        )
+
+        with transaction.atomic():
+            if to_delete:
+                self.filter(pk__in=to_delete).delete()
+            if to_update:
+                self.bulk_update(to_update, GradeSummary.COMPUTED_FIELDS)
+            if to_create:
+                self.bulk_create(to_create)
+
+
+class GradeSummary(models.Model):
+    """
+    Resumo das notas de um aluno em uma matéria/turma/ano, mantido a cada
+    alteração de Grade para que as páginas de notas não recalculem nada.
+    """
+
+    COMPUTED_FIELDS = [
+        "grade_count",
+        "grade_total",
+        "average",
+        "bimonthly_averages",
+        "is_approved",
+        "is_under_review",
+    ]
+
+    student = models.ForeignKey(
+        "CustomUser", on_delete=models.CASCADE, related_name="grade_summaries"
+    )
+    subject = models.ForeignKey("Subject", on_delete=models.CASCADE)
+    team = models.ForeignKey("Team", on_delete=models.CASCADE, null=True, blank=True)
+    year = models.IntegerField()
+    grade_count = models.PositiveSmallIntegerField(default=0)
+    grade_total = models.FloatField(default=0)
+    average = models.FloatField(null=True, blank=True)
+    bimonthly_averages = models.JSONField(default=dict, blank=True)
+    is_approved = models.BooleanField(default=False)
+    is_under_review = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = GradeSummaryManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "subject", "team", "year"],
+                name="unique_grade_summary",
+            )
+        ]
+
+    def __str__(self):
+        return f"Resumo {self.student_id} - {self.subject_id} ({self.year}): {self.average}"
+
+    @staticmethod
+    def fill_many(summaries, averages_list, attendance=None) -> None:
+        """
+        Preenche os campos calculados a partir de {bimestre: média},
+        avaliando a política de aprovação de todos os resumos de uma vez,
+        com a frequência anual de cada um (NaN onde não há chamadas).
+        """
+        policy = get_grading_policy()
+        result = policy.evaluate(
+            policy.grades_matrix(averages_list), attendance=attendance
+        )
+
+        for i, (summary, averages) in enumerate(zip(summaries, averages_list)):
+            summary.bimonthly_averages = dict(sorted(averages.items()))
+            summary.grade_count = len(averages)
+            summary.grade_total = sum(averages.values())
+            average = result.average[i]
+            summary.average = None if np.isnan(average) else float(average)
+            summary.is_approved = bool(result.approved[i])
+            summary.is_under_review = bool(result.under_review[i])
+
+    @property
+    def status(self) -> str:
+        return "Aprovado" if self.is_approved else "Reprovado"
+
+
+class YearClosingManager(models.Manager):
+    def is_closed(self, year: int) -> bool:
+        return self.filter(year=year, finished_at__isnull=False).exists()
+
+
+class YearClosing(models.Model):
+    """Encerramento do ano letivo. Enquanto finished_at é nulo, pode ser retomado."""
+
+    year = models.IntegerField(unique=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    total_results = models.PositiveIntegerField(default=0)
+
+    objects = YearClosingManager()
+
+    def __str__(self):
+        status = "encerrado" if self.finished_at else "em andamento"
+        return f"Encerramento {self.year} ({status})"
+
+
+class FinalResultQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise ValidationError("Resultados de ano encerrado não podem ser alterados.")
+
+    def delete(self):
+        raise ValidationError("Resultados de ano encerrado não podem ser apagados.")
+
+
+class FinalResult(models.Model):
+    """
+    Situação final imutável de um aluno em uma matéria/turma, gravada pelo
+    close_year. Tem os mesmos campos de leitura do GradeSummary, para que as
+    páginas e exportações de anos encerrados leiam daqui.
+    """
+
+    student = models.ForeignKey(
+        "CustomUser", on_delete=models.PROTECT, related_name="final_results"
+    )
+    subject = models.ForeignKey("Subject", on_delete=models.PROTECT)
+    team = models.ForeignKey("Team", on_delete=models.PROTECT, null=True, blank=True)
+    year = models.IntegerField()
+    grade_count = models.PositiveSmallIntegerField()
+    average = models.FloatField(null=True, blank=True)
+    bimonthly_averages = models.JSONField(default=dict, blank=True)
+    attendance = models.FloatField(null=True, blank=True)
+    is_approved = models.BooleanField()
+    is_under_review = models.BooleanField()
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    objects = FinalResultQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "subject", "team", "year"],
+                name="unique_final_result",
+            ),
+            # o índice acima não barra repetidos com team NULL
+            models.UniqueConstraint(
+                fields=["student", "subject", "year"],
+                condition=models.Q(team__isnull=True),
+                name="unique_final_result_no_team",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Resultado {self.student_id} - {self.subject_id} ({self.year}): {self.status}"
+
+    @property
+    def status(self) -> str:
+        return "Aprovado" if self.is_approved else "Reprovado"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError(
+                "Resultados de ano encerrado não podem ser alterados."
+            )
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Resultados de ano encerrado não podem ser apagados.")
+
+
+class AttendanceQuerySet(models.QuerySet):
+    def absences_of(self, student):
+        """
+        Chamadas em que o aluno faltou, qualquer que seja o armazenamento:
+        registro em linha com present=False ou bit zerado no bitset.
+
+        Os dois lados vão num UNION (e não num OR) para que cada um use o
+        seu índice: (student, present) nas linhas e o GIN do roster.
+        """
+        absent_rows = AttendanceRecord.objects.filter(
+            student=student, present=False
+        ).values("attendance_id")
+        position = models.Func(
+            models.F("roster"), models.Value(student.pk), function="array_position"
+        )
+        absent_bits = (
+            Attendance.objects.annotate(
+                roster_bit=models.Func(
+                    models.F("presence"),
+                    position - 1,
+                    function="get_bit",
+                    output_field=models.IntegerField(),
+                )
+            )
+            .filter(presence__isnull=False, roster__contains=[student.pk], roster_bit=0)
+            .values("pk")
+        )
+        return self.filter(pk__in=absent_rows.union(absent_bits, all=True))
+
+
 class Attendance(models.Model):
+    # coberto por unique_attendance_session
     teacher = models.ForeignKey(
-        "CustomUser", on_delete=models.CASCADE, limit_choices_to={"role": "professor"}
+        "CustomUser",
+        on_delete=models.CASCADE,
+        limit_choices_to={"role": "professor"},
+        db_index=False,
     )
     team = models.ForeignKey("Team", on_delete=models.CASCADE)
     subject = models.ForeignKey("Subject", on_delete=models.CASCADE)
-    date = models.DateField(auto_now_add=True)
+    # default (e não auto_now_add) para aceitar chamadas feitas offline
+    date = models.DateField(default=datetime.date.today)
+    # Armazenamento compacto (settings.ATTENDANCE_STORAGE = "bitmap"): ids dos
+    # alunos da chamada e um bit de presença por aluno, na mesma ordem, no
+    # lugar de uma linha de AttendanceRecord por aluno.
+    roster = ArrayField(models.BigIntegerField(), default=list, blank=True)
+    presence = models.BinaryField(null=True, blank=True, editable=False)
+
+    objects = AttendanceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["roster"], name="attendance_roster_gin"),
+        ]
+        constraints = [
+            # uma chamada por dia do professor em cada turma e matéria
+            # (fazer_chamada e sincronização dos tablets)
+            models.UniqueConstraint(
+                fields=["teacher", "team", "subject", "date"],
+                name="unique_attendance_session",
+            ),
+        ]
 
     def __str__(self):
         return f"Chamada - {self.team.name} / {self.subject.name} ({self.date})"
 
+    @property
+    def is_compact(self) -> bool:
+        return self.presence is not None
+
+    def presence_map(self) -> dict:
+        """
+        {aluno: presente} da chamada, qualquer que seja o armazenamento.
+        Use prefetch_related("records") ao ler várias chamadas em linhas.
+        """
+        if self.is_compact:
+            return unpack_roll_call(self.roster, self.presence)
+        return {r.student_id: r.present for r in self.records.all()}
+
+
+class AttendanceSync(models.Model):
+    """
+    Chave de idempotência de uma chamada enviada pelos tablets: reenviar a
+    mesma chave devolve a chamada já gravada sem aplicar de novo.
+    """
+
+    teacher = models.ForeignKey("CustomUser", on_delete=models.CASCADE)
+    key = models.CharField(max_length=64)
+    attendance = models.ForeignKey(
+        "Attendance", on_delete=models.CASCADE, related_name="syncs"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["teacher", "key"], name="unique_attendance_sync"
+            )
+        ]
+
+
+class AttendanceRecordQuerySet(models.QuerySet):
+    """
+    Mantém o AttendanceSummary sincronizado nos caminhos em lote,
+    que não disparam os sinais de save/delete.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if not summary_refresh_suspended.get():
+            AttendanceSummary.objects.refresh_for_records(objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        keys = AttendanceSummary.objects.keys_for_queryset(
+            self.filter(pk__in=[obj.pk for obj in objs])
+        )
+        with suspend_summary_refresh():
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+        keys |= AttendanceSummary.objects.keys_for_records(objs)
+        AttendanceSummary.objects.refresh(keys)
+        return rows
+
+    def update(self, **kwargs):
+        if summary_refresh_suspended.get():
+            return super().update(**kwargs)
+
+        pks = list(self.values_list("pk", flat=True))
+        keys = AttendanceSummary.objects.keys_for_queryset(self)
+        rows = super().update(**kwargs)
+        keys |= AttendanceSummary.objects.keys_for_queryset(
+            AttendanceRecord.objects.filter(pk__in=pks)
+        )
+        AttendanceSummary.objects.refresh(keys)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        keys = AttendanceSummary.objects.keys_for_queryset(self)
+        with suspend_summary_refresh():
+            result = super().delete()
+        AttendanceSummary.objects.refresh(keys)
+        return result
+
+    delete.alters_data = True
+
 
 class AttendanceRecord(models.Model):
+    # FKs cobertas por unique_attendance_record e attendance_record_student_idx
     attendance = models.ForeignKey(
-        "Attendance", on_delete=models.CASCADE, related_name="records"
+        "Attendance", on_delete=models.CASCADE, related_name="records", db_index=False
     )
     student = models.ForeignKey(
-        "CustomUser", on_delete=models.CASCADE, limit_choices_to={"role": "aluno"}
+        "CustomUser",
+        on_delete=models.CASCADE,
+        limit_choices_to={"role": "aluno"},
+        db_index=False,
     )
     present = models.BooleanField(default=False)
 
+    objects = AttendanceRecordQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["attendance", "student"], name="unique_attendance_record"
+            )
+        ]
+        indexes = [
+            # faltas de um aluno (Attendance.objects.absences_of)
+            models.Index(
+                fields=["student", "present"], name="attendance_record_student_idx"
+            )
+        ]
+
     def __str__(self):
         return f"{self.student.first_name} - {'Presente' if self.present else 'Faltou'}"
+
+
+class AttendanceSummaryManager(models.Manager):
+    def yearly_rates(self, keys) -> dict:
+        """
+        Frequência anual (0 a 1) por (aluno, matéria, ano) para as chaves
+        (aluno, matéria, ..., ano) informadas, numa consulta.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        years = {k[-1] for k in keys}
+        rows = (
+            self.filter(
+                student_id__in={k[0] for k in keys},
+                subject_id__in={k[1] for k in keys},
+                month__gte=datetime.date(min(years), 1, 1),
+                month__lt=datetime.date(max(years) + 1, 1, 1),
+            )
+            .values_list("student_id", "subject_id", "month__year")
+            .annotate(
+                presences=models.Sum("presences"), absences=models.Sum("absences")
+            )
+        )
+        return {
+            (student_id, subject_id, year): presences / (presences + absences)
+            for student_id, subject_id, year, presences, absences in rows
+            if presences + absences
+        }
+
+    def keys_for_records(self, records):
+        """
+        Chaves (aluno, matéria, mês) dos registros de chamada informados.
+        Só consulta as chamadas que não vieram carregadas nos registros.
+        """
+        records = list(records)
+        attendances = {
+            r.attendance_id: (r.attendance.subject_id, r.attendance.date.replace(day=1))
+            for r in records
+            if AttendanceRecord.attendance.is_cached(r)
+        }
+        missing = {r.attendance_id for r in records} - attendances.keys()
+        if missing:
+            attendances.update(
+                (pk, (subject_id, date.replace(day=1)))
+                for pk, subject_id, date in Attendance.objects.filter(
+                    id__in=missing
+                ).values_list("id", "subject_id", "date")
+            )
+        return {
+            (r.student_id, *attendances[r.attendance_id])
+            for r in records
+            if r.attendance_id in attendances
+        }
+
+    def keys_for_queryset(self, queryset):
+        return set(
+            queryset.values_list(
+                "student_id",
+                "attendance__subject_id",
+                TruncMonth("attendance__date"),
+            ).distinct()
+        )
+
+    def refresh_for_records(self, records):
+        self.refresh(self.keys_for_records(records))
+
+    def refresh(self, keys):
+        """
+        Recalcula presenças e faltas das chaves informadas a partir dos
+        registros de chamada (em linhas ou compactos), em um número fixo de
+        consultas.
+        """
+        keys = set(keys)
+        if not keys:
+            return
+
+        months = {k[2] for k in keys}
+        last = max(months)
+        end = last.replace(year=last.year + last.month // 12, month=last.month % 12 + 1)
+        counts = {key: (0, 0) for key in keys}
+        rows = (
+            AttendanceRecord.objects.filter(
+                student_id__in={k[0] for k in keys},
+                attendance__subject_id__in={k[1] for k in keys},
+                attendance__date__gte=min(months),
+                attendance__date__lt=end,
+            )
+            .values_list(
+                "student_id", "attendance__subject_id", TruncMonth("attendance__date")
+            )
+            .annotate(
+                presences=models.Count("id", filter=models.Q(present=True)),
+                absences=models.Count("id", filter=models.Q(present=False)),
+            )
+        )
+        for student_id, subject_id, month, presences, absences in rows:
+            key = (student_id, subject_id, month)
+            if key in counts:
+                counts[key] = (presences, absences)
+
+        # chamadas no armazenamento compacto somam por cima das linhas
+        compact = Attendance.objects.filter(
+            presence__isnull=False,
+            subject_id__in={k[1] for k in keys},
+            date__gte=min(months),
+            date__lt=end,
+            roster__overlap=list({k[0] for k in keys}),
+        ).values_list("subject_id", "date", "roster", "presence")
+        for subject_id, date, roster, presence in compact:
+            month = date.replace(day=1)
+            for student_id, present in unpack_roll_call(roster, presence).items():
+                key = (student_id, subject_id, month)
+                if key in counts:
+                    presences, absences = counts[key]
+                    counts[key] = (presences + present, absences + (not present))
+
+        empty = models.Q()
+        summaries = []
+        for (student_id, subject_id, month), (presences, absences) in counts.items():
+            if presences or absences:
+                summaries.append(
+                    self.model(
+                        student_id=student_id,
+                        subject_id=subject_id,
+                        month=month,
+                        presences=presences,
+                        absences=absences,
+                    )
+                )
+            else:
+                empty |= models.Q(
+                    student_id=student_id, subject_id=subject_id, month=month
+                )
+
+        with transaction.atomic():
+            if empty:
+                self.filter(empty).delete()
+            if summaries:
+                self.bulk_create(
+                    summaries,
+                    update_conflicts=True,
+                    unique_fields=["student", "subject", "month"],
+                    update_fields=["presences", "absences", "updated_at"],
+                )
+            if get_grading_policy().min_attendance is not None:
+                self._refresh_grade_summaries(keys)
+
+    def _refresh_grade_summaries(self, keys):
+        # com frequência mínima, a situação nos resumos de notas depende da
+        # chamada: recalcula os do aluno/matéria/ano afetados
+        affected = {(k[0], k[1], k[2].year) for k in keys}
+        grade_keys = {
+            key
+            for key in GradeSummary.objects.filter(
+                student_id__in={k[0] for k in affected},
+                subject_id__in={k[1] for k in affected},
+                year__in={k[2] for k in affected},
+            ).values_list("student_id", "subject_id", "team_id", "year")
+            if (key[0], key[1], key[3]) in affected
+        }
+        GradeSummary.objects.refresh(grade_keys)
+
+
+class AttendanceSummary(models.Model):
+    """
+    Presenças e faltas por aluno, matéria e mês, mantidas a cada chamada.
+    `month` guarda o primeiro dia do mês.
+    """
+
+    student = models.ForeignKey(
+        "CustomUser",
+        on_delete=models.CASCADE,
+        related_name="attendance_summaries",
+    )
+    subject = models.ForeignKey("Subject", on_delete=models.CASCADE)
+    month = models.DateField()
+    presences = models.PositiveIntegerField(default=0)
+    absences = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AttendanceSummaryManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "subject", "month"],
+                name="unique_attendance_summary",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.subject} ({self.month:%m/%Y})"
+
+
+class AbsenceAlert(models.Model):
+    """
+    Limite de faltas já avisado a um aluno numa matéria e ano. Só cruzamentos
+    novos geram aviso; o registro some quando o aluno volta ao limite.
+    """
+
+    RATE = "frequencia"
+    STREAK = "sequencia"
+    KIND_CHOICES = [
+        (RATE, "Frequência abaixo do mínimo"),
+        (STREAK, "Faltas seguidas"),
+    ]
+
+    student = models.ForeignKey(
+        "CustomUser", on_delete=models.CASCADE, related_name="absence_alerts"
+    )
+    subject = models.ForeignKey("Subject", on_delete=models.CASCADE)
+    year = models.IntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    value = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "subject", "year", "kind"],
+                name="unique_absence_alert",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.subject} ({self.get_kind_display()})"
+
+
+class AnnouncementQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Avisos de alguma turma do usuário."""
+        return self.filter(
+            models.Exists(
+                Announcement.teams.through.objects.filter(
+                    announcement=models.OuterRef("pk"), team__members=user
+                )
+            )
+        )
+
+    def unread_for(self, user):
+        """
+        Avisos das turmas do usuário mais novos que a marca d'água e sem
+        marcador de leitura próprio.
+        """
+        announcements = self.for_user(user).exclude(
+            models.Exists(
+                AnnouncementRead.objects.filter(
+                    announcement=models.OuterRef("pk"), user=user
+                )
+            )
+        )
+        if user.announcements_read_at:
+            announcements = announcements.filter(
+                created_at__gt=user.announcements_read_at
+            )
+        return announcements
+
+
+class Announcement(models.Model):
+    """
+    Aviso de um professor para turmas inteiras, gravado uma vez só. Quem leu
+    é calculado na leitura (marca d'água no usuário + AnnouncementRead), em
+    vez de uma Notification por aluno.
+    """
+
+    author = models.ForeignKey(
+        "CustomUser", on_delete=models.CASCADE, related_name="announcements"
+    )
+    teams = models.ManyToManyField("Team", related_name="announcements")
+    title = models.CharField(max_length=100)
+    content = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = AnnouncementQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.title} ({self.created_at:%d/%m/%Y})"
+
+
+class AnnouncementRead(models.Model):
+    """Aviso lido ou dispensado por um usuário depois da sua marca d'água."""
+
+    # coberto por unique_announcement_read
+    user = models.ForeignKey("CustomUser", on_delete=models.CASCADE, db_index=False)
+    announcement = models.ForeignKey(
+        "Announcement", on_delete=models.CASCADE, related_name="reads"
+    )
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "announcement"], name="unique_announcement_read"
+            )
+        ]
+
+
+class TaskManager(models.Manager):
+    def enqueue(self, name: str, payload=None, delay=None, max_attempts=3):
+        """Grava a tarefa na fila; só fica visível ao worker depois do commit."""
+        run_after = timezone.now()
+        if delay:
+            run_after += datetime.timedelta(seconds=delay)
+        return self.create(
+            name=name,
+            payload=payload or {},
+            run_after=run_after,
+            max_attempts=max_attempts,
+        )
+
+    def claim(self, worker: str, limit: int = 1, lock_timeout: int = 600) -> list:
+        """
+        Reserva até `limit` tarefas prontas para o worker. O SKIP LOCKED deixa
+        vários workers disputarem a fila sem pegar a mesma linha; tarefas
+        presas em execução há mais de lock_timeout segundos (worker que
+        morreu) voltam a ser reservadas.
+        """
+        now = timezone.now()
+        stale = now - datetime.timedelta(seconds=lock_timeout)
+        with transaction.atomic():
+            tasks = list(
+                self.select_for_update(skip_locked=True)
+                .filter(
+                    models.Q(status=Task.PENDING, run_after__lte=now)
+                    | models.Q(status=Task.RUNNING, locked_at__lt=stale)
+                )
+                .order_by("run_after", "id")[:limit]
+            )
+            if not tasks:
+                return []
+            self.filter(pk__in=[t.pk for t in tasks]).update(
+                status=Task.RUNNING,
+                locked_by=worker,
+                locked_at=now,
+                attempts=models.F("attempts") + 1,
+            )
+        for task in tasks:
+            task.status, task.locked_by, task.locked_at = Task.RUNNING, worker, now
+            task.attempts += 1
+        return tasks
+
+
+class Task(models.Model):
+    """
+    Tarefa em segundo plano (e-mails, avisos em massa, boletins) executada
+    pelo comando run_worker. Ver system/tasks.py.
+    """
+
+    PENDING = "pendente"
+    RUNNING = "executando"
+    DONE = "concluida"
+    FAILED = "falhou"
+    STATUS_CHOICES = [
+        (PENDING, "Pendente"),
+        (RUNNING, "Em execução"),
+        (DONE, "Concluída"),
+        (FAILED, "Falhou"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = TaskManager()
+
+    class Meta:
+        indexes = [
+            # só a parte viva da fila; concluídas e falhas ficam fora
+            models.Index(
+                fields=["run_after", "id"],
+                condition=models.Q(status__in=["pendente", "executando"]),
+                name="task_queue_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
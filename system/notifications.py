@@ -1,7 +1,263 @@
+import json
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
 from notifications.models import Notification
 
+from .events import publish, team_channel, user_channel
+from .models import Announcement, AnnouncementRead, CustomUser, Subject, Team
+
+# Contador de não lidas por usuário, no cache. Criado com um COUNT na primeira
+# leitura, apagado quando chegam notificações (a leitura seguinte conta de
+# novo) e zerado ao marcar como lidas. O prazo de validade é a reconciliação
+# periódica com o banco.
+UNREAD_COUNT_KEY = "notificacoes:nao_lidas:{}"
+# O mesmo para os avisos das turmas: apagado para os alunos das turmas quando
+# sai um aviso e para o aluno que lê um, zerado junto com o de cima.
+UNREAD_ANNOUNCEMENTS_KEY = "avisos:nao_lidos:{}"
+
+DEFAULT_NOTIFICATION_RETENTION = {
+    # notificações lidas há mais que isso são removidas
+    "DAYS": 180,
+    "BATCH_SIZE": 1000,
+    # pausa entre lotes, em segundos, para não disputar o banco com as telas
+    "PAUSE": 0.1,
+}
+
 
 def get_unread_notifications(user):
     unread_notifications = Notification.objects.unread().filter(recipient=user)
 
     return unread_notifications
+
+
+def attach_senders(notifications) -> None:
+    """
+    Resolve remetente e matéria de uma página de notificações de uma vez: os
+    remetentes numa consulta por tipo (prefetch da GenericForeignKey) e as
+    matérias de todos numa só. Cada notificação ganha `sender_subject`, a
+    primeira matéria do professor que a enviou.
+    """
+    prefetch_related_objects(notifications, "actor")
+    teacher_ids = {n.actor.pk for n in notifications if isinstance(n.actor, CustomUser)}
+    subjects = {}
+    if teacher_ids:
+        links = (
+            Subject.teachers.through.objects.filter(customuser_id__in=teacher_ids)
+            .select_related("subject")
+            .order_by("subject_id")
+        )
+        for link in links:
+            subjects.setdefault(link.customuser_id, link.subject)
+    for notification in notifications:
+        actor = notification.actor
+        notification.sender_subject = (
+            subjects.get(actor.pk) if isinstance(actor, CustomUser) else None
+        )
+
+
+def _unread_count_ttl() -> int:
+    return getattr(settings, "UNREAD_COUNT_TTL", 300)
+
+
+def get_unread_count(user) -> int:
+    return _cached_counts(
+        user, {UNREAD_COUNT_KEY: lambda: get_unread_notifications(user).count()}
+    )
+
+
+def unread_total(user) -> int:
+    """Notificações pessoais + avisos das turmas, os dois contadores em cache."""
+    return _cached_counts(
+        user,
+        {
+            UNREAD_COUNT_KEY: lambda: get_unread_notifications(user).count(),
+            UNREAD_ANNOUNCEMENTS_KEY: lambda: Announcement.objects.unread_for(
+                user
+            ).count(),
+        },
+    )
+
+
+def _cached_counts(user, counters) -> int:
+    """
+    Soma os contadores do usuário lidos do cache numa leitura só; os que
+    faltam são contados no banco e guardados.
+    """
+    keys = {key.format(user.pk): count for key, count in counters.items()}
+    cached = cache.get_many(keys)
+    for key, count in keys.items():
+        if key not in cached:
+            cached[key] = count()
+            # add e não set: não sobrescreve o zero de quem marcou como lidas
+            # enquanto esta leitura contava
+            cache.add(key, cached[key], _unread_count_ttl())
+    return sum(cached.values())
+
+
+def invalidate_unread_counts(recipient_ids) -> None:
+    """
+    Apaga os contadores dos destinatários, depois do commit, e avisa as
+    páginas abertas deles. Apagar em vez de somar funciona com qualquer
+    backend: o incr do cache em banco não é atômico e perderia envios
+    simultâneos de processos diferentes.
+    """
+    counts = Counter(recipient_ids)
+    keys = [UNREAD_COUNT_KEY.format(user_id) for user_id in counts]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+    by_total = {}
+    for user_id, total in counts.items():
+        by_total.setdefault(total, []).append(user_channel(user_id))
+    for total, channels in by_total.items():
+        publish(channels, "notificacao", {"novas": total})
+
+
+def invalidate_unread_announcements(user_ids) -> None:
+    """Apaga os contadores de avisos dos usuários, depois do commit."""
+    keys = [UNREAD_ANNOUNCEMENTS_KEY.format(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def publish_announcement(announcement, teams) -> None:
+    """
+    Apaga os contadores de avisos dos alunos das turmas e avisa as páginas
+    abertas deles sobre o aviso novo.
+    """
+    invalidate_unread_announcements(
+        Team.members.through.objects.filter(
+            team_id__in=[team.pk for team in teams]
+        ).values_list("customuser_id", flat=True)
+    )
+    publish(
+        [team_channel(team.pk) for team in teams],
+        "aviso",
+        {
+            "id": announcement.pk,
+            "title": announcement.title,
+            "author": announcement.author.get_full_name(),
+            "created_at": announcement.created_at.isoformat(),
+        },
+    )
+
+
+def reset_unread_count(user) -> None:
+    keys = (UNREAD_COUNT_KEY, UNREAD_ANNOUNCEMENTS_KEY)
+    transaction.on_commit(
+        lambda: cache.set_many(
+            {key.format(user.pk): 0 for key in keys}, _unread_count_ttl()
+        )
+    )
+
+
+def build_notification(
+    recipient_id, actor, verb, description="", target=None, level="info"
+):
+    """
+    Monta uma Notification sem gravar, para inserção em lote com
+    Notification.objects.bulk_create (o notify.send grava uma por vez).
+    """
+    notification = Notification(
+        recipient_id=recipient_id,
+        actor_content_type=ContentType.objects.get_for_model(actor),
+        actor_object_id=str(actor.pk),
+        verb=verb,
+        description=description,
+        level=level,
+    )
+    if target is not None:
+        notification.target_content_type = ContentType.objects.get_for_model(target)
+        notification.target_object_id = str(target.pk)
+    return notification
+
+
+def bulk_notify(recipient_ids, actor, verb, description="", target=None, level="info"):
+    """
+    Envia a mesma notificação a vários usuários com um único INSERT. Os
+    campos genéricos (actor/target) são resolvidos uma vez, no modelo, e
+    copiados para cada destinatário. Devolve quantas foram criadas.
+    """
+    template = build_notification(None, actor, verb, description, target, level)
+    fields = {
+        field.attname: getattr(template, field.attname)
+        for field in Notification._meta.concrete_fields
+        if not field.primary_key and field.attname != "recipient_id"
+    }
+    recipient_ids = list(recipient_ids)
+    Notification.objects.bulk_create(
+        Notification(recipient_id=recipient_id, **fields)
+        for recipient_id in recipient_ids
+    )
+    invalidate_unread_counts(recipient_ids)
+    return len(recipient_ids)
+
+
+def mark_all_as_read(user) -> None:
+    """
+    Marca como lidas as notificações do usuário e os avisos das turmas. Nos
+    avisos basta avançar a marca d'água; os marcadores individuais abaixo
+    dela deixam de ser necessários.
+    """
+    with transaction.atomic():
+        Notification.objects.mark_all_as_read(recipient=user)
+        user.announcements_read_at = timezone.now()
+        user.save(update_fields=["announcements_read_at"])
+        AnnouncementRead.objects.filter(user=user).delete()
+    reset_unread_count(user)
+    # outras abas abertas do mesmo usuário zeram o contador
+    publish([user_channel(user.pk)], "contagem", {"total": 0})
+
+
+def notification_retention_settings() -> dict:
+    return {
+        **DEFAULT_NOTIFICATION_RETENTION,
+        **getattr(settings, "NOTIFICATION_RETENTION", {}),
+    }
+
+
+def prune_read_notifications(
+    before, batch_size: int = 1000, pause: float = 0, archive=None, progress=None
+) -> int:
+    """
+    Apaga as notificações lidas enviadas antes de `before`, em lotes por id
+    com uma transação curta cada, para não segurar bloqueios que atrasem as
+    telas. Com `archive` (arquivo de texto aberto), cada notificação é
+    gravada nele como uma linha JSON, e o lote vai para o disco (fsync)
+    antes de ser apagado: o que o banco apagou está no arquivo. Não lidas nunca
+    são apagadas, então os contadores não mudam. Devolve quantas removeu.
+    """
+    old = Notification.objects.filter(unread=False, timestamp__lt=before)
+
+    removed, last_pk = 0, 0
+    while True:
+        with transaction.atomic():
+            batch = old.filter(pk__gt=last_pk).order_by("pk")[:batch_size]
+            if archive is not None:
+                rows = list(batch.values())
+                ids = [row["id"] for row in rows]
+                for row in rows:
+                    archive.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+            else:
+                ids = list(batch.values_list("pk", flat=True))
+            if not ids:
+                break
+            last_pk = ids[-1]
+            if archive is not None:
+                archive.flush()
+                os.fsync(archive.fileno())
+            Notification.objects.filter(pk__in=ids).delete()
+        removed += len(ids)
+        if progress:
+            progress(removed)
+        if pause:
+            time.sleep(pause)
+    return removed
@@ -0,0 +1,254 @@
+import io
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Sum
+from django.utils.text import slugify
+
+from .attendance import year_range
+from .grading import get_grading_policy
+from .models import (
+    AttendanceSummary,
+    FinalResult,
+    Grade,
+    Subject,
+    Team,
+    YearClosing,
+)
+
+REPORT_CARDS_DIR = "boletins"
+
+
+def collect_report_cards(teams, year: int, bimonthly: int) -> list:
+    """
+    Reúne os dados dos boletins de todas as turmas em poucas consultas:
+    alunos, notas até o bimestre informado e faltas por matéria.
+    Devolve dicionários simples, prontos para serem enviados aos processos.
+    """
+    team_ids = [team.id for team in teams]
+    team_names = {team.id: team.name for team in teams}
+    subjects = dict(Subject.objects.values_list("id", "name"))
+
+    cards = {}
+    members = Team.members.through.objects.filter(team_id__in=team_ids).values_list(
+        "team_id",
+        "customuser_id",
+        "customuser__registration_number",
+        "customuser__first_name",
+        "customuser__last_name",
+    )
+    for team_id, student_id, registration_number, first_name, last_name in members:
+        cards[(team_id, student_id)] = {
+            "team": team_names[team_id],
+            "year": year,
+            "bimonthly": bimonthly,
+            "registration_number": registration_number,
+            "name": f"{first_name} {last_name}".strip(),
+            "subjects": defaultdict(
+                lambda: {"grades": {}, "absences": 0, "classes": 0}
+            ),
+        }
+
+    closed = YearClosing.objects.is_closed(year)
+    if closed:
+        _fill_from_final_results(cards, subjects, team_ids, year, bimonthly)
+    else:
+        grades = Grade.objects.filter(
+            team_id__in=team_ids,
+            bimonthly__year=year,
+            bimonthly__number__lte=bimonthly,
+        ).values_list(
+            "team_id", "student_id", "subject_id", "bimonthly__number", "average"
+        )
+        for team_id, student_id, subject_id, number, average in grades:
+            card = cards.get((team_id, student_id))
+            if card:
+                card["subjects"][subjects[subject_id]]["grades"][number] = average
+
+    # faltas do resumo mensal, que cobre chamadas em linhas e compactas
+    cards_by_student = {}
+    for (team_id, student_id), card in cards.items():
+        cards_by_student.setdefault(student_id, []).append(card)
+
+    start, end = year_range(year)
+    absences = (
+        AttendanceSummary.objects.filter(
+            student_id__in=cards_by_student, month__gte=start, month__lt=end
+        )
+        .values_list("student_id", "subject_id")
+        .annotate(presences=Sum("presences"), absences=Sum("absences"))
+    )
+    for student_id, subject_id, presences, total_absences in absences:
+        for card in cards_by_student[student_id]:
+            subject = card["subjects"][subjects[subject_id]]
+            subject["classes"] = presences + total_absences
+            subject["absences"] = total_absences
+
+    result = []
+    for card in cards.values():
+        card["subjects"] = dict(sorted(card["subjects"].items()))
+        result.append(card)
+
+    all_subjects = [data for card in result for data in card["subjects"].values()]
+    if closed:
+        # matérias só com faltas não têm resultado final
+        for data in all_subjects:
+            data.setdefault("average", None)
+            data.setdefault("status", _status(False, True))
+    else:
+        _apply_grading_policy(all_subjects)
+    return result
+
+
+def _status(approved, under_review) -> str:
+    if under_review:
+        return "Em análise"
+    return "Aprovado" if approved else "Reprovado"
+
+
+def _fill_from_final_results(cards, subjects, team_ids, year, bimonthly):
+    """Ano encerrado: notas, média e situação vêm do FinalResult, sem recalcular."""
+    snapshots = FinalResult.objects.filter(team_id__in=team_ids, year=year).values_list(
+        "team_id",
+        "student_id",
+        "subject_id",
+        "bimonthly_averages",
+        "average",
+        "is_approved",
+        "is_under_review",
+    )
+    for (
+        team_id,
+        student_id,
+        subject_id,
+        averages,
+        average,
+        approved,
+        review,
+    ) in snapshots:
+        card = cards.get((team_id, student_id))
+        if card is None:
+            continue
+        data = card["subjects"][subjects[subject_id]]
+        data["grades"] = {
+            int(number): value
+            for number, value in averages.items()
+            if int(number) <= bimonthly
+        }
+        data["average"] = average
+        data["status"] = _status(approved, review)
+
+
+def _apply_grading_policy(subjects: list) -> None:
+    """Calcula média final e situação de todas as matérias numa só avaliação."""
+    if not subjects:
+        return
+
+    policy = get_grading_policy()
+    classes = np.array([s["classes"] for s in subjects], dtype=float)
+    absences = np.array([s["absences"] for s in subjects], dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        attendance = np.where(classes > 0, (classes - absences) / classes, np.nan)
+
+    evaluation = policy.evaluate(
+        policy.grades_matrix([s["grades"] for s in subjects]), attendance=attendance
+    )
+    for i, data in enumerate(subjects):
+        average = evaluation.average[i]
+        data["average"] = None if np.isnan(average) else float(average)
+        data["status"] = _status(evaluation.approved[i], evaluation.under_review[i])
+
+
+def render_report_card(card: dict) -> bytes:
+    """Gera o PDF de um boletim. Roda nos processos do pool."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawString(50, height - 60, "Boletim Escolar")
+    pdf.setFont("Helvetica", 11)
+    pdf.drawString(50, height - 85, f"Aluno: {card['name']}")
+    pdf.drawString(50, height - 100, f"Matrícula: {card['registration_number']}")
+    pdf.drawString(
+        50,
+        height - 115,
+        f"Turma: {card['team']} - {card['bimonthly']}º Bimestre/{card['year']}",
+    )
+
+    columns = [50, 200, 240, 280, 320, 370, 420, 480]
+    y = height - 150
+    pdf.setFont("Helvetica-Bold", 10)
+    for x, title in zip(
+        columns, ["Matéria", "1º", "2º", "3º", "4º", "Média", "Faltas", "Situação"]
+    ):
+        pdf.drawString(x, y, title)
+
+    pdf.setFont("Helvetica", 10)
+    for subject, data in card["subjects"].items():
+        y -= 18
+        if y < 60:
+            pdf.showPage()
+            pdf.setFont("Helvetica", 10)
+            y = height - 60
+
+        grades = data["grades"]
+        average = data["average"]
+        values = [
+            subject[:24],
+            *(
+                f"{grades[n]:.1f}" if grades.get(n) is not None else "-"
+                for n in range(1, 5)
+            ),
+            f"{average:.1f}" if average is not None else "-",
+            f"{data['absences']}/{data['classes']}",
+            data["status"],
+        ]
+        for x, value in zip(columns, values):
+            pdf.drawString(x, y, value)
+
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def report_card_path(card: dict) -> str:
+    return "/".join(
+        [
+            REPORT_CARDS_DIR,
+            str(card["year"]),
+            str(card["bimonthly"]),
+            slugify(card["team"]) or "turma",
+            f"{card['registration_number']}.pdf",
+        ]
+    )
+
+
+def generate_report_cards(teams, year: int, bimonthly: int, workers=None) -> list:
+    """
+    Gera os boletins das turmas em paralelo e grava no storage configurado.
+    Os PDFs são renderizados num pool de processos; a gravação fica no
+    processo principal. Devolve os caminhos gravados.
+    """
+    cards = collect_report_cards(list(teams), year, bimonthly)
+    if not cards:
+        return []
+
+    paths = []
+    chunksize = max(1, len(cards) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for card, pdf in zip(
+            cards, pool.map(render_report_card, cards, chunksize=chunksize)
+        ):
+            path = report_card_path(card)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            paths.append(default_storage.save(path, ContentFile(pdf)))
+    return paths
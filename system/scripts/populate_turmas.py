@@ -3,7 +3,6 @@ import random
 from django.utils import timezone
 
 from system.models import CustomUser, Team
-from system.utiuls.functions import generate_unique_registration_number
 
 
 def run():
@@ -14,18 +13,19 @@ def run():
     alunos = []
 
     if total_alunos < 100:
-        for i in range(100 - total_alunos):
-            print("Criando aluno", i + 1)
-            reg_num = generate_unique_registration_number()
-            aluno = CustomUser.objects.create_user(
-                registration_number=reg_num,
-                first_name=f"Aluno{i+1}",
-                last_name="Teste",
-                email=f"aluno{i+1}@exemplo.com",
-                password="Abc123@00",
-                role="aluno",
-            )
-            alunos.append(aluno)
+        # matrículas, usernames e senha resolvidos de uma vez, num INSERT só
+        alunos = CustomUser.objects.bulk_create_users(
+            (
+                CustomUser(
+                    first_name=f"Aluno{i+1}",
+                    last_name="Teste",
+                    email=f"aluno{i+1}@exemplo.com",
+                    role="aluno",
+                )
+                for i in range(100 - total_alunos)
+            ),
+            password="Abc123@00",
+        )
         print(f"Criados {len(alunos)} alunos novos.")
     else:
         alunos = list(CustomUser.objects.filter(role="aluno")[:100])
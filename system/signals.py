@@ -0,0 +1,62 @@
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .grading import get_grading_policy
+from .models import (
+    Attendance,
+    AttendanceRecord,
+    AttendanceSummary,
+    Grade,
+    GradeSummary,
+    summary_refresh_suspended,
+)
+
+
+@receiver(post_save, sender=Grade)
+def refresh_summary_on_save(sender, instance, **kwargs):
+    if summary_refresh_suspended.get():
+        return
+
+    rows = [instance.summary_row()]
+    loaded_row = getattr(instance, "_loaded_summary_key", None)
+    if loaded_row and loaded_row != rows[0]:
+        rows.append(loaded_row)
+
+    GradeSummary.objects.refresh(GradeSummary.objects.keys_for_rows(rows))
+    instance._loaded_summary_key = rows[0]
+
+
+@receiver(post_delete, sender=Grade)
+def refresh_summary_on_delete(sender, instance, **kwargs):
+    if summary_refresh_suspended.get():
+        return
+
+    GradeSummary.objects.refresh_for_grades([instance])
+
+
+@receiver(post_save, sender=AttendanceRecord)
+@receiver(post_delete, sender=AttendanceRecord)
+def refresh_attendance_summary(sender, instance, **kwargs):
+    if summary_refresh_suspended.get():
+        return
+
+    AttendanceSummary.objects.refresh_for_records([instance])
+
+
+@receiver(post_delete, sender=Attendance)
+def refresh_attendance_summary_on_compact_delete(sender, instance, **kwargs):
+    # chamadas em linhas já são cobertas pelos sinais dos registros
+    if not instance.is_compact:
+        return
+
+    month = instance.date.replace(day=1)
+    AttendanceSummary.objects.refresh(
+        {(student_id, instance.subject_id, month) for student_id in instance.roster}
+    )
+
+
+@receiver(setting_changed)
+def reset_grading_policy(sender, setting, **kwargs):
+    if setting == "GRADING_POLICY":
+        get_grading_policy.cache_clear()
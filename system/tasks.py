@@ -0,0 +1,189 @@
+import contextlib
+import datetime
+import logging
+import os
+import socket
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from . import report_cards
+from .models import CustomUser, Task, Team
+from .notifications import bulk_notify
+from .utiuls.functions import send_welcome_email
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TASK_QUEUE = {
+    "MAX_ATTEMPTS": 3,
+    # espera antes da 1ª nova tentativa; dobra a cada falha
+    "RETRY_DELAY": 30,
+    # tarefa em execução há mais que isso é de um worker que morreu
+    "LOCK_TIMEOUT": 600,
+    # enquanto a tarefa roda, locked_at é renovado nesse intervalo (bem
+    # menor que LOCK_TIMEOUT), então tarefas longas não parecem abandonadas
+    "HEARTBEAT": 60,
+}
+
+# nome -> função; preenchido pelo decorador @task
+TASKS = {}
+
+
+def task_queue_settings() -> dict:
+    return {**DEFAULT_TASK_QUEUE, **getattr(settings, "TASK_QUEUE", {})}
+
+
+def task(func):
+    """Registra a função como tarefa, pelo nome, para enqueue() e o worker."""
+    TASKS[func.__name__] = func
+    return func
+
+
+def enqueue(name: str, delay=None, **payload) -> Task:
+    """
+    Coloca a tarefa `name` na fila com os argumentos nomeados (precisam ser
+    serializáveis em JSON). Dentro de uma transação, a tarefa só chega ao
+    worker se ela for confirmada.
+    """
+    if name not in TASKS:
+        raise ValueError(f"Tarefa desconhecida: {name}")
+    return Task.objects.enqueue(
+        name,
+        payload,
+        delay=delay,
+        max_attempts=task_queue_settings()["MAX_ATTEMPTS"],
+    )
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_task(task: Task) -> bool:
+    """
+    Executa uma tarefa já reservada, renovando a reserva enquanto ela roda.
+    Cada tarefa cuida das próprias transações: uma só em volta de uma tarefa
+    longa seguraria os bloqueios até o fim. Em caso de erro volta para a
+    fila com espera crescente até esgotar as tentativas.
+    """
+    config = task_queue_settings()
+    try:
+        if task.attempts > task.max_attempts:
+            raise RuntimeError("Tentativas esgotadas (worker interrompido).")
+        func = TASKS.get(task.name)
+        if func is None:
+            raise RuntimeError(f"Tarefa desconhecida: {task.name}")
+        with _heartbeat(task, config["HEARTBEAT"]):
+            func(**task.payload)
+    except Exception:
+        logger.exception("Falha na tarefa %s", task)
+        outcome = {"last_error": traceback.format_exc()}
+        if task.attempts < task.max_attempts:
+            outcome["status"] = Task.PENDING
+            outcome["run_after"] = timezone.now() + datetime.timedelta(
+                seconds=config["RETRY_DELAY"] * 2 ** (task.attempts - 1)
+            )
+        else:
+            outcome["status"] = Task.FAILED
+            outcome["finished_at"] = timezone.now()
+        _finish(task, **outcome)
+        return False
+
+    _finish(task, status=Task.DONE, finished_at=timezone.now())
+    return True
+
+
+def _finish(task: Task, **fields) -> None:
+    """
+    Grava o desfecho só se a reserva ainda é desta execução: se ela passou
+    do LOCK_TIMEOUT e outro worker pegou a tarefa, quem manda é ele.
+    """
+    for name, value in fields.items():
+        setattr(task, name, value)
+    if not _reserved(task).update(**fields):
+        logger.warning("Tarefa %s reservada por outro worker; desfecho ignorado.", task)
+
+
+def _reserved(task: Task):
+    """A tarefa, enquanto a reserva for desta execução."""
+    return Task.objects.filter(
+        pk=task.pk,
+        status=Task.RUNNING,
+        locked_by=task.locked_by,
+        attempts=task.attempts,
+    )
+
+
+@contextlib.contextmanager
+def _heartbeat(task: Task, interval: float):
+    """Renova locked_at numa thread (com conexão própria) até o bloco terminar."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                try:
+                    _reserved(task).update(locked_at=timezone.now())
+                except DatabaseError:
+                    logger.exception("Falha ao renovar a reserva de %s", task)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"tarefa-{task.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def work(worker=None, batch_size: int = 10) -> int:
+    """
+    Executa até batch_size tarefas; devolve quantas foram processadas. Cada
+    uma é reservada só na hora de rodar, para que o LOCK_TIMEOUT conte a
+    partir do início dela e não do início do lote.
+    """
+    worker = worker or worker_name()
+    lock_timeout = task_queue_settings()["LOCK_TIMEOUT"]
+    done = 0
+    while done < batch_size:
+        tasks = Task.objects.claim(worker, limit=1, lock_timeout=lock_timeout)
+        if not tasks:
+            break
+        run_task(tasks[0])
+        done += 1
+    return done
+
+
+@task
+def welcome_email(user_id):
+    user = CustomUser.objects.filter(pk=user_id).first()
+    if user and user.email:
+        send_welcome_email(user.first_name, user.email, user.registration_number)
+
+
+@task
+def notify_teams(actor_id, team_ids, verb, description=""):
+    """
+    Notificação individual a todos os membros das turmas (quem está em mais
+    de uma recebe uma vez). Os avisos de enviar_avisos agora são Announcement;
+    a tarefa segue para envios pessoais em massa e as que já estavam na fila.
+    """
+    actor = CustomUser.objects.get(pk=actor_id)
+    member_ids = (
+        Team.members.through.objects.filter(team_id__in=team_ids)
+        .values_list("customuser_id", flat=True)
+        .distinct()
+    )
+    with transaction.atomic():
+        bulk_notify(member_ids, actor, verb, description)
+
+
+@task
+def generate_report_cards(team_ids, year, bimonthly):
+    teams = list(Team.objects.filter(id__in=team_ids))
+    report_cards.generate_report_cards(teams, year, bimonthly)
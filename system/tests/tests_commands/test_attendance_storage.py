@@ -0,0 +1,85 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+
+from ...models import (
+    Attendance,
+    AttendanceRecord,
+    AttendanceSummary,
+    CustomUser,
+    Subject,
+    Team,
+)
+
+
+@pytest.fixture
+def chamadas():
+    professor = CustomUser.objects.create(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+    )
+    team = Team.objects.create(name="TDS A", year=2025)
+    subject = Subject.objects.create(name="Programação")
+    alunos = [
+        CustomUser.objects.create(
+            first_name=f"Aluno{i}",
+            last_name="Teste",
+            email=f"aluno{i}@example.com",
+            registration_number=f"{i:08d}",
+            role="aluno",
+        )
+        for i in range(4)
+    ]
+    for dia in (3, 4, 5):
+        chamada = Attendance.objects.create(
+            teacher=professor,
+            team=team,
+            subject=subject,
+            date=datetime.date(2025, 3, dia),
+        )
+        AttendanceRecord.objects.bulk_create(
+            AttendanceRecord(attendance=chamada, student=aluno, present=i != dia % 4)
+            for i, aluno in enumerate(alunos)
+        )
+    return alunos
+
+
+def _estado():
+    return (
+        {a.pk: a.presence_map() for a in Attendance.objects.all()},
+        set(
+            AttendanceSummary.objects.values_list(
+                "student_id", "month", "presences", "absences"
+            )
+        ),
+    )
+
+
+@pytest.mark.django_db
+def test_converte_ida_e_volta_sem_mudar_presencas(chamadas):
+    antes = _estado()
+
+    call_command("convert_attendance_storage", "--to", "bitmap", "--batch-size", "2")
+    assert not AttendanceRecord.objects.exists()
+    assert all(a.is_compact for a in Attendance.objects.all())
+    assert _estado() == antes
+
+    call_command("convert_attendance_storage", "--to", "rows")
+    assert AttendanceRecord.objects.count() == 12
+    assert not Attendance.objects.filter(presence__isnull=False).exists()
+    assert _estado() == antes
+
+
+@pytest.mark.django_db
+def test_benchmark_compara_os_armazenamentos(capsys):
+    call_command("benchmark_attendance_storage", "--students", "30", "--sessions", "5")
+
+    saida = capsys.readouterr().out
+    assert "tamanho em disco" in saida
+    assert "faltas de um aluno" in saida
+    # os dados sintéticos são desfeitos no final
+    assert not Attendance.objects.exists()
@@ -0,0 +1,168 @@
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+
+from ...exports import result_rows
+from ...grades import get_subjects_with_grades
+from ...models import (
+    Bimonthly,
+    CustomUser,
+    FinalResult,
+    Grade,
+    Subject,
+    Team,
+    YearClosing,
+)
+from ...report_cards import collect_report_cards
+from ...year_closing import close_year
+
+
+@pytest.fixture
+def turma():
+    team = Team.objects.create(name="TDS A", year=2025)
+    subject = Subject.objects.create(name="Programação")
+    subject.team.add(team)
+    bimestres = [Bimonthly.objects.create(number=n, year=2025) for n in (1, 2, 3, 4)]
+
+    for i in range(5):
+        aluno = CustomUser.objects.create(
+            first_name=f"Aluno{i}",
+            last_name="Teste",
+            email=f"aluno{i}@example.com",
+            registration_number=f"{i:08d}",
+            role="aluno",
+        )
+        team.members.add(aluno)
+        for bimestre in bimestres:
+            Grade.objects.create(
+                student=aluno,
+                subject=subject,
+                team=team,
+                value_activity=2.0 * i,
+                value_proof=2.0 * i,
+                bimonthly=bimestre,
+            )
+    return team
+
+
+@pytest.mark.django_db
+def test_encerramento_grava_resultados_finais(turma):
+    call_command("close_year", "2025", "--workers", "2", "--chunk-size", "2")
+
+    closing = YearClosing.objects.get(year=2025)
+    assert closing.finished_at is not None
+    assert closing.total_results == 5
+
+    results = {
+        r.student.registration_number: r
+        for r in FinalResult.objects.select_related("student")
+    }
+    assert results["00000004"].average == 8.0
+    assert results["00000004"].is_approved
+    assert not results["00000001"].is_approved
+    assert results["00000001"].bimonthly_averages == {
+        "1": 2.0,
+        "2": 2.0,
+        "3": 2.0,
+        "4": 2.0,
+    }
+
+
+@pytest.mark.django_db
+def test_encerramento_retoma_de_onde_parou(turma):
+    # simula uma execução interrompida depois de gravar parte dos resultados
+    YearClosing.objects.create(year=2025)
+    aluno = turma.members.get(registration_number="00000000")
+    FinalResult.objects.create(
+        student=aluno,
+        subject=Subject.objects.get(),
+        team=turma,
+        year=2025,
+        grade_count=4,
+        average=0.0,
+        is_approved=False,
+        is_under_review=False,
+    )
+
+    closing = close_year(2025, workers=1, chunk_size=2)
+
+    assert closing.total_results == 5
+    assert FinalResult.objects.filter(student=aluno).count() == 1
+
+    with pytest.raises(CommandError):
+        call_command("close_year", "2025")
+
+
+@pytest.mark.django_db
+def test_retomada_nao_regrava_resultado_sem_turma(turma):
+    aluno = turma.members.get(registration_number="00000004")
+    extra = Subject.objects.create(name="Extra")
+    for bimestre in Bimonthly.objects.all():
+        Grade.objects.create(
+            student=aluno,
+            subject=extra,
+            team=None,
+            value_activity=7.0,
+            value_proof=7.0,
+            bimonthly=bimestre,
+        )
+    close_year(2025, workers=1, chunk_size=2)
+    # execução retomada depois de interrompida
+    YearClosing.objects.filter(year=2025).update(finished_at=None)
+
+    gravados = []
+    closing = close_year(2025, workers=1, chunk_size=2, progress=gravados.append)
+
+    # nada pendente: o resumo sem turma já tinha resultado
+    assert gravados == []
+    assert closing.total_results == 6
+    assert FinalResult.objects.filter(subject=extra, team__isnull=True).count() == 1
+    with pytest.raises(IntegrityError):
+        FinalResult.objects.create(
+            student=aluno,
+            subject=extra,
+            year=2025,
+            grade_count=4,
+            is_approved=True,
+            is_under_review=False,
+        )
+
+
+@pytest.mark.django_db
+def test_resultado_final_e_imutavel(turma):
+    close_year(2025, workers=1)
+    result = FinalResult.objects.first()
+
+    result.is_approved = not result.is_approved
+    with pytest.raises(ValidationError):
+        result.save()
+    with pytest.raises(ValidationError):
+        result.delete()
+    with pytest.raises(ValidationError):
+        FinalResult.objects.update(is_approved=True)
+    with pytest.raises(ValidationError):
+        FinalResult.objects.all().delete()
+
+
+@pytest.mark.django_db
+def test_ano_encerrado_le_o_resultado_final(turma):
+    close_year(2025, workers=1)
+    aluno = turma.members.get(registration_number="00000001")
+
+    # notas lançadas depois do encerramento não mudam a situação do ano
+    Grade.objects.filter(student=aluno).update(value_activity=10, average=10)
+
+    items, _ = get_subjects_with_grades(aluno, turma, turma.subjects.all())
+    assert items[0]["status"] == "Reprovado"
+    assert items[0]["media"] == 2.0
+
+    rows = {row[0]: row for row in result_rows(2025)}
+    assert rows["00000001"][-1] == "Reprovado"
+    assert rows["00000004"][-1] == "Aprovado"
+
+    cards = {
+        c["registration_number"]: c for c in collect_report_cards([turma], 2025, 4)
+    }
+    boletim = next(iter(cards["00000001"]["subjects"].values()))
+    assert (boletim["average"], boletim["status"]) == (2.0, "Reprovado")
@@ -0,0 +1,119 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from ...models import (
+    Attendance,
+    AttendanceRecord,
+    Bimonthly,
+    CustomUser,
+    Grade,
+    Subject,
+    Task,
+    Team,
+)
+from ...report_cards import collect_report_cards
+
+
+@pytest.fixture
+def turma(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    professor = CustomUser.objects.create(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+    )
+    team = Team.objects.create(name="TDS A", year=2025)
+    subject = Subject.objects.create(name="Programação")
+    bimestres = [Bimonthly.objects.create(number=n, year=2025) for n in (1, 2)]
+    attendance = Attendance.objects.create(
+        teacher=professor, team=team, subject=subject, date=datetime.date(2025, 5, 1)
+    )
+
+    for i in range(3):
+        aluno = CustomUser.objects.create(
+            first_name=f"Aluno{i}",
+            last_name="Teste",
+            email=f"aluno{i}@example.com",
+            registration_number=f"{i:08d}",
+            role="aluno",
+        )
+        team.members.add(aluno)
+        for bimestre in bimestres:
+            Grade.objects.create(
+                student=aluno,
+                subject=subject,
+                team=team,
+                value_activity=6.0 + i,
+                value_proof=8.0,
+                bimonthly=bimestre,
+            )
+        AttendanceRecord.objects.create(
+            attendance=attendance, student=aluno, present=i != 0
+        )
+    return team
+
+
+@pytest.mark.django_db
+def test_coleta_dados_do_boletim(turma):
+    cards = {
+        c["registration_number"]: c for c in collect_report_cards([turma], 2025, 1)
+    }
+
+    assert len(cards) == 3
+    programacao = cards["00000000"]["subjects"]["Programação"]
+    assert programacao == {
+        "grades": {1: 7.0},
+        "absences": 1,
+        "classes": 1,
+        "average": 7.0,
+        "status": "Em análise",
+    }
+    assert cards["00000002"]["subjects"]["Programação"]["absences"] == 0
+
+
+@pytest.mark.django_db
+def test_gera_boletins_em_pdf(turma, tmp_path):
+    call_command("generate_report_cards", "--year=2025", "--bimonthly=2", "--workers=2")
+
+    arquivos = sorted((tmp_path / "boletins" / "2025" / "2" / "tds-a").iterdir())
+    assert [a.name for a in arquivos] == [f"{i:08d}.pdf" for i in range(3)]
+    assert arquivos[0].read_bytes().startswith(b"%PDF")
+
+
+@pytest.mark.django_db
+def test_gera_boletins_em_segundo_plano(turma, tmp_path):
+    call_command(
+        "generate_report_cards", "--year=2025", "--bimonthly=2", "--background"
+    )
+    pasta = tmp_path / "boletins" / "2025" / "2" / "tds-a"
+    assert not pasta.exists()
+
+    call_command("run_worker", "--once")
+
+    assert len(list(pasta.iterdir())) == 3
+
+
+@pytest.mark.django_db
+def test_acao_do_admin_enfileira_uma_tarefa_por_ano(admin_client, turma):
+    outras = [Team.objects.create(name=f"TDS {n}", year=2025) for n in "BC"]
+    Task.objects.all().delete()
+
+    response = admin_client.post(
+        reverse("admin:system_team_changelist"),
+        {
+            "action": "gerar_boletins",
+            "_selected_action": [turma.id] + [t.id for t in outras],
+        },
+    )
+
+    assert response.status_code == 302
+    task = Task.objects.get(name="generate_report_cards")
+    assert sorted(task.payload["team_ids"]) == sorted(
+        [turma.id] + [t.id for t in outras]
+    )
+    assert (task.payload["year"], task.payload["bimonthly"]) == (2025, 2)
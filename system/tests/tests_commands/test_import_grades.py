@@ -0,0 +1,122 @@
+import pytest
+from django.core.management import call_command
+from openpyxl import Workbook
+
+from ...grade_import import import_grades
+from ...models import Bimonthly, CustomUser, Grade, GradeSummary, Subject, Team
+
+CABECALHO = (
+    "registration_number,subject,team,year,bimonthly,value_activity,value_proof\n"
+)
+
+
+@pytest.fixture
+def cadastro():
+    aluno = CustomUser.objects.create(
+        first_name="Pedro",
+        last_name="Silva",
+        email="aluno@example.com",
+        registration_number="12345678",
+        role="aluno",
+        password="teste123",
+    )
+    team = Team.objects.create(name="TDS A", year=2025)
+    subject = Subject.objects.create(name="Programação")
+    team.members.add(aluno)
+    subject.team.add(team)
+    for n in range(1, 5):
+        Bimonthly.objects.create(number=n, year=2025)
+    return aluno, team, subject
+
+
+@pytest.mark.django_db
+def test_importa_csv_com_relatorio_de_erros(tmp_path, cadastro):
+    aluno, team, subject = cadastro
+    arquivo = tmp_path / "notas.csv"
+    arquivo.write_text(
+        CABECALHO
+        + "12345678,Programação,TDS A,2025,1,8,9\n"
+        + '12345678,programação,tds a,2025,2,"6,5",7\n'
+        + "12345678,Programação,TDS A,2025,3,11,9\n"
+        + "99999999,Programação,TDS A,2025,4,8,9\n"
+        + "12345678,Física,TDS A,2025,4,8,9\n",
+        encoding="utf-8",
+    )
+    relatorio = tmp_path / "erros.csv"
+
+    call_command(
+        "import_grades", str(arquivo), "--batch-size=2", f"--errors={relatorio}"
+    )
+
+    notas = Grade.objects.filter(student=aluno).order_by("bimonthly__number")
+    assert [n.average for n in notas] == [8.5, 6.75]
+    assert GradeSummary.objects.get(student=aluno, subject=subject).grade_count == 2
+
+    linhas = relatorio.read_text(encoding="utf-8").splitlines()
+    assert linhas[0] == "linha,erro"
+    assert [linha.split(",")[0] for linha in linhas[1:]] == ["4", "5", "6"]
+
+
+@pytest.mark.django_db
+def test_importa_xlsx_atualizando_nota_existente(tmp_path, cadastro):
+    aluno, team, subject = cadastro
+    Grade.objects.create(
+        student=aluno,
+        subject=subject,
+        team=team,
+        value_activity=1.0,
+        value_proof=1.0,
+        bimonthly=Bimonthly.objects.get(number=1, year=2025),
+    )
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(CABECALHO.strip().split(","))
+    sheet.append([12345678, "Programação", "TDS A", 2025, 1, 10, 9])
+    arquivo = tmp_path / "notas.xlsx"
+    workbook.save(arquivo)
+
+    call_command("import_grades", str(arquivo))
+
+    nota = Grade.objects.get(student=aluno)
+    assert nota.average == 9.5
+
+
+@pytest.mark.django_db
+def test_importa_rejeita_nome_ambiguo_fora_da_turma_e_nao_finito(tmp_path, cadastro):
+    aluno, team, subject = cadastro
+    CustomUser.objects.create(
+        first_name="Ana",
+        email="ana@example.com",
+        registration_number="87654321",
+        role="aluno",
+    )
+    Subject.objects.create(name="Física").team.add(team)
+    Subject.objects.create(name="física ")
+    Subject.objects.create(name="Química")
+    arquivo = tmp_path / "notas.csv"
+    arquivo.write_text(
+        CABECALHO
+        + "12345678,Física,TDS A,2025,1,8,9\n"
+        + "87654321,Programação,TDS A,2025,1,8,9\n"
+        + "12345678,Química,TDS A,2025,1,8,9\n"
+        + "12345678,Programação,TDS A,2025,1,nan,9\n"
+        + "12345678,Programação,TDS A,2025,2,8,inf\n",
+        encoding="utf-8",
+    )
+    erros = []
+
+    with arquivo.open("rb") as f:
+        resultado = import_grades(
+            f, "notas.csv", on_error=lambda linha, msg: erros.append((linha, msg))
+        )
+
+    assert resultado == {"created": 0, "updated": 0, "errors": 5}
+    assert erros == [
+        (2, "Matéria 'Física' é ambígua: há 2 com esse nome."),
+        (3, "Aluno '87654321' não pertence à turma 'TDS A'."),
+        (4, "Matéria 'Química' não é da turma 'TDS A'."),
+        (5, "Ano, bimestre e notas devem ser numéricos."),
+        (6, "Ano, bimestre e notas devem ser numéricos."),
+    ]
+    assert not Grade.objects.exists()
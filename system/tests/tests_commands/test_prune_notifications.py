@@ -0,0 +1,100 @@
+import datetime
+import io
+import json
+import os
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from notifications.models import Notification
+
+from ...models import CustomUser
+from ...notifications import build_notification
+
+
+@pytest.mark.django_db
+def test_prune_notifications_remove_lidas_antigas_em_lotes(tmp_path):
+    professor = CustomUser.objects.create(
+        first_name="João",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+    )
+    aluno = CustomUser.objects.create(
+        first_name="Pedro",
+        email="aluno@example.com",
+        registration_number="A1234567",
+        role="aluno",
+    )
+    agora = timezone.now()
+
+    def notificacao(verb, dias, lida):
+        notification = build_notification(aluno.pk, professor, verb)
+        notification.timestamp = agora - datetime.timedelta(days=dias)
+        notification.unread = not lida
+        return notification
+
+    Notification.objects.bulk_create(
+        [notificacao(f"Antiga {n}", 200 + n, lida=True) for n in range(5)]
+        + [
+            notificacao("Antiga não lida", 300, lida=False),
+            notificacao("Recente lida", 10, lida=True),
+        ]
+    )
+    archive = tmp_path / "notificacoes.jsonl"
+    out = io.StringIO()
+
+    call_command(
+        "prune_notifications",
+        days=180,
+        batch_size=2,
+        pause=0,
+        archive=str(archive),
+        stdout=out,
+    )
+
+    assert sorted(Notification.objects.values_list("verb", flat=True)) == [
+        "Antiga não lida",
+        "Recente lida",
+    ]
+    arquivadas = [json.loads(line) for line in archive.read_text().splitlines()]
+    assert sorted(row["verb"] for row in arquivadas) == [
+        f"Antiga {n}" for n in range(5)
+    ]
+    # três lotes: 2 + 2 + 1
+    assert "4 notificações removidas..." in out.getvalue()
+    assert "5 notificações lidas anteriores a" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_arquivo_vai_para_o_disco_antes_de_apagar_cada_lote(tmp_path, monkeypatch):
+    professor = CustomUser.objects.create(
+        first_name="João", registration_number="P7654321", role="professor"
+    )
+    antiga = timezone.now() - datetime.timedelta(days=200)
+    notifications = [
+        build_notification(professor.pk, professor, f"N{n}") for n in range(3)
+    ]
+    for notification in notifications:
+        notification.timestamp, notification.unread = antiga, False
+    Notification.objects.bulk_create(notifications)
+    archive = tmp_path / "notificacoes.jsonl"
+    no_disco = []
+
+    def fsync(fd):
+        # o lote já está escrito no arquivo e ainda não foi apagado do banco
+        no_disco.append(
+            (len(archive.read_text().splitlines()), Notification.objects.count())
+        )
+
+    monkeypatch.setattr(os, "fsync", fsync)
+    call_command(
+        "prune_notifications",
+        days=180,
+        batch_size=2,
+        pause=0,
+        archive=str(archive),
+        stdout=io.StringIO(),
+    )
+
+    assert no_disco == [(2, 3), (3, 1)]
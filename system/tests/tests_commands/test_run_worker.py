@@ -0,0 +1,160 @@
+import datetime
+import threading
+import time
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ...models import CustomUser, Task
+from ...tasks import TASKS, enqueue, work
+
+
+@pytest.mark.django_db
+def test_email_de_boas_vindas_sai_pelo_worker():
+    aluno = CustomUser.objects.create_user(
+        first_name="Pedro",
+        last_name="Silva",
+        email="aluno@example.com",
+        registration_number="A1234567",
+        role="aluno",
+        password="teste123",
+    )
+
+    # a criação do usuário só coloca o e-mail na fila
+    task = Task.objects.get()
+    assert (task.name, task.payload) == ("welcome_email", {"user_id": aluno.pk})
+    assert mail.outbox == []
+
+    call_command("run_worker", "--once")
+
+    assert [m.to for m in mail.outbox] == [["aluno@example.com"]]
+    assert "A1234567" in mail.outbox[0].body
+    task.refresh_from_db()
+    assert task.status == Task.DONE
+
+
+@pytest.mark.django_db
+def test_tarefa_com_erro_tenta_de_novo_e_falha_no_fim(settings, monkeypatch):
+    settings.TASK_QUEUE = {"MAX_ATTEMPTS": 2, "RETRY_DELAY": 60}
+    chamadas = []
+
+    def quebra(valor):
+        chamadas.append(valor)
+        raise ValueError("sem conexão")
+
+    monkeypatch.setitem(TASKS, "quebra", quebra)
+    task = enqueue("quebra", valor=1)
+
+    assert work() == 1
+    task.refresh_from_db()
+    assert (task.status, task.attempts) == (Task.PENDING, 1)
+    assert task.run_after > timezone.now() + datetime.timedelta(seconds=50)
+    # ainda esperando a nova tentativa
+    assert work() == 0
+
+    Task.objects.update(run_after=timezone.now())
+    assert work() == 1
+    task.refresh_from_db()
+    assert (task.status, task.attempts) == (Task.FAILED, 2)
+    assert "sem conexão" in task.last_error
+    assert chamadas == [1, 1]
+
+    with pytest.raises(ValueError):
+        enqueue("nao_existe")
+
+
+@pytest.mark.django_db
+def test_tarefa_de_worker_que_morreu_volta_para_a_fila():
+    enqueue("welcome_email", user_id=0)
+    enqueue("welcome_email", user_id=0)
+
+    [primeira] = Task.objects.claim("worker-a", limit=1)
+    # reservada e ainda no prazo: outro worker não pega
+    assert [t.pk for t in Task.objects.claim("worker-b", limit=5)] != [primeira.pk]
+    assert Task.objects.claim("worker-b", limit=5) == []
+
+    Task.objects.filter(pk=primeira.pk).update(
+        locked_at=timezone.now() - datetime.timedelta(hours=1)
+    )
+    [recuperada] = Task.objects.claim("worker-c", limit=5)
+    assert recuperada.pk == primeira.pk
+    assert (recuperada.locked_by, recuperada.attempts) == ("worker-c", 2)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_workers_simultaneos_nao_pegam_a_mesma_tarefa():
+    tasks = [enqueue("welcome_email", user_id=0) for _ in range(3)]
+    reservadas = []
+
+    def outro_worker():
+        try:
+            reservadas.extend(Task.objects.claim("worker-b", limit=5))
+        finally:
+            connection.close()
+
+    # este "worker" segura a primeira linha numa transação aberta
+    with transaction.atomic():
+        Task.objects.select_for_update().filter(pk=tasks[0].pk).get()
+        thread = threading.Thread(target=outro_worker)
+        thread.start()
+        thread.join(timeout=10)
+
+    assert sorted(t.pk for t in reservadas) == [tasks[1].pk, tasks[2].pk]
+
+
+@pytest.mark.django_db
+def test_worker_reserva_cada_tarefa_so_na_hora_de_rodar(monkeypatch):
+    estados = []
+
+    def olha_a_outra(outra):
+        estados.append(Task.objects.get(pk=outra).status)
+
+    monkeypatch.setitem(TASKS, "olha_a_outra", olha_a_outra)
+    primeira = enqueue("olha_a_outra", outra=0)
+    segunda = enqueue("olha_a_outra", outra=primeira.pk)
+    Task.objects.filter(pk=primeira.pk).update(payload={"outra": segunda.pk})
+
+    assert work(batch_size=10) == 2
+    # enquanto a primeira rodava, a segunda ainda não tinha sido reservada
+    assert estados == [Task.PENDING, Task.DONE]
+
+
+@pytest.mark.django_db
+def test_desfecho_nao_sobrescreve_tarefa_reservada_por_outro_worker(monkeypatch):
+    def demora_demais():
+        # passou do LOCK_TIMEOUT e outro worker reservou a tarefa
+        Task.objects.update(locked_by="worker-b", attempts=F("attempts") + 1)
+
+    monkeypatch.setitem(TASKS, "demora_demais", demora_demais)
+    task = enqueue("demora_demais")
+
+    assert work("worker-a") == 1
+    task.refresh_from_db()
+    assert (task.status, task.locked_by, task.attempts) == (
+        Task.RUNNING,
+        "worker-b",
+        2,
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_tarefa_longa_renova_a_reserva_e_nao_e_pega_de_novo(settings, monkeypatch):
+    settings.TASK_QUEUE = {"LOCK_TIMEOUT": 1, "HEARTBEAT": 0.2}
+    disputa = []
+
+    def boletins_da_escola():
+        # roda mais que o LOCK_TIMEOUT; outro worker tenta pegar no meio
+        time.sleep(1.5)
+        disputa.extend(Task.objects.claim("worker-b", limit=5, lock_timeout=1))
+
+    monkeypatch.setitem(TASKS, "boletins_da_escola", boletins_da_escola)
+    task = enqueue("boletins_da_escola")
+
+    assert work("worker-a") == 1
+    assert disputa == []
+    task.refresh_from_db()
+    assert (task.status, task.locked_by, task.attempts) == (Task.DONE, "worker-a", 1)
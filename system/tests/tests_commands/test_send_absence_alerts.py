@@ -0,0 +1,147 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from notifications.models import Notification
+
+from ...absence_alerts import find_crossings, send_absence_alerts
+from ...models import (
+    AbsenceAlert,
+    Attendance,
+    AttendanceRecord,
+    CustomUser,
+    Subject,
+    Team,
+)
+
+# faltas de cada aluno nas 6 aulas do ano
+FALTAS = {0: {3, 4, 5, 6}, 1: {1, 3, 5}, 2: {6}}
+
+
+@pytest.fixture
+def chamadas():
+    professor = CustomUser.objects.create(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+    )
+    team = Team.objects.create(name="TDS A", year=2025)
+    subject = Subject.objects.create(name="Programação")
+    subject.teachers.add(professor)
+    alunos = [
+        CustomUser.objects.create(
+            first_name=f"Aluno{i}",
+            last_name="Teste",
+            email=f"aluno{i}@example.com",
+            registration_number=f"{i:08d}",
+            role="aluno",
+        )
+        for i in FALTAS
+    ]
+
+    registros = []
+    for aula in range(1, 7):
+        chamada = Attendance.objects.create(
+            teacher=professor,
+            team=team,
+            subject=subject,
+            date=datetime.date(2025, 3, aula),
+        )
+        registros.extend(
+            AttendanceRecord(
+                attendance=chamada, student=aluno, present=aula not in FALTAS[i]
+            )
+            for i, aluno in enumerate(alunos)
+        )
+    AttendanceRecord.objects.bulk_create(registros)
+    return professor, alunos, subject
+
+
+@pytest.mark.django_db
+def test_calcula_taxa_e_sequencia_de_faltas(chamadas):
+    _, alunos, subject = chamadas
+
+    crossings = find_crossings(2025, max_rate=0.25, max_streak=3, min_classes=4)
+
+    assert crossings == {
+        (alunos[0].id, subject.id, AbsenceAlert.RATE): 4 / 6,
+        (alunos[0].id, subject.id, AbsenceAlert.STREAK): 4,
+        (alunos[1].id, subject.id, AbsenceAlert.RATE): 3 / 6,
+    }
+
+
+@pytest.mark.django_db
+def test_avisa_apenas_cruzamentos_novos(chamadas):
+    professor, alunos, subject = chamadas
+
+    call_command("send_absence_alerts", "--year", "2025")
+
+    assert AbsenceAlert.objects.count() == 3
+    # aluno e professor para cada alerta
+    assert Notification.objects.filter(recipient=professor).count() == 3
+    assert Notification.objects.filter(recipient=alunos[0]).count() == 2
+    assert Notification.objects.filter(recipient=alunos[1]).count() == 1
+
+    assert send_absence_alerts(2025)["notifications"] == 0
+    assert Notification.objects.count() == 6
+
+
+@pytest.mark.django_db
+def test_aluno_que_volta_ao_limite_pode_ser_avisado_de_novo(chamadas):
+    _, alunos, _ = chamadas
+    send_absence_alerts(2025)
+
+    registros = AttendanceRecord.objects.filter(student=alunos[1], present=False)
+    registros.update(present=True)
+    assert send_absence_alerts(2025)["resolved"] == 1
+    assert not AbsenceAlert.objects.filter(student=alunos[1]).exists()
+
+    AttendanceRecord.objects.filter(student=alunos[1]).update(present=False)
+    result = send_absence_alerts(2025)
+    assert result["alerts"] == 2
+    assert Notification.objects.filter(recipient=alunos[1]).count() == 3
+
+
+def _aulas(professor, subject, aluno, dias, present):
+    for dia in dias:
+        AttendanceRecord.objects.create(
+            attendance=Attendance.objects.create(
+                teacher=professor,
+                team=Team.objects.get(),
+                subject=subject,
+                date=datetime.date(2025, 4, dia),
+            ),
+            student=aluno,
+            present=present,
+        )
+
+
+@pytest.mark.django_db
+def test_nova_sequencia_de_faltas_no_mesmo_ano_gera_novo_aviso(chamadas):
+    professor, alunos, subject = chamadas
+    send_absence_alerts(2025)
+    sequencia = {"student": alunos[0], "kind": AbsenceAlert.STREAK}
+    assert AbsenceAlert.objects.get(**sequencia).value == 4
+
+    # voltou às aulas: a sequência acabou
+    _aulas(professor, subject, alunos[0], [1], present=True)
+    send_absence_alerts(2025)
+    assert not AbsenceAlert.objects.filter(**sequencia).exists()
+
+    # outra sequência, menor que a primeira, ainda é um cruzamento novo
+    _aulas(professor, subject, alunos[0], [2, 3, 4], present=False)
+    assert send_absence_alerts(2025)["alerts"] == 1
+    assert AbsenceAlert.objects.get(**sequencia).value == 3
+
+
+@pytest.mark.django_db
+def test_aviso_sai_em_nome_do_professor(chamadas):
+    professor, alunos, _ = chamadas
+
+    send_absence_alerts(2025)
+
+    aviso = Notification.objects.filter(recipient=alunos[0]).first()
+    assert aviso.actor == professor
+    assert "faltas" in aviso.description
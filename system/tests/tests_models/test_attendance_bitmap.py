@@ -0,0 +1,152 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from ...absence_alerts import find_crossings
+from ...bitmaps import pack_roll_call, unpack_roll_call
+from ...models import (
+    AbsenceAlert,
+    Attendance,
+    AttendanceRecord,
+    AttendanceSummary,
+    CustomUser,
+    Subject,
+    Team,
+)
+
+
+@pytest.fixture
+def turma(settings):
+    settings.ATTENDANCE_STORAGE = "bitmap"
+    professor = CustomUser.objects.create_user(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+        password="teste123",
+    )
+    team = Team.objects.create(name="TDS A", year=2025)
+    subject = Subject.objects.create(name="Programação")
+    subject.team.add(team)
+    subject.teachers.add(professor)
+    alunos = [
+        CustomUser.objects.create(
+            first_name=f"Aluno{i:02d}",
+            last_name="Teste",
+            email=f"aluno{i}@example.com",
+            registration_number=f"{i:08d}",
+            role="aluno",
+        )
+        for i in range(11)
+    ]
+    team.members.add(*alunos)
+    return professor, team, subject, alunos
+
+
+def test_bitset_usa_a_ordem_de_bits_do_postgres():
+    presence = {7: True, 3: False, 12: True, 40: False, 9: True}
+    roster, data = pack_roll_call(presence)
+
+    assert roster == [3, 7, 9, 12, 40]
+    assert unpack_roll_call(roster, data) == presence
+
+
+@pytest.mark.django_db
+def test_bitset_lido_pelo_banco():
+    roster, data = pack_roll_call({i: i % 3 == 0 for i in range(20)})
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT array_agg(get_bit(%s, i) ORDER BY i) FROM generate_series(0, 19) i",
+            [data],
+        )
+        bits = cursor.fetchone()[0]
+    assert bits == [int(i % 3 == 0) for i in range(20)]
+
+
+@pytest.mark.django_db
+def test_chamada_compacta_pelas_views(client, turma):
+    professor, team, subject, alunos = turma
+    client.force_login(professor)
+    url = reverse("fazer_chamada", args=[team.id, subject.id])
+
+    client.post(url, {f"presente_{a.id}": "on" for a in alunos[1:]})
+
+    chamada = Attendance.objects.get()
+    assert chamada.is_compact
+    assert not AttendanceRecord.objects.exists()
+    assert chamada.presence_map() == {a.id: a != alunos[0] for a in alunos}
+    assert client.get(url).context["registros"][alunos[0].id] is False
+
+    resumo = AttendanceSummary.objects.get(student=alunos[0])
+    assert (resumo.presences, resumo.absences) == (0, 1)
+
+    client.force_login(alunos[0])
+    response = client.get(reverse("my_fouls", args=[alunos[0].id]))
+    assert response.context["fouls_count"] == 1
+    assert response.context["fouls"] == [chamada]
+
+
+@pytest.mark.django_db
+def test_chamada_em_linhas_vira_compacta_ao_ser_regravada(client, turma, settings):
+    professor, team, subject, alunos = turma
+    client.force_login(professor)
+    url = reverse("fazer_chamada", args=[team.id, subject.id])
+
+    settings.ATTENDANCE_STORAGE = "rows"
+    client.post(url, {f"presente_{a.id}": "on" for a in alunos})
+    assert AttendanceRecord.objects.count() == 11
+
+    settings.ATTENDANCE_STORAGE = "bitmap"
+    client.post(url, {f"presente_{a.id}": "on" for a in alunos[:-1]})
+
+    assert not AttendanceRecord.objects.exists()
+    assert Attendance.objects.get().presence_map()[alunos[-1].id] is False
+    assert AttendanceSummary.objects.get(student=alunos[-1]).absences == 1
+    assert AttendanceSummary.objects.get(student=alunos[0]).presences == 1
+
+
+@pytest.mark.django_db
+def test_alertas_somam_os_dois_armazenamentos(turma):
+    professor, team, subject, alunos = turma
+    for dia in range(1, 5):
+        chamada = Attendance.objects.create(
+            teacher=professor,
+            team=team,
+            subject=subject,
+            date=datetime.date(2025, 3, dia),
+        )
+        if dia % 2:
+            AttendanceRecord.objects.create(
+                attendance=chamada, student=alunos[0], present=False
+            )
+        else:
+            chamada.roster, chamada.presence = pack_roll_call({alunos[0].id: False})
+            chamada.save()
+
+    crossings = find_crossings(2025, max_rate=0.5, max_streak=4, min_classes=4)
+
+    assert crossings[(alunos[0].id, subject.id, AbsenceAlert.STREAK)] == 4
+    assert crossings[(alunos[0].id, subject.id, AbsenceAlert.RATE)] == 1.0
+
+
+@pytest.mark.django_db
+def test_chamada_compacta_aceita_ids_grandes(client, turma):
+    professor, team, subject, alunos = turma
+    # CustomUser.id é bigint; o roster precisa guardar ids acima de 2**31
+    grande = CustomUser.objects.create(
+        id=2**31 + 5,
+        first_name="Aluno",
+        last_name="Grande",
+        registration_number="99999999",
+        role="aluno",
+    )
+    team.members.add(grande)
+    client.force_login(professor)
+
+    client.post(reverse("fazer_chamada", args=[team.id, subject.id]), {})
+
+    assert Attendance.objects.get().presence_map()[grande.id] is False
+    assert AttendanceSummary.objects.get(student=grande).absences == 1
@@ -0,0 +1,98 @@
+import datetime
+
+import pytest
+
+from ...models import (
+    Attendance,
+    AttendanceRecord,
+    AttendanceSummary,
+    CustomUser,
+    Subject,
+    Team,
+)
+
+
+@pytest.fixture
+def dados():
+    professor = CustomUser.objects.create(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+    )
+    alunos = [
+        CustomUser.objects.create(
+            first_name=f"Aluno{i}",
+            last_name="Silva",
+            email=f"aluno{i}@example.com",
+            registration_number=f"A{i:07d}",
+            role="aluno",
+        )
+        for i in range(3)
+    ]
+    team = Team.objects.create(name="TDS A", year=2025)
+    subject = Subject.objects.create(name="Programação")
+    return professor, alunos, team, subject
+
+
+def criar_chamada(professor, team, subject, data):
+    return Attendance.objects.create(
+        teacher=professor, team=team, subject=subject, date=data
+    )
+
+
+@pytest.mark.django_db
+def test_resumo_mensal_acompanha_chamadas(dados):
+    professor, alunos, team, subject = dados
+    maio = criar_chamada(professor, team, subject, datetime.date(2025, 5, 5))
+    maio2 = criar_chamada(professor, team, subject, datetime.date(2025, 5, 20))
+    junho = criar_chamada(professor, team, subject, datetime.date(2025, 6, 2))
+
+    AttendanceRecord.objects.bulk_create(
+        [
+            AttendanceRecord(attendance=a, student=alunos[0], present=presente)
+            for a, presente in ((maio, False), (maio2, True), (junho, False))
+        ]
+    )
+
+    resumos = {
+        r.month: (r.presences, r.absences)
+        for r in AttendanceSummary.objects.filter(student=alunos[0])
+    }
+    assert resumos == {
+        datetime.date(2025, 5, 1): (1, 1),
+        datetime.date(2025, 6, 1): (0, 1),
+    }
+
+    registro = AttendanceRecord.objects.get(attendance=maio, student=alunos[0])
+    registro.present = True
+    registro.save()
+    AttendanceRecord.objects.filter(attendance=junho).delete()
+
+    resumos = {
+        r.month: (r.presences, r.absences)
+        for r in AttendanceSummary.objects.filter(student=alunos[0])
+    }
+    assert resumos == {datetime.date(2025, 5, 1): (2, 0)}
+
+
+@pytest.mark.django_db
+def test_upsert_da_chamada_atualiza_resumo(dados):
+    professor, alunos, team, subject = dados
+    chamada = criar_chamada(professor, team, subject, datetime.date(2025, 12, 10))
+
+    for presente in (True, False):
+        AttendanceRecord.objects.bulk_create(
+            [
+                AttendanceRecord(attendance=chamada, student=aluno, present=presente)
+                for aluno in alunos
+            ],
+            update_conflicts=True,
+            unique_fields=["attendance", "student"],
+            update_fields=["present"],
+        )
+
+    resumos = AttendanceSummary.objects.filter(month=datetime.date(2025, 12, 1))
+    assert resumos.count() == 3
+    assert {(r.presences, r.absences) for r in resumos} == {(0, 1)}
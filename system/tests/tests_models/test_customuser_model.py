@@ -1,18 +1,18 @@
 import pytest
 
-from ... import models
-from ...models import CustomUser
+from ... import models, tasks
+from ...models import CustomUser, Task
 
 
 @pytest.mark.django_db
-def test_save_define_username_e_chama_send_welcome_email(monkeypatch):
+def test_save_define_username_e_agenda_send_welcome_email(monkeypatch):
     calls = []
 
     def fake_send_welcome(first_name, email, registration_number):
         calls.append((first_name, email, registration_number))
 
-    # Patchar a função de envio de email no módulo models
-    monkeypatch.setattr(models, "send_welcome_email", fake_send_welcome)
+    # Patchar a função de envio de email usada pela tarefa
+    monkeypatch.setattr(tasks, "send_welcome_email", fake_send_welcome)
 
     registration = "A1234567"
     user = CustomUser(
@@ -27,29 +27,22 @@ def test_save_define_username_e_chama_send_welcome_email(monkeypatch):
     user.save()
 
     assert user.username == f"user_{registration}"
-    assert len(calls) == 1
-    assert calls[0] == ("Ana", "ana@example.com", registration)
+    # o envio fica na fila até o worker rodar
+    assert calls == []
+    assert tasks.work() == 1
+    assert calls == [("Ana", "ana@example.com", registration)]
     assert models.CustomUser.objects.filter(registration_number=registration).exists()
 
 
 @pytest.mark.django_db
-def test_save_gera_registration_number_quando_ausente_e_trata_colisao(monkeypatch):
-    # sequência controlada: primeiro valor colide, segundo é único
-    seq = ["R0000001", "R0000002"]
-
-    def fake_generate():
-        return seq.pop(0)
-
-    monkeypatch.setattr(models, "generate_unique_registration_number", fake_generate)
-    # evitar side effect de envio de email
-    monkeypatch.setattr(models, "send_welcome_email", lambda *a, **k: None)
-
-    # criar usuário existente que usará o primeiro valor (causando colisão)
+def test_save_gera_registration_number_da_sequencia_pulando_as_ocupadas():
+    # a próxima da sequência já pertence a um usuário antigo (sorteada)
+    atual = int(CustomUser.objects.allocate_registration_numbers(1)[0])
     models.CustomUser.objects.create(
         first_name="Existente",
         last_name="Usuario",
         email="existente@example.com",
-        registration_number="R0000001",
+        registration_number=f"{atual + 1:08d}",
         role="aluno",
         password="irrelevante",
     )
@@ -64,19 +57,92 @@ def test_save_gera_registration_number_quando_ausente_e_trata_colisao(monkeypatc
     new_user.username = ""
     new_user.save()
 
-    # De acordo com a implementação: username é gerado usando o primeiro valor produzido,
-    # depois a lógica de colisão gera um novo registration_number (o segundo valor).
-    assert new_user.registration_number == "R0000002"
-    assert new_user.username == "user_R0000002"
-    assert models.CustomUser.objects.filter(registration_number="R0000002").exists()
+    assert new_user.registration_number == f"{atual + 2:08d}"
+    assert new_user.username == f"user_{atual + 2:08d}"
+
+
+@pytest.mark.django_db
+def test_bulk_create_users_cria_milhares_em_poucas_consultas(
+    django_assert_num_queries,
+):
+    existente = CustomUser.objects.create(
+        first_name="Existente",
+        email="existente@example.com",
+        registration_number="X0000001",
+        role="aluno",
+    )
+    Task.objects.all().delete()
+    novos = [
+        CustomUser(first_name=f"Aluno{i}", email=f"aluno{i}@example.com", role="aluno")
+        for i in range(2500)
+    ]
+    novos.append(CustomUser(first_name="Sem e-mail", role="aluno"))
+    novos.append(
+        CustomUser(
+            first_name="Com matrícula", role="aluno", registration_number="X0000002"
+        )
+    )
+
+    # matrículas (1), usernames ocupados (1), savepoint, 3 lotes de usuários,
+    # 3 de tarefas, release
+    with django_assert_num_queries(10):
+        criados = CustomUser.objects.bulk_create_users(
+            novos, password="Abc123@00", batch_size=1000
+        )
+
+    assert len(criados) == 2502
+    numeros = [u.registration_number for u in criados]
+    assert len(set(numeros)) == len(numeros)
+    assert existente.registration_number not in numeros
+    assert numeros[-1] == "X0000002"
+    assert all(u.username == f"user_{u.registration_number}" for u in criados)
+    assert criados[0].check_password("Abc123@00")
+    assert criados[0].password == criados[1].password
+    # boas-vindas na fila para quem tem e-mail
+    assert Task.objects.filter(name="welcome_email").count() == 2500
 
 
 @pytest.mark.django_db
-def test_excecao_em_send_welcome_email_eh_suprimida(monkeypatch):
+def test_bulk_create_users_troca_matricula_de_username_ocupado(settings):
+    settings.TASK_QUEUE = {"MAX_ATTEMPTS": 5}
+    proxima = int(CustomUser.objects.allocate_registration_numbers(1)[0]) + 1
+    # usuário antigo renomeado para o username que a próxima matrícula geraria
+    CustomUser.objects.create(
+        username=f"user_{proxima:08d}",
+        first_name="Antigo",
+        registration_number="X0000001",
+        role="aluno",
+    )
+    Task.objects.all().delete()
+
+    [novo] = CustomUser.objects.bulk_create_users(
+        [CustomUser(first_name="Novo", email="novo@example.com", role="aluno")]
+    )
+
+    assert novo.registration_number == f"{proxima + 1:08d}"
+    assert novo.username == f"user_{proxima + 1:08d}"
+    assert Task.objects.get(name="welcome_email").max_attempts == 5
+
+
+@pytest.mark.django_db
+def test_bulk_create_users_recusa_username_informado_em_uso():
+    CustomUser.objects.create(
+        username="ana", first_name="Ana", registration_number="X0000001"
+    )
+
+    with pytest.raises(ValueError, match="Usernames já em uso: ana"):
+        CustomUser.objects.bulk_create_users(
+            [CustomUser(username="ana", first_name="Outra Ana", role="aluno")]
+        )
+    assert CustomUser.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_excecao_em_send_welcome_email_fica_na_tarefa(monkeypatch):
     def raising_send(*args, **kwargs):
         raise RuntimeError("falha simulada no envio")
 
-    monkeypatch.setattr(models, "send_welcome_email", raising_send)
+    monkeypatch.setattr(tasks, "send_welcome_email", raising_send)
 
     user = CustomUser(
         first_name="Carlos",
@@ -85,7 +151,26 @@ def test_excecao_em_send_welcome_email_eh_suprimida(monkeypatch):
         registration_number="C7654321",
         role="aluno",
     )
-    # salvar não deve propagar a exceção do envio de email
     user.save()
+    tasks.work()
 
+    # o usuário foi salvo e o envio volta para a fila para nova tentativa
     assert models.CustomUser.objects.filter(registration_number="C7654321").exists()
+    task = Task.objects.get()
+    assert task.status == Task.PENDING
+    assert "falha simulada no envio" in task.last_error
+
+
+@pytest.mark.django_db
+def test_boas_vindas_usa_as_tentativas_configuradas(settings):
+    settings.TASK_QUEUE = {"MAX_ATTEMPTS": 5}
+
+    CustomUser.objects.create(
+        first_name="Rita",
+        last_name="Lima",
+        email="rita@example.com",
+        registration_number="R7654321",
+        role="aluno",
+    )
+
+    assert Task.objects.get(name="welcome_email").max_attempts == 5
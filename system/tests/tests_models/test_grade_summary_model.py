@@ -0,0 +1,155 @@
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+
+from ...exports import result_rows
+from ...models import (
+    Attendance,
+    AttendanceRecord,
+    Bimonthly,
+    CustomUser,
+    Grade,
+    GradeSummary,
+    Subject,
+    Team,
+)
+
+
+@pytest.fixture
+def dados():
+    aluno = CustomUser.objects.create(
+        first_name="Pedro",
+        last_name="Silva",
+        email="aluno@example.com",
+        registration_number="A1234567",
+        role="aluno",
+        password="teste123",
+    )
+    team = Team.objects.create(name="TDS A", year=2025)
+    subject = Subject.objects.create(name="Programação")
+    bimestres = [Bimonthly.objects.create(number=n, year=2025) for n in range(1, 5)]
+    return aluno, team, subject, bimestres
+
+
+def criar_nota(aluno, team, subject, bimestre, valor):
+    return Grade.objects.create(
+        student=aluno,
+        subject=subject,
+        team=team,
+        value_activity=valor,
+        value_proof=valor,
+        bimonthly=bimestre,
+    )
+
+
+@pytest.mark.django_db
+def test_resumo_criado_ao_salvar_nota(dados):
+    aluno, team, subject, bimestres = dados
+    criar_nota(aluno, team, subject, bimestres[0], 8.0)
+    criar_nota(aluno, team, subject, bimestres[1], 6.0)
+
+    summary = GradeSummary.objects.get(student=aluno, subject=subject, team=team)
+
+    assert summary.year == 2025
+    assert summary.grade_count == 2
+    assert summary.average == 7.0
+    assert summary.bimonthly_averages == {"1": 8.0, "2": 6.0}
+    assert summary.is_approved
+    assert summary.is_under_review
+
+
+@pytest.mark.django_db
+def test_resumo_atualizado_ao_editar_e_apagar_nota(dados):
+    aluno, team, subject, bimestres = dados
+    notas = [criar_nota(aluno, team, subject, b, 7.0) for b in bimestres]
+
+    nota = Grade.objects.get(pk=notas[0].pk)
+    nota.value_activity = nota.value_proof = 1.0
+    nota.save()
+
+    summary = GradeSummary.objects.get(student=aluno, subject=subject)
+    assert summary.grade_count == 4
+    assert summary.average == pytest.approx(5.5)
+    assert not summary.is_approved
+    assert not summary.is_under_review
+
+    nota.delete()
+    summary.refresh_from_db()
+    assert summary.grade_count == 3
+    assert summary.average == 7.0
+
+    Grade.objects.filter(student=aluno).delete()
+    assert not GradeSummary.objects.exists()
+
+
+@pytest.mark.django_db
+def test_resumo_atualizado_em_lote(dados):
+    aluno, team, subject, bimestres = dados
+    Grade.objects.bulk_create(
+        [
+            Grade(
+                student=aluno,
+                subject=subject,
+                team=team,
+                value_activity=4.0,
+                value_proof=4.0,
+                average=4.0,
+                bimonthly=b,
+            )
+            for b in bimestres
+        ]
+    )
+
+    summary = GradeSummary.objects.get(student=aluno, subject=subject)
+    assert summary.grade_count == 4
+    assert not summary.is_approved
+
+    Grade.objects.filter(student=aluno).update(average=9.0)
+    summary.refresh_from_db()
+    assert summary.average == 9.0
+    assert summary.is_approved
+
+
+def politica(min_attendance):
+    return {
+        "CLASS": "system.grading.GradingPolicy",
+        "OPTIONS": {"min_attendance": min_attendance},
+    }
+
+
+@pytest.mark.django_db
+def test_resumo_usa_frequencia_como_exportacao_e_recalcula(settings, dados):
+    settings.GRADING_POLICY = politica(0.75)
+    aluno, team, subject, bimestres = dados
+    professor = CustomUser.objects.create(
+        first_name="João", registration_number="P7654321", role="professor"
+    )
+    for b in bimestres:
+        criar_nota(aluno, team, subject, b, 9.0)
+    assert GradeSummary.objects.get(student=aluno).is_approved
+
+    # uma presença em quatro aulas: a chamada atualiza o resumo
+    for dia in range(4):
+        AttendanceRecord.objects.create(
+            attendance=Attendance.objects.create(
+                teacher=professor,
+                team=team,
+                subject=subject,
+                date=datetime.date(2025, 3, 3 + dia),
+            ),
+            student=aluno,
+            present=dia == 0,
+        )
+
+    summary = GradeSummary.objects.get(student=aluno)
+    assert summary.status == "Reprovado"
+    assert [row[-1] for row in result_rows(2025)] == [summary.status]
+
+    # política mudou: resumos gravados só mudam ao recalcular
+    settings.GRADING_POLICY = politica(None)
+    assert not GradeSummary.objects.get(student=aluno).is_approved
+    call_command("refresh_grade_summaries", year=2025, stdout=io.StringIO())
+    assert GradeSummary.objects.get(student=aluno).is_approved
+    assert [row[-1] for row in result_rows(2025)] == ["Aprovado"]
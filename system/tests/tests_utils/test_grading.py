@@ -0,0 +1,55 @@
+import numpy as np
+
+from ...grading import GradingPolicy, get_grading_policy
+
+NAN = np.nan
+
+
+def test_media_simples_em_lote():
+    policy = GradingPolicy()
+    result = policy.evaluate(
+        [
+            [6, 6, 6, 6],
+            [5, 6, 6, 6],
+            [8, 9, NAN, NAN],
+            [NAN, NAN, NAN, NAN],
+        ]
+    )
+
+    np.testing.assert_allclose(result.average, [6.0, 5.75, 8.5, NAN])
+    assert result.approved.tolist() == [True, False, True, False]
+    assert result.under_review.tolist() == [False, False, True, True]
+
+
+def test_pesos_por_bimestre():
+    policy = GradingPolicy(weights=(1, 1, 2, 2))
+    result = policy.evaluate([[3, 3, 7.5, 7.5]])
+
+    assert result.average[0] == 6.0
+    assert result.approved[0]
+
+
+def test_frequencia_minima():
+    policy = GradingPolicy(min_attendance=0.75)
+    result = policy.evaluate(
+        [[4, 4, 4, 4], [9, 9, 9, 9], [9, 9, 9, 9], [9, 9, 9, 9]],
+        attendance=[1.0, 1.0, 0.5, NAN],
+    )
+
+    assert result.average.tolist() == [4.0, 9.0, 9.0, 9.0]
+    assert result.approved.tolist() == [False, True, False, True]
+
+
+def test_grades_matrix():
+    matrix = GradingPolicy.grades_matrix([{"1": 7.0, "3": 5.0}, {}])
+
+    np.testing.assert_array_equal(matrix, [[7.0, NAN, 5.0, NAN], [NAN, NAN, NAN, NAN]])
+
+
+def test_politica_configurada_em_settings(settings):
+    settings.GRADING_POLICY = {
+        "CLASS": "system.grading.GradingPolicy",
+        "OPTIONS": {"min_average": 7.0},
+    }
+
+    assert get_grading_policy().min_average == 7.0
@@ -0,0 +1,184 @@
+import csv
+import datetime
+import io
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.urls import reverse
+
+from ... import exports
+from ...models import (
+    Attendance,
+    AttendanceRecord,
+    Bimonthly,
+    CustomUser,
+    Grade,
+    Subject,
+    Team,
+)
+from ...views import export_views
+
+
+@pytest.fixture
+def dados():
+    coordenador = CustomUser.objects.create(
+        first_name="Ana",
+        last_name="Lima",
+        email="coord@example.com",
+        registration_number="C0000001",
+        role="professor",
+        is_staff=True,
+    )
+    aluno = CustomUser.objects.create(
+        first_name="Pedro",
+        last_name="Silva",
+        email="aluno@example.com",
+        registration_number="A1234567",
+        role="aluno",
+    )
+    subject = Subject.objects.create(name="Programação")
+    for ano in (2024, 2025):
+        team = Team.objects.create(name="TDS A", year=ano)
+        Grade.objects.create(
+            student=aluno,
+            subject=subject,
+            team=team,
+            value_activity=8.0,
+            value_proof=9.0,
+            bimonthly=Bimonthly.objects.create(number=1, year=ano),
+        )
+        attendance = Attendance.objects.create(
+            teacher=coordenador,
+            team=team,
+            subject=subject,
+            date=datetime.date(ano, 5, 1),
+        )
+        AttendanceRecord.objects.create(
+            attendance=attendance, student=aluno, present=False
+        )
+    return coordenador, aluno
+
+
+def ler_csv(response):
+    content = b"".join(response.streaming_content).decode("utf-8")
+    return list(csv.reader(io.StringIO(content)))
+
+
+@pytest.mark.django_db
+def test_exporta_notas_filtrando_por_ano(client, dados):
+    coordenador, aluno = dados
+    client.force_login(coordenador)
+
+    response = client.get(reverse("export_grades"), {"year": 2025})
+
+    assert response.status_code == 200
+    assert response.streaming
+    linhas = ler_csv(response)
+    assert linhas[0][:3] == ["matricula", "nome", "sobrenome"]
+    assert len(linhas) == 2
+    assert linhas[1][:7] == [
+        "A1234567",
+        "Pedro",
+        "Silva",
+        "TDS A",
+        "2025",
+        "Programação",
+        "1",
+    ]
+    assert linhas[1][9] == "8.5"
+
+
+@pytest.mark.django_db
+def test_exporta_frequencia(client, dados):
+    coordenador, aluno = dados
+    client.force_login(coordenador)
+
+    response = client.get(reverse("export_attendance"))
+
+    linhas = ler_csv(response)
+    assert len(linhas) == 3
+    assert {linha[-1] for linha in linhas[1:]} == {"False"}
+
+
+@pytest.mark.django_db
+def test_exportacao_bloqueada_para_aluno(client, dados):
+    _, aluno = dados
+    client.force_login(aluno)
+
+    response = client.get(reverse("export_grades"))
+
+    assert response.status_code == 302
+    assert "acesso_negado" in response.url
+
+
+@pytest.mark.django_db
+def test_exporta_resultados_com_politica_de_frequencia(client, dados, settings):
+    settings.GRADING_POLICY = {
+        "CLASS": "system.grading.GradingPolicy",
+        "OPTIONS": {"min_attendance": 0.75},
+    }
+    coordenador, aluno = dados
+    client.force_login(coordenador)
+
+    response = client.get(reverse("export_results"), {"year": 2025})
+
+    linhas = ler_csv(response)
+    assert linhas[0][-1] == "situacao"
+    assert linhas[1] == [
+        "A1234567",
+        "Pedro",
+        "Silva",
+        "TDS A",
+        "2025",
+        "Programação",
+        "1",
+        "8.5",
+        "0.0",
+        "Em análise",
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_exportacao_sai_aos_poucos_pelo_asgi(client, dados, monkeypatch):
+    coordenador, aluno = dados
+    client.force_login(coordenador)
+    monkeypatch.setattr(exports, "EXPORT_CHUNK_SIZE", 1)
+
+    lidas = []
+
+    def grade_rows(**filters):
+        yield from exports.grade_rows(**filters)
+        lidas.append("fim")
+
+    monkeypatch.setattr(export_views, "grade_rows", grade_rows)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": reverse("export_grades"),
+        "query_string": b"",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"cookie", f"sessionid={client.cookies['sessionid'].value}".encode()),
+        ],
+    }
+    corpo = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        if message.get("body"):
+            # o que já tinha sido lido do banco quando o pedaço saiu
+            corpo.append((message["body"], list(lidas)))
+
+    async_to_sync(ASGIHandler())(scope, receive, send)
+
+    # cabeçalho e uma linha por nota, cada um num pedaço, e o primeiro
+    # sai antes de o cursor chegar ao fim
+    assert len(corpo) == 3
+    assert corpo[0][1] == []
+    linhas = list(csv.reader(io.StringIO(b"".join(c for c, _ in corpo).decode())))
+    assert linhas[0][0] == "matricula"
+    assert [linha[4] for linha in linhas[1:]] == ["2024", "2025"]
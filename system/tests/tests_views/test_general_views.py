@@ -1,7 +1,14 @@
+import os
+import subprocess
+import sys
+
 import pytest
+from django.core.cache import cache
+from django.db import connection
 from django.urls import reverse
 
-from ...models import CustomUser
+from ...models import Announcement, AnnouncementRead, CustomUser, Team
+from ...notifications import bulk_notify, get_unread_count, publish_announcement
 
 
 @pytest.mark.django_db
@@ -23,6 +30,193 @@ def test_view_home(client):
     assert "home.html" in (t.name for t in response.templates)
 
 
+@pytest.mark.django_db
+def test_home_le_nao_lidas_do_cache(
+    client, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    cache.clear()
+    professor = CustomUser.objects.create_user(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+        password="teste123",
+    )
+    aluno = CustomUser.objects.create_user(
+        first_name="Pedro",
+        last_name="Silva",
+        email="aluno@example.com",
+        registration_number="A1234567",
+        role="aluno",
+        password="teste123",
+    )
+    bulk_notify([aluno.pk, aluno.pk], professor, "Aviso")
+    client.force_login(aluno)
+
+    # a primeira leitura conta no banco e cria o contador
+    response = client.get(reverse("home"))
+    assert response.context["unread_notifications_count"] == 2
+
+    # depois sessão, usuário e os dois contadores numa leitura do cache, sem
+    # o COUNT das notificações nem o dos avisos
+    with django_assert_num_queries(3) as queries:
+        response = client.get(reverse("home"))
+    assert response.context["unread_notifications_count"] == 2
+    assert not any("notifications_notification" in q["sql"] for q in queries)
+    assert not any("system_announcement" in q["sql"] for q in queries)
+
+    # notificação nova apaga o contador e a leitura seguinte conta de novo
+    with django_capture_on_commit_callbacks(execute=True):
+        bulk_notify([aluno.pk], professor, "Outro aviso")
+    response = client.get(reverse("home"))
+    assert response.context["unread_notifications_count"] == 3
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.get(reverse("mark_notifications_as_read"))
+    response = client.get(reverse("home"))
+    assert response.context["unread_notifications_count"] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_contador_ve_notificacao_enviada_por_outro_processo():
+    cache.clear()
+    professor = CustomUser.objects.create(
+        first_name="João", registration_number="P7654321", role="professor"
+    )
+    aluno = CustomUser.objects.create(
+        first_name="Pedro", registration_number="A1234567", role="aluno"
+    )
+    assert get_unread_count(aluno) == 0
+
+    # o worker (outro processo) envia pelo mesmo banco e cache
+    script = (
+        "import django; django.setup();"
+        "from system.models import CustomUser;"
+        "from system.notifications import bulk_notify;"
+        f"bulk_notify([{aluno.pk}], CustomUser.objects.get(pk={professor.pk}), 'Aviso')"
+    )
+    subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        env={**os.environ, "DB_NAME": connection.settings_dict["NAME"]},
+    )
+
+    assert get_unread_count(aluno) == 1
+
+
+@pytest.mark.django_db
+def test_avisos_lidos_por_marcador_e_marca_dagua(client):
+    professor = CustomUser.objects.create_user(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+        password="teste123",
+    )
+    team, outra = (Team.objects.create(name=n, year=2025) for n in ("A", "B"))
+    aluno, de_fora = (
+        CustomUser.objects.create_user(
+            first_name=nome,
+            last_name="Silva",
+            email=f"{nome}@example.com",
+            registration_number=matricula,
+            role="aluno",
+            password="teste123",
+        )
+        for nome, matricula in (("Pedro", "A1234567"), ("Ana", "A7654321"))
+    )
+    team.members.add(aluno)
+    outra.members.add(de_fora)
+
+    def avisar(titulo):
+        aviso = Announcement.objects.create(
+            author=professor, title=titulo, content="..."
+        )
+        aviso.teams.add(team)
+        return aviso
+
+    primeiro, segundo = avisar("Prova"), avisar("Feira")
+    client.force_login(aluno)
+
+    response = client.get(reverse("list_notifications"))
+    assert list(response.context["announcements"]) == [segundo, primeiro]
+    assert not Announcement.objects.unread_for(de_fora).exists()
+
+    # ler um aviso cria só o marcador dele
+    client.post(reverse("mark_announcement_as_read", args=[primeiro.id]))
+    assert list(Announcement.objects.unread_for(aluno)) == [segundo]
+    assert AnnouncementRead.objects.filter(user=aluno).count() == 1
+
+    # marcar todos avança a marca d'água e dispensa os marcadores
+    client.get(reverse("mark_notifications_as_read"))
+    aluno.refresh_from_db()
+    assert aluno.announcements_read_at is not None
+    assert not AnnouncementRead.objects.exists()
+    assert not Announcement.objects.unread_for(aluno).exists()
+
+    terceiro = avisar("Reunião")
+    assert list(Announcement.objects.unread_for(aluno)) == [terceiro]
+
+    # aviso de outra turma não pode ser marcado
+    client.force_login(de_fora)
+    response = client.post(reverse("mark_announcement_as_read", args=[terceiro.id]))
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_contador_de_avisos_em_cache(client, django_capture_on_commit_callbacks):
+    cache.clear()
+    professor = CustomUser.objects.create_user(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+        password="teste123",
+    )
+    aluno = CustomUser.objects.create_user(
+        first_name="Pedro",
+        last_name="Silva",
+        email="aluno@example.com",
+        registration_number="A1234567",
+        role="aluno",
+        password="teste123",
+    )
+    team = Team.objects.create(name="A", year=2025)
+    team.members.add(aluno)
+    client.force_login(aluno)
+
+    def avisar(titulo):
+        with django_capture_on_commit_callbacks(execute=True):
+            aviso = Announcement.objects.create(
+                author=professor, title=titulo, content="..."
+            )
+            aviso.teams.add(team)
+            publish_announcement(aviso, [team])
+        return aviso
+
+    def contador():
+        return client.get(reverse("home")).context["unread_notifications_count"]
+
+    assert contador() == 0
+
+    # aviso novo apaga o contador dos alunos da turma
+    primeiro = avisar("Prova")
+    avisar("Feira")
+    assert contador() == 2
+
+    # ler um aviso também
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(reverse("mark_announcement_as_read", args=[primeiro.id]))
+    assert contador() == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.get(reverse("mark_notifications_as_read"))
+    assert contador() == 0
+
+
 @pytest.mark.django_db
 def test_view_login_get(client):
     response = client.get(reverse("login"))
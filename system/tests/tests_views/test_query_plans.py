@@ -0,0 +1,260 @@
+import datetime
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from notifications.models import Notification
+
+from ...models import (
+    Announcement,
+    Attendance,
+    AttendanceRecord,
+    Bimonthly,
+    CustomUser,
+    Grade,
+    Subject,
+    Team,
+)
+from ...notifications import build_notification
+
+# Tabelas que crescem com o número de alunos: nelas toda consulta das telas
+# precisa chegar por índice. Tabelas de cadastro (turmas, matérias,
+# bimestres) são pequenas e podem ser lidas inteiras.
+HOT_TABLES = {
+    Grade._meta.db_table,
+    Attendance._meta.db_table,
+    AttendanceRecord._meta.db_table,
+    "system_gradesummary",
+    "system_attendancesummary",
+    "system_finalresult",
+    "notifications_notification",
+    "system_announcement",
+    "system_announcementread",
+}
+
+TEAMS = 12
+STUDENTS_PER_TEAM = 25
+SUBJECTS = 6
+SESSIONS = 10
+YEAR = 2025
+
+
+def _seed():
+    teacher = CustomUser.objects.create_user(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P0000001",
+        role="professor",
+        password="teste123",
+    )
+    other_teacher = CustomUser.objects.create_user(
+        first_name="Maria",
+        last_name="Souza",
+        email="prof2@example.com",
+        registration_number="P0000002",
+        role="professor",
+        password="teste123",
+    )
+    subjects = [Subject.objects.create(name=f"Matéria {i}") for i in range(SUBJECTS)]
+    for subject in subjects:
+        subject.teachers.add(teacher, other_teacher)
+    # um ano anterior, para que o filtro por ano também seja seletivo
+    bimestres = {
+        year: [Bimonthly.objects.create(number=n, year=year) for n in range(1, 5)]
+        for year in (YEAR - 1, YEAR)
+    }
+    first_day = datetime.date(YEAR, 3, 2)
+
+    teams = []
+    for t in range(TEAMS):
+        team = Team.objects.create(name=f"Turma {t:02d}", year=YEAR)
+        for subject in subjects:
+            subject.team.add(team)
+        students = CustomUser.objects.bulk_create(
+            CustomUser(
+                username=f"user_{t:02d}{i:06d}",
+                registration_number=f"{t:02d}{i:06d}",
+                first_name=f"Aluno{i:02d}",
+                last_name=f"Turma{t:02d}",
+                role="aluno",
+            )
+            for i in range(STUDENTS_PER_TEAM)
+        )
+        team.members.add(*students)
+        teams.append((team, students))
+
+        Grade.objects.bulk_create(
+            Grade(
+                student=student,
+                subject=subject,
+                team=team,
+                bimonthly=bimestre,
+                value_activity=(s + n) % 11,
+                value_proof=(s * n) % 11,
+                average=((s + n) % 11 + (s * n) % 11) / 2,
+            )
+            for s, student in enumerate(students)
+            for subject in subjects
+            for years in bimestres.values()
+            for n, bimestre in enumerate(years, start=1)
+        )
+
+        sessions = Attendance.objects.bulk_create(
+            Attendance(
+                teacher=teacher if d % 2 else other_teacher,
+                team=team,
+                subject=subject,
+                date=first_day + datetime.timedelta(days=7 * d),
+            )
+            for subject in subjects
+            for d in range(SESSIONS)
+        )
+        AttendanceRecord.objects.bulk_create(
+            AttendanceRecord(
+                attendance=session,
+                student=student,
+                present=(s + a) % 5 != 0,
+            )
+            for a, session in enumerate(sessions)
+            for s, student in enumerate(students)
+        )
+
+        Notification.objects.bulk_create(
+            build_notification(student.pk, teacher, f"Aviso {n}", target=subjects[0])
+            for student in students
+            for n in range(5)
+        )
+
+        for n in range(5):
+            aviso = Announcement.objects.create(
+                author=teacher, title=f"Aviso {n}", content="..."
+            )
+            aviso.teams.add(team)
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    team, students = teams[TEAMS // 2]
+    return {
+        "professor": teacher,
+        "aluno": students[STUDENTS_PER_TEAM // 2],
+        "team": team,
+        "subject": subjects[SUBJECTS // 2],
+        "bimonthly": bimestres[YEAR][1],
+    }
+
+
+@pytest.fixture(scope="module")
+def escola(django_db_setup, django_db_blocker):
+    # Semeado uma vez por módulo, numa transação desfeita no final; cada
+    # teste roda num savepoint dentro dela.
+    with django_db_blocker.unblock(), transaction.atomic():
+        yield _seed()
+        transaction.set_rollback(True)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def uncovered_scans(queries):
+    """
+    Roda EXPLAIN ANALYZE em cada SELECT capturado e devolve as leituras de
+    tabelas grandes sem índice que cubra o filtro: Seq Scan, índice
+    percorrido inteiro (sem Index Cond) ou índice que descarta mais linhas
+    do que devolve (Rows Removed by Filter).
+
+    Seq Scan e hash/merge join desligados fazem o planejador preferir, em
+    qualquer tamanho de base, um acesso por índice sempre que houver um;
+    o que sobrar é índice que falta.
+    """
+    scans = []
+    with connection.cursor() as cursor:
+        for setting in ("enable_seqscan", "enable_hashjoin", "enable_mergejoin"):
+            cursor.execute(f"SET LOCAL {setting} = off")
+        for query in queries:
+            sql = query["sql"]
+            if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0][0]["Plan"]
+            for node in _plan_nodes(plan):
+                if node.get("Relation Name") not in HOT_TABLES:
+                    continue
+                kind = node["Node Type"]
+                if kind == "Seq Scan" or (
+                    kind in ("Index Scan", "Index Only Scan")
+                    and (
+                        "Index Cond" not in node
+                        or node.get("Rows Removed by Filter", 0) > node["Actual Rows"]
+                    )
+                ):
+                    scans.append(f"{kind} em {node['Relation Name']}: {sql}")
+    return scans
+
+
+VIEWS = {
+    "home": ("aluno", lambda e: reverse("home")),
+    "search": ("aluno", lambda e: reverse("search") + "?q=Mat"),
+    "my_grades": ("aluno", lambda e: reverse("my_grades", args=[e["aluno"].id])),
+    "grade_details": (
+        "aluno",
+        lambda e: reverse("grade_details", args=[e["aluno"].id, e["subject"].id]),
+    ),
+    "my_fouls": ("aluno", lambda e: reverse("my_fouls", args=[e["aluno"].id])),
+    "my_fouls_filtrado": (
+        "aluno",
+        lambda e: reverse("my_fouls", args=[e["aluno"].id])
+        + f"?subject={e['subject'].id}&month={YEAR}-03",
+    ),
+    "list_notifications": ("aluno", lambda e: reverse("list_notifications")),
+    "turmas": ("professor", lambda e: reverse("turmas")),
+    "escolher_materia": (
+        "professor",
+        lambda e: reverse("escolher_materia", args=[e["team"].id]),
+    ),
+    "turma_detail": (
+        "professor",
+        lambda e: reverse("turma_detail", args=[e["team"].id, e["subject"].id]),
+    ),
+    "turma_analytics_json": (
+        "professor",
+        lambda e: reverse("turma_analytics_json", args=[e["team"].id, e["subject"].id]),
+    ),
+    "gradebook": (
+        "professor",
+        lambda e: reverse(
+            "gradebook",
+            args=[e["team"].id, e["subject"].id, e["bimonthly"].id],
+        ),
+    ),
+    "update_grade": (
+        "professor",
+        lambda e: reverse(
+            "update_grade",
+            args=[e["team"].id, e["subject"].id, e["aluno"].id, e["bimonthly"].id],
+        ),
+    ),
+    "fazer_chamada": (
+        "professor",
+        lambda e: reverse("fazer_chamada", args=[e["team"].id, e["subject"].id]),
+    ),
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("view", VIEWS)
+def test_consultas_das_telas_usam_indices(client, escola, view):
+    role, url = VIEWS[view]
+    client.force_login(escola[role])
+
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url(escola))
+
+    assert response.status_code == 200
+    scans = uncovered_scans(captured.captured_queries)
+    assert not scans, "\n\n".join(scans)
@@ -0,0 +1,271 @@
+import asyncio
+import datetime
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.urls import reverse
+from notifications.models import Notification
+
+from ... import events
+from ...models import (
+    Announcement,
+    Attendance,
+    AttendanceRecord,
+    Bimonthly,
+    CustomUser,
+    Grade,
+    Subject,
+    Team,
+)
+from ...notifications import build_notification, publish_announcement
+
+
+def criar_aluno_com_notas(total_materias):
+    aluno = CustomUser.objects.create_user(
+        first_name="Pedro",
+        last_name="Silva",
+        email="aluno@example.com",
+        registration_number="A1234567",
+        role="aluno",
+        password="teste123",
+    )
+    team = Team.objects.create(name="TDS A", year=2025)
+    team.members.add(aluno)
+    bimestres = [Bimonthly.objects.create(number=n, year=2025) for n in range(1, 5)]
+
+    for i in range(total_materias):
+        subject = Subject.objects.create(name=f"Matéria {i}")
+        subject.team.add(team)
+        for bimestre in bimestres:
+            Grade.objects.create(
+                student=aluno,
+                subject=subject,
+                team=team,
+                value_activity=7.0,
+                value_proof=8.0,
+                bimonthly=bimestre,
+            )
+    return aluno
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("total_materias", [1, 8])
+def test_my_grades_consultas_constantes(
+    client, django_assert_num_queries, total_materias
+):
+    aluno = criar_aluno_com_notas(total_materias)
+    client.force_login(aluno)
+
+    # sessão, usuário, aluno (aluno_only), turma, encerramento do ano,
+    # resumos e disciplinas
+    with django_assert_num_queries(7):
+        response = client.get(reverse("my_grades", args=[aluno.id]))
+
+    assert response.status_code == 200
+    items = response.context["subjects_with_grades"]
+    assert len(items) == total_materias
+    assert all(item["status"] == "Aprovado" for item in items)
+    assert response.context["bimonthlys"] == 4
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("total_materias", [1, 8])
+def test_search_consultas_constantes(client, django_assert_num_queries, total_materias):
+    aluno = criar_aluno_com_notas(total_materias)
+    client.force_login(aluno)
+
+    # sessão, usuário, aluno, turma, encerramento do ano, resumos e disciplinas
+    with django_assert_num_queries(7):
+        response = client.get(reverse("search"), {"q": "Matéria 0"})
+
+    assert response.status_code == 200
+    items = response.context["subjects_with_grades"]
+    assert [item["subject"].name for item in items] == ["Matéria 0"]
+    assert items[0]["media"] == 7.5
+
+
+@pytest.mark.django_db
+def test_my_fouls_total_pelo_resumo_e_lista_por_chave(client):
+    aluno = criar_aluno_com_notas(1)
+    professor = CustomUser.objects.create(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+    )
+    team = Team.objects.get()
+    subject = Subject.objects.get()
+    for dia in range(1, 26):
+        chamada = Attendance.objects.create(
+            teacher=professor,
+            team=team,
+            subject=subject,
+            date=datetime.date(2025, 3, dia),
+        )
+        AttendanceRecord.objects.create(
+            attendance=chamada, student=aluno, present=dia > 22
+        )
+    client.force_login(aluno)
+    url = reverse("my_fouls", args=[aluno.id])
+
+    response = client.get(url, {"month": "2025-03"})
+    assert response.context["fouls_count"] == 22
+    assert len(response.context["fouls"]) == 20
+
+    proxima = client.get(
+        url, {"month": "2025-03", "after": response.context["next_cursor"]}
+    )
+    assert [f.date.day for f in proxima.context["fouls"]] == [21, 22]
+    assert proxima.context["next_cursor"] == ""
+
+    outro_mes = client.get(url, {"month": "2025-04"})
+    assert outro_mes.context["fouls_count"] == 0
+    assert outro_mes.context["fouls"] == []
+
+
+@pytest.mark.django_db
+def test_stream_notifications_entrega_aviso_da_turma(
+    async_client, django_capture_on_commit_callbacks
+):
+    aluno = criar_aluno_com_notas(1)
+    team = aluno.teams.get()
+    outra = Team.objects.create(name="TDS B", year=2025)
+    professor = CustomUser.objects.create_user(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P1234567",
+        role="professor",
+        password="teste123",
+    )
+    async_client.force_login(aluno)
+
+    def publicar(*turmas):
+        with django_capture_on_commit_callbacks(execute=True):
+            aviso = Announcement.objects.create(
+                author=professor, title="Prova", content="Prova na sexta."
+            )
+            aviso.teams.add(*turmas)
+            publish_announcement(aviso, turmas)
+        return aviso
+
+    async def cenario():
+        response = await async_client.get(reverse("stream_notifications"))
+        assert response["Content-Type"] == "text/event-stream"
+        stream = response.streaming_content
+        # a assinatura já está feita quando chega a primeira mensagem
+        assert await anext(stream) == b"retry: 3000\n\n"
+
+        # aviso de outra turma não chega; o da turma do aluno, sim
+        await sync_to_async(publicar)(outra)
+        aviso = await sync_to_async(publicar)(team, outra)
+        message = (await asyncio.wait_for(anext(stream), 5)).decode()
+        await stream.aclose()
+        return aviso, message
+
+    aviso, message = async_to_sync(cenario)()
+
+    assert message.startswith("event: aviso\nid: ")
+    assert f'"id": {aviso.id}, "title": "Prova"' in message
+    assert not events.get_broker()._subscribers
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("total", [3, 25])
+def test_list_notifications_pagina_com_remetentes_em_lote(
+    client, django_assert_num_queries, total
+):
+    aluno = criar_aluno_com_notas(0)
+    professores = []
+    for i in range(2):
+        professor = CustomUser.objects.create_user(
+            first_name=f"Professor{i}",
+            email=f"prof{i}@example.com",
+            registration_number=f"P000000{i}",
+            role="professor",
+            password="teste123",
+        )
+        Subject.objects.create(name=f"Matéria {i}").teachers.add(professor)
+        professores.append(professor)
+    Notification.objects.bulk_create(
+        build_notification(aluno.pk, professores[n % 2], f"Aviso {n}")
+        for n in range(total)
+    )
+    client.force_login(aluno)
+
+    # sessão, usuário, a página, os remetentes, as matérias deles e os
+    # avisos das turmas, qualquer que seja o número de notificações
+    with django_assert_num_queries(6):
+        response = client.get(reverse("list_notifications"))
+
+    pagina = response.context["notifications"]
+    assert len(pagina) == min(total, 20)
+    assert all(
+        n.sender_subject.name == f"Matéria {professores.index(n.actor)}" for n in pagina
+    )
+
+    vistos = {n.id for n in pagina}
+    next_cursor = response.context["next_cursor"]
+    if total > 20:
+        response = client.get(reverse("list_notifications"), {"before": next_cursor})
+        vistos |= {n.id for n in response.context["notifications"]}
+        assert response.context["next_cursor"] == ""
+        assert not response.context["announcements"]
+    else:
+        assert next_cursor == ""
+    assert vistos == set(Notification.objects.values_list("id", flat=True))
+
+
+@pytest.mark.django_db
+def test_list_notifications_pagina_os_avisos_das_turmas(
+    client, django_assert_num_queries
+):
+    aluno = criar_aluno_com_notas(0)
+    team = aluno.teams.get()
+    professor = CustomUser.objects.create_user(
+        first_name="João",
+        email="prof@example.com",
+        registration_number="P1234567",
+        role="professor",
+        password="teste123",
+    )
+    avisos = Announcement.objects.bulk_create(
+        Announcement(author=professor, title=f"Aviso {n}", content="...")
+        for n in range(25)
+    )
+    Announcement.teams.through.objects.bulk_create(
+        Announcement.teams.through(announcement=aviso, team=team) for aviso in avisos
+    )
+    notificacoes = Notification.objects.bulk_create(
+        build_notification(aluno.pk, professor, f"Pessoal {n}") for n in range(5)
+    )
+    # metade no mesmo instante, para a chave desempatar entre as fontes
+    instante = avisos[0].created_at
+    Announcement.objects.filter(pk__in=[a.pk for a in avisos[::2]]).update(
+        created_at=instante
+    )
+    Notification.objects.filter(pk__in=[n.pk for n in notificacoes[::2]]).update(
+        timestamp=instante
+    )
+    client.force_login(aluno)
+
+    vistos, cursor, paginas = [], "", 0
+    while True:
+        # sessão, usuário, as notificações, os remetentes, as matérias deles
+        # e os avisos, com a página do tamanho de sempre
+        with django_assert_num_queries(6):
+            response = client.get(reverse("list_notifications"), {"before": cursor})
+        pagina = list(response.context["announcements"]) + list(
+            response.context["notifications"]
+        )
+        assert len(pagina) <= 20
+        vistos += pagina
+        paginas += 1
+        cursor = response.context["next_cursor"]
+        if not cursor:
+            break
+
+    assert paginas == 2
+    assert len(vistos) == len(set(vistos)) == 30
+    assert set(vistos) == set(avisos) | set(notificacoes)
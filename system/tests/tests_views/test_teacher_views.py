@@ -0,0 +1,479 @@
+import datetime
+import json
+import threading
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from notifications.models import Notification
+
+from ...attendance_sync import sync_roll_calls
+from ...models import (
+    Announcement,
+    Attendance,
+    AttendanceRecord,
+    AttendanceSummary,
+    Bimonthly,
+    CustomUser,
+    Grade,
+    Subject,
+    Team,
+)
+
+
+@pytest.fixture
+def turma_com_notas():
+    professor = CustomUser.objects.create_user(
+        first_name="João",
+        last_name="Santos",
+        email="prof@example.com",
+        registration_number="P7654321",
+        role="professor",
+        password="teste123",
+    )
+    team = Team.objects.create(name="TDS A", year=2025)
+    subject = Subject.objects.create(name="Matemática")
+    subject.team.add(team)
+    subject.teachers.add(professor)
+    bimestres = [Bimonthly.objects.create(number=n, year=2025) for n in range(1, 5)]
+
+    alunos = []
+    for i in range(25):
+        aluno = CustomUser.objects.create(
+            first_name=f"Aluno{i:02d}",
+            last_name="Teste",
+            email=f"aluno{i}@example.com",
+            registration_number=f"{i:08d}",
+            role="aluno",
+            password="teste123",
+        )
+        team.members.add(aluno)
+        alunos.append(aluno)
+
+    # 0-9 aprovados, 10-19 reprovados, 20-24 sem todas as notas
+    for i, aluno in enumerate(alunos):
+        valor = 8.0 if i < 10 else 3.0
+        for bimestre in bimestres if i < 20 else bimestres[:2]:
+            Grade.objects.create(
+                student=aluno,
+                subject=subject,
+                team=team,
+                value_activity=valor,
+                value_proof=valor,
+                bimonthly=bimestre,
+            )
+
+    return professor, team, subject
+
+
+@pytest.mark.django_db
+def test_turma_detail_pagina_no_banco(client, turma_com_notas):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+
+    response = client.get(
+        reverse("turma_detail", args=[team.id, subject.id]), {"page": 2}
+    )
+
+    assert response.status_code == 200
+    page_obj = response.context["page_obj"]
+    assert page_obj.paginator.count == 25
+    assert [a.first_name for a in page_obj] == [f"Aluno{i:02d}" for i in range(10, 20)]
+    assert {a.status for a in page_obj} == {"reprovado"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "status, esperado", [("aprovado", 10), ("reprovado", 10), ("analise", 5)]
+)
+def test_turma_detail_filtra_status(client, turma_com_notas, status, esperado):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+
+    response = client.get(
+        reverse("turma_detail", args=[team.id, subject.id]), {"status": status}
+    )
+
+    page_obj = response.context["page_obj"]
+    assert page_obj.paginator.count == esperado
+    assert {a.status for a in page_obj} == {status}
+
+
+@pytest.mark.django_db
+def test_turma_detail_filtra_nome(client, turma_com_notas):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+
+    response = client.get(
+        reverse("turma_detail", args=[team.id, subject.id]), {"q": "aluno07"}
+    )
+
+    alunos = list(response.context["page_obj"])
+    assert [a.first_name for a in alunos] == ["Aluno07"]
+    assert alunos[0].status == "aprovado"
+    assert alunos[0].media == 8.0
+
+
+@pytest.mark.django_db
+def test_turma_analytics_json(client, turma_com_notas):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+
+    response = client.get(reverse("turma_analytics_json", args=[team.id, subject.id]))
+
+    stats = response.json()
+    assert stats["students"] == 25
+    assert stats["grades"] == 90
+    assert stats["mean"] == 5.0
+    assert stats["median"] == 3.0
+    assert stats["approval_rate"] == 0.4
+    assert sum(faixa["count"] for faixa in stats["histogram"]) == 25
+    assert stats["bimonthlys"][0] == {"number": 1, "mean": 5.0, "count": 25}
+    assert stats["bimonthlys"][2] == {"number": 3, "mean": 5.5, "count": 20}
+
+
+@pytest.mark.django_db
+def test_turma_analytics_aplica_a_frequencia_minima(client, turma_com_notas, settings):
+    settings.GRADING_POLICY = {
+        "CLASS": "system.grading.GradingPolicy",
+        "OPTIONS": {"min_attendance": 0.75},
+    }
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+    aluno = team.members.order_by("first_name").first()
+    # aprovado pela média, mas com uma presença em quatro aulas
+    for dia in range(4):
+        AttendanceRecord.objects.create(
+            attendance=Attendance.objects.create(
+                teacher=professor,
+                team=team,
+                subject=subject,
+                date=datetime.date(2025, 3, 3 + dia),
+            ),
+            student=aluno,
+            present=dia == 0,
+        )
+
+    response = client.get(reverse("turma_analytics_json", args=[team.id, subject.id]))
+
+    assert response.json()["approval_rate"] == 0.36
+    assert aluno.grade_summaries.get(subject=subject).status == "Reprovado"
+
+
+@pytest.mark.django_db
+def test_turma_analytics_pagina(client, turma_com_notas):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+
+    response = client.get(reverse("turma_analytics", args=[team.id, subject.id]))
+    vazio = client.get(
+        reverse("turma_analytics", args=[team.id, subject.id]), {"year": 2024}
+    )
+
+    assert response.status_code == 200
+    assert response.context["stats"]["students"] == 25
+    assert vazio.status_code == 200
+    assert vazio.context["stats"]["students"] == 0
+
+
+@pytest.mark.django_db
+def test_gradebook_salva_turma_em_lote(
+    client, turma_com_notas, django_assert_max_num_queries
+):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+    bimestre = Bimonthly.objects.get(number=3, year=2025)
+    alunos = list(team.members.order_by("first_name"))
+
+    dados = {}
+    for aluno in alunos:
+        dados[f"activity_{aluno.id}"] = "10"
+        dados[f"proof_{aluno.id}"] = "9"
+
+    with django_assert_max_num_queries(17):
+        response = client.post(
+            reverse("gradebook", args=[team.id, subject.id, bimestre.id]), dados
+        )
+
+    assert response.status_code == 302
+    notas = Grade.objects.filter(team=team, subject=subject, bimonthly=bimestre)
+    assert notas.count() == 25
+    assert {n.average for n in notas} == {9.5}
+    # alunos 20-24 tinham só dois bimestres e agora têm três
+    assert alunos[24].grade_summaries.get(subject=subject).grade_count == 3
+
+
+@pytest.mark.django_db
+def test_gradebook_nao_salva_com_nota_invalida(client, turma_com_notas):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+    bimestre = Bimonthly.objects.get(number=3, year=2025)
+    alunos = list(team.members.order_by("first_name"))
+
+    response = client.post(
+        reverse("gradebook", args=[team.id, subject.id, bimestre.id]),
+        {
+            f"activity_{alunos[0].id}": "5",
+            f"proof_{alunos[0].id}": "5",
+            f"activity_{alunos[1].id}": "11",
+            f"proof_{alunos[1].id}": "5",
+            f"activity_{alunos[2].id}": "nan",
+            f"proof_{alunos[2].id}": "inf",
+        },
+    )
+
+    assert response.status_code == 200
+    linhas = response.context["linhas"]
+    assert linhas[1]["error"] == "Nenhuma nota pode ser maior que 10.0."
+    assert linhas[2]["error"] == "Informe notas numéricas."
+    assert Grade.objects.get(student=alunos[0], bimonthly=bimestre).average == 8.0
+
+
+@pytest.mark.django_db
+def test_gradebook_recusa_bimestre_de_outro_ano(client, turma_com_notas):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+    outro_ano = Bimonthly.objects.create(number=1, year=2024)
+
+    response = client.get(
+        reverse("gradebook", args=[team.id, subject.id, outro_ano.id])
+    )
+
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("anos_anteriores", [0, 5])
+def test_update_grade_escolhe_bimestre_em_uma_consulta(
+    client, turma_com_notas, django_assert_num_queries, anos_anteriores
+):
+    professor, team, subject = turma_com_notas
+    for ano in range(2025 - anos_anteriores, 2025):
+        for n in range(1, 5):
+            Bimonthly.objects.create(number=n, year=ano)
+    aluno = team.members.order_by("first_name").last()
+    client.force_login(professor)
+
+    # sessão, usuário, aluno, turma, matéria, matrícula na turma e notas
+    with django_assert_num_queries(7):
+        response = client.get(
+            reverse("update_grade", args=[team.id, subject.id, aluno.id])
+        )
+
+    bimestres = response.context["bimestres"]
+    assert [item["bimonthly"].number for item in bimestres] == [1, 2]
+    assert all(item["grade"].average == 3.0 for item in bimestres)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("faltosos", [0, 12])
+def test_chamada_grava_turma_em_lote(
+    client, turma_com_notas, django_assert_num_queries, faltosos
+):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+    alunos = list(team.members.order_by("first_name"))
+    url = reverse("fazer_chamada", args=[team.id, subject.id])
+
+    client.post(url, {f"presente_{aluno.id}": "on" for aluno in alunos})
+
+    # refazer a chamada atualiza os mesmos registros: sessão, usuário, turma,
+    # matéria, savepoint, chamada do dia, alunos, savepoint, upsert, resumo
+    # de faltas (linhas, chamadas compactas, savepoint, upsert, release) e
+    # dois releases
+    with django_assert_num_queries(16):
+        response = client.post(
+            url, {f"presente_{aluno.id}": "on" for aluno in alunos[faltosos:]}
+        )
+
+    assert response.status_code == 302
+    registros = AttendanceRecord.objects.filter(attendance__team=team)
+    assert registros.count() == 25
+    assert registros.filter(present=False).count() == faltosos
+
+
+def _lote_de_chamadas(team, subject, alunos, dias):
+    return [
+        {
+            "key": f"tablet-1-{dia}",
+            "team": team.id,
+            "subject": subject.id,
+            "date": f"2025-03-{dia:02d}",
+            "records": [
+                {"student": aluno.id, "present": i % 2 == 0}
+                for i, aluno in enumerate(alunos)
+            ],
+        }
+        for dia in dias
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("dias", [2, 10])
+def test_sync_chamadas_em_lote(
+    client, turma_com_notas, django_assert_num_queries, dias
+):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+    alunos = list(team.members.all())
+    url = reverse("sync_chamadas")
+    items = _lote_de_chamadas(team, subject, alunos, range(1, dias + 1))
+
+    # o custo não depende de quantas chamadas vêm no lote
+    with django_assert_num_queries(21):
+        response = client.post(
+            url, json.dumps({"items": items}), content_type="application/json"
+        )
+
+    assert response.status_code == 200
+    assert {r["status"] for r in response.json()["results"]} == {"created"}
+    assert AttendanceRecord.objects.count() == 25 * dias
+    assert AttendanceSummary.objects.get(student=alunos[1]).absences == dias
+
+    # reenviar o mesmo lote (tablet sem resposta) não aplica de novo
+    response = client.post(
+        url, json.dumps({"items": items}), content_type="application/json"
+    )
+    assert {r["status"] for r in response.json()["results"]} == {"duplicate"}
+    assert AttendanceRecord.objects.count() == 25 * dias
+
+
+@pytest.mark.django_db
+def test_sync_chamadas_resultado_por_item(client, turma_com_notas):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+    alunos = list(team.members.all())
+    items = _lote_de_chamadas(team, subject, alunos, [1, 2, 3])
+    items[1]["records"].append({"student": professor.id, "present": True})
+    items[2]["date"] = "2999-01-01"
+
+    response = client.post(
+        reverse("sync_chamadas"),
+        json.dumps({"items": items}),
+        content_type="application/json",
+    )
+
+    results = response.json()["results"]
+    assert results[0]["status"] == "created"
+    assert results[1]["error"] == f"Alunos fora da turma: {professor.id}."
+    assert "futuro" in results[2]["error"]
+    assert Attendance.objects.count() == 1
+
+    invalido = client.post(
+        reverse("sync_chamadas"), "nao e json", content_type="application/json"
+    )
+    assert invalido.status_code == 400
+
+
+@pytest.mark.django_db
+def test_sync_chamadas_exige_presenca_booleana(client, turma_com_notas):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+    alunos = list(team.members.all())
+    items = _lote_de_chamadas(team, subject, alunos, [1, 2])
+    items[1]["records"][0]["present"] = "false"
+
+    response = client.post(
+        reverse("sync_chamadas"),
+        json.dumps({"items": items}),
+        content_type="application/json",
+    )
+
+    results = response.json()["results"]
+    assert results[0]["status"] == "created"
+    assert results[1]["error"] == "O campo present deve ser true ou false."
+    assert Attendance.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_sync_chamadas_usa_a_chamada_feita_no_site(client, turma_com_notas):
+    professor, team, subject = turma_com_notas
+    client.force_login(professor)
+    alunos = list(team.members.all())
+    client.post(reverse("fazer_chamada", args=[team.id, subject.id]), {})
+    hoje = Attendance.objects.get()
+
+    items = _lote_de_chamadas(team, subject, alunos, [1])
+    items[0]["date"] = hoje.date.isoformat()
+    response = client.post(
+        reverse("sync_chamadas"),
+        json.dumps({"items": items}),
+        content_type="application/json",
+    )
+
+    assert response.json()["results"][0]["attendance"] == hoje.pk
+    assert Attendance.objects.count() == 1
+    assert hoje.presence_map()[alunos[0].id] is True
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sync_chamadas_reenvio_simultaneo_aplica_uma_vez(turma_com_notas):
+    professor, team, subject = turma_com_notas
+    items = _lote_de_chamadas(team, subject, list(team.members.all()), [1, 2])
+    barrier = threading.Barrier(2)
+    results = []
+
+    def sync():
+        barrier.wait()
+        try:
+            results.append(sync_roll_calls(professor, items))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=sync) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # o segundo espera o primeiro e encontra as chaves já gravadas
+    assert sorted(r[0]["status"] for r in results) == ["created", "duplicate"]
+    assert Attendance.objects.count() == 2
+    assert AttendanceRecord.objects.count() == 50
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("por_turma", [2, 30])
+def test_enviar_avisos_grava_um_aviso_para_varias_turmas(
+    client, django_assert_num_queries, turma_com_notas, por_turma
+):
+    professor, team, subject = turma_com_notas
+    outra = Team.objects.create(name="TDS B", year=2025)
+    subject.team.add(outra)
+    alunos = CustomUser.objects.bulk_create(
+        CustomUser(
+            username=f"user_B{i:07d}",
+            registration_number=f"B{i:07d}",
+            first_name=f"Outro{i}",
+            role="aluno",
+        )
+        for i in range(por_turma)
+    )
+    # um aluno nas duas turmas vê o aviso uma vez só
+    em_duas = team.members.first()
+    outra.members.add(*alunos, em_duas)
+    client.force_login(professor)
+
+    # sessão, usuário, turmas do formulário, o aviso, as duas turmas e os
+    # alunos cujos contadores de avisos são apagados (mais o savepoint da
+    # transação), qualquer que seja o tamanho da turma
+    with django_assert_num_queries(8):
+        response = client.post(
+            reverse("create_notification"),
+            {
+                "title": "Prova",
+                "content": "Prova na sexta.",
+                "recipients": [team.id, outra.id],
+            },
+        )
+
+    assert response.status_code == 302
+    assert Notification.objects.count() == 0
+    aviso = Announcement.objects.get()
+    assert (aviso.title, aviso.content, aviso.author) == (
+        "Prova",
+        "Prova na sexta.",
+        professor,
+    )
+    assert list(Announcement.objects.unread_for(alunos[0])) == [aviso]
+    assert list(Announcement.objects.unread_for(em_duas)) == [aviso]
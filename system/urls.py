@@ -1,6 +1,6 @@
 from django.urls import path
 
-from system.views import general_views, student_views, teacher_views
+from system.views import export_views, general_views, student_views, teacher_views
 
 urlpatterns = [
     path("", general_views.home, name="home"),
@@ -18,6 +18,26 @@ urlpatterns = [
         teacher_views.turma_detail,
         name="turma_detail",
     ),
+    path(
+        "turmas/<int:team_id>/<int:subject_id>/analytics/",
+        teacher_views.turma_analytics,
+        name="turma_analytics",
+    ),
+    path(
+        "turmas/<int:team_id>/<int:subject_id>/analytics.json",
+        teacher_views.turma_analytics_json,
+        name="turma_analytics_json",
+    ),
+    path(
+        "turmas/<int:team_id>/<int:subject_id>/notas/",
+        teacher_views.gradebook,
+        name="gradebook",
+    ),
+    path(
+        "turmas/<int:team_id>/<int:subject_id>/notas/<int:bimonthly_id>/",
+        teacher_views.gradebook,
+        name="gradebook",
+    ),
     path(
         "turmas/<int:team_id>/add_grade/<int:subject_id>/<int:student_id>/",
         teacher_views.add_grade,
@@ -53,6 +73,7 @@ urlpatterns = [
         teacher_views.fazer_chamada,
         name="fazer_chamada",
     ),
+    path("api/chamadas/sync/", teacher_views.sync_chamadas, name="sync_chamadas"),
     path(
         "create_notification/", teacher_views.enviar_avisos, name="create_notification"
     ),
@@ -61,11 +82,32 @@ urlpatterns = [
         student_views.list_notifications,
         name="list_notifications",
     ),
+    path(
+        "list_notifications/stream/",
+        student_views.stream_notifications,
+        name="stream_notifications",
+    ),
     path(
         "mark_notifications_as_read/",
         general_views.mark_notifications_as_read,
         name="mark_notifications_as_read",
     ),
+    path(
+        "avisos/<int:announcement_id>/lido/",
+        general_views.mark_announcement_as_read,
+        name="mark_announcement_as_read",
+    ),
+    path("exportar/notas.csv", export_views.export_grades, name="export_grades"),
+    path(
+        "exportar/frequencia.csv",
+        export_views.export_attendance,
+        name="export_attendance",
+    ),
+    path(
+        "exportar/resultados.csv",
+        export_views.export_results,
+        name="export_results",
+    ),
     path(
         "acesso_negado/<str:mensagem>/",
         general_views.acesso_negado,
@@ -0,0 +1,74 @@
+import logging
+
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from system.decorators.decorators import staff_required
+from system.exports import (
+    ATTENDANCE_HEADER,
+    GRADE_HEADER,
+    RESULT_HEADER,
+    astream_csv,
+    attendance_rows,
+    grade_rows,
+    result_rows,
+    stream_csv,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _int_param(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def _export_filters(request):
+    return {
+        "year": _int_param(request, "year"),
+        "team_id": _int_param(request, "team"),
+        "subject_id": _int_param(request, "subject"),
+    }
+
+
+def _csv_response(request, filename, header, rows):
+    # no ASGI o iterador precisa ser assíncrono para sair aos poucos
+    stream = astream_csv if isinstance(request, ASGIRequest) else stream_csv
+    response = StreamingHttpResponse(
+        stream(header, rows), content_type="text/csv; charset=utf-8"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required(login_url="login")
+@staff_required
+def export_grades(request):
+    filters = _export_filters(request)
+    logger.info(f"Exportação de notas iniciada: {filters}")
+    return _csv_response(request, "notas.csv", GRADE_HEADER, grade_rows(**filters))
+
+
+@login_required(login_url="login")
+@staff_required
+def export_attendance(request):
+    filters = _export_filters(request)
+    logger.info(f"Exportação de frequência iniciada: {filters}")
+    return _csv_response(
+        request, "frequencia.csv", ATTENDANCE_HEADER, attendance_rows(**filters)
+    )
+
+
+@login_required(login_url="login")
+@staff_required
+def export_results(request):
+    filters = _export_filters(request)
+    filters["year"] = filters["year"] or timezone.now().year
+    logger.info(f"Exportação de resultados iniciada: {filters}")
+    return _csv_response(
+        request, "resultados.csv", RESULT_HEADER, result_rows(**filters)
+    )
@@ -7,12 +7,16 @@ from django.db.models import Q
 from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from notifications.models import Notification
+from django.views.decorators.http import require_POST
 
 from ..forms import LoginForm
-from ..models import CustomUser, Grade, Team
-from ..notifications import get_unread_notifications
-from ..utiuls.functions import is_aproved
+from ..grades import get_subjects_with_grades
+from ..models import Announcement, AnnouncementRead, CustomUser, Team
+from ..notifications import (
+    invalidate_unread_announcements,
+    mark_all_as_read,
+    unread_total,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +24,7 @@ logger = logging.getLogger(__name__)
 @login_required(login_url="login")
 def home(request):
     if request.user.role == "aluno":
-        unread_notifications_count = get_unread_notifications(request.user).count()
+        unread_notifications_count = unread_total(request.user)
 
         return render(
             request,
@@ -68,39 +72,15 @@ def search(request):
     student = get_object_or_404(CustomUser, id=request.user.id)
     team = Team.objects.filter(members=student).first()
     subjects = team.subjects.all() if team else []
-    grades = Grade.objects.filter(student=student)
 
     search_value = request.GET.get("q", "").strip()
 
     if search_value:
         subjects = subjects.filter(Q(name__icontains=search_value))
 
-    subjects_with_grades = []
-    max_bimonthlys = 0
-    for subject in subjects:
-        subject_grades = grades.filter(subject=subject, team=team).order_by(
-            "bimonthly__number"
-        )
-        grade_values = [g.average for g in subject_grades]
-        bimonthlys = [str(g.bimonthly) for g in subject_grades]
-        if len(bimonthlys) > max_bimonthlys:
-            max_bimonthlys = len(bimonthlys)
-
-        if grade_values:
-            aprovado = is_aproved(grade_values, bimonthlys)
-            media = sum(grade_values) / len(grade_values)
-        else:
-            aprovado = False
-            media = None
-
-        subjects_with_grades.append(
-            {
-                "subject": subject,
-                "grades": subject_grades,
-                "status": "Aprovado" if aprovado else "Reprovado",
-                "media": media,
-            }
-        )
+    subjects_with_grades, max_bimonthlys = (
+        get_subjects_with_grades(student, team, subjects) if team else ([], 0)
+    )
 
     return render(
         request,
@@ -108,9 +88,7 @@ def search(request):
         {
             "student": student,
             "team": team,
-            "subjects_with_grades": sorted(
-                subjects_with_grades, key=lambda x: x["subject"].name
-            ),
+            "subjects_with_grades": subjects_with_grades,
             "search_value": search_value,
             "bimonthlys": max_bimonthlys,
         },
@@ -126,5 +104,19 @@ def acesso_negado(request, mensagem: str):
 
 @login_required(login_url="login")
 def mark_notifications_as_read(request):
-    Notification.objects.mark_all_as_read(recipient=request.user)
+    mark_all_as_read(request.user)
+    return redirect(reverse("list_notifications"))
+
+
+@login_required(login_url="login")
+@require_POST
+def mark_announcement_as_read(request, announcement_id: int):
+    announcement = get_object_or_404(
+        Announcement.objects.for_user(request.user), id=announcement_id
+    )
+    _, created = AnnouncementRead.objects.get_or_create(
+        user=request.user, announcement=announcement
+    )
+    if created:
+        invalidate_unread_announcements([request.user.pk])
     return redirect(reverse("list_notifications"))
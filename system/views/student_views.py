@@ -1,23 +1,57 @@
+import asyncio
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
 from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q, Sum
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
 
 from system.decorators.decorators import aluno_only, aluno_required
-from system.models import AttendanceRecord, CustomUser, Grade, Subject, Team
-from system.utiuls.functions import is_aproved
-
-from ..notifications import get_unread_notifications
+from system.models import (
+    Announcement,
+    Attendance,
+    AttendanceSummary,
+    CustomUser,
+    Grade,
+    Subject,
+    Team,
+)
+
+from ..events import (
+    event_stream_settings,
+    format_event,
+    get_broker,
+    team_channel,
+    user_channel,
+)
+from ..grades import get_subjects_with_grades
+from ..notifications import attach_senders, get_unread_notifications, unread_total
 
 logger = logging.getLogger(__name__)
 
+# espera do navegador antes de reconectar quando a conexão fecha
+STREAM_RETRY_MS = 3000
+
+FOULS_PAGE_SIZE = 20
+NOTIFICATIONS_PAGE_SIZE = 20
+# Fonte de cada item na chave da página: no mesmo instante os avisos das
+# turmas vêm antes das notificações pessoais.
+NOTIFICATION_SOURCE, ANNOUNCEMENT_SOURCE = 0, 1
+
 
 @login_required(login_url="login")
 @aluno_only
 @aluno_required
 def my_grades(request, student_id: int):
-    student = get_object_or_404(CustomUser, id=student_id)
+    if request.user.id == student_id:
+        student = request.user
+    else:
+        student = get_object_or_404(CustomUser, id=student_id)
     team = Team.objects.filter(members=student).first()
 
     if not team:
@@ -32,42 +66,14 @@ def my_grades(request, student_id: int):
             },
         )
 
-    subjects = team.subjects.all()
-    subjects_with_grades = []
-    max_bimonthlys = 0
-
-    for subject in subjects:
-        subject_grades = Grade.objects.filter(
-            student=student, subject=subject, team=team
-        ).order_by("bimonthly__number")
-
-        grade_values = [g.average for g in subject_grades]
-        bimonthlys = [str(g.bimonthly) for g in subject_grades]
-        if len(bimonthlys) > max_bimonthlys:
-            max_bimonthlys = len(bimonthlys)
-
-        if grade_values:
-            aprovado = is_aproved(grade_values, bimonthlys)
-            media = sum(grade_values) / len(grade_values)
-        else:
-            aprovado = False
-            media = None
-
-        subjects_with_grades.append(
-            {
-                "subject": subject,
-                "grades": subject_grades,
-                "status": "Aprovado" if aprovado else "Reprovado",
-                "media": media,
-            }
-        )
+    subjects_with_grades, max_bimonthlys = get_subjects_with_grades(
+        student, team, team.subjects.all()
+    )
 
     context = {
         "student": student,
         "team": team,
-        "subjects_with_grades": sorted(
-            subjects_with_grades, key=lambda x: x["subject"].name
-        ),
+        "subjects_with_grades": subjects_with_grades,
         "bimonthlys": max_bimonthlys,
     }
 
@@ -110,55 +116,201 @@ def grade_details(request, student_id: int, subject_id: int):
 @aluno_only
 @aluno_required
 def my_fouls(request, student_id: int):
-    student = get_object_or_404(CustomUser, id=student_id)
+    if request.user.id == student_id:
+        student = request.user
+    else:
+        student = get_object_or_404(CustomUser, id=student_id)
     team = Team.objects.filter(members=student).first()
     subjects = team.subjects.all() if team else Subject.objects.none()
 
     subject_pk = request.GET.get("subject")
     month_str = request.GET.get("month")
 
-    fouls_qs = (
-        AttendanceRecord.objects.filter(student=student, present=False)
-        .select_related("attendance__subject")
-        .order_by("attendance__date")
-    )
+    # Totais vêm do resumo mensal; as chamadas só para a lista.
+    summaries = AttendanceSummary.objects.filter(student=student)
+    fouls_qs = Attendance.objects.absences_of(student)
 
     if subject_pk:
-        fouls_qs = fouls_qs.filter(attendance__subject_id=subject_pk)
+        summaries = summaries.filter(subject_id=subject_pk)
+        fouls_qs = fouls_qs.filter(subject_id=subject_pk)
 
     if month_str:
         try:
-            dt = datetime.strptime(month_str, "%Y-%m")
+            month = datetime.strptime(month_str, "%Y-%m").date()
+            summaries = summaries.filter(month=month)
             fouls_qs = fouls_qs.filter(
-                attendance__date__year=dt.year, attendance__date__month=dt.month
+                date__gte=month,
+                date__lt=(month + timedelta(days=31)).replace(day=1),
             )
         except ValueError:
             pass
 
+    # Paginação por chave (data, id): cada página começa depois da última
+    # chamada da anterior, sem OFFSET.
+    cursor = request.GET.get("after", "")
+    try:
+        after_date, after_id = cursor.split("_")
+        after_date = datetime.strptime(after_date, "%Y-%m-%d").date()
+        fouls_qs = fouls_qs.filter(
+            Q(date__gt=after_date) | Q(date=after_date, id__gt=int(after_id))
+        )
+    except ValueError:
+        cursor = ""
+
+    fouls = list(
+        fouls_qs.select_related("subject").order_by("date", "id")[: FOULS_PAGE_SIZE + 1]
+    )
+    next_cursor = ""
+    if len(fouls) > FOULS_PAGE_SIZE:
+        fouls = fouls[:FOULS_PAGE_SIZE]
+        last = fouls[-1]
+        next_cursor = f"{last.date.isoformat()}_{last.id}"
+
     context = {
         "student": student,
         "subjects": subjects,
-        "fouls": fouls_qs,
-        "fouls_count": fouls_qs.count(),
+        "fouls": fouls,
+        "fouls_count": summaries.aggregate(total=Sum("absences"))["total"] or 0,
         "selected_subject": subject_pk or "",
         "selected_month": month_str or "",
+        "cursor": cursor,
+        "next_cursor": next_cursor,
     }
 
     return render(request, "my_fouls.html", context)
 
 
+def _before(field, source, key):
+    """Itens de uma fonte que vêm depois da chave (data, fonte, id) na página."""
+    timestamp, key_source, key_id = key
+    condition = Q(**{f"{field}__lt": timestamp})
+    if source < key_source:
+        condition |= Q(**{field: timestamp})
+    elif source == key_source:
+        condition |= Q(**{field: timestamp, "id__lt": key_id})
+    return condition
+
+
 @login_required(login_url="login")
 @aluno_required
 def list_notifications(request):
     unread_notifications = get_unread_notifications(request.user)
-    first_notif = unread_notifications.first()
-    subject_teacher = None
-
-    if first_notif and getattr(first_notif, "actor", None):
-        subject_teacher = Subject.objects.filter(teachers=first_notif.actor).first()
+    unread_announcements = Announcement.objects.unread_for(request.user)
+
+    # Avisos das turmas e notificações pessoais numa paginação só, por chave
+    # (data de envio, fonte, id), dos mais novos para os mais antigos: cada
+    # página começa antes do último item da anterior.
+    cursor = request.GET.get("before", "")
+    try:
+        timestamp, source, item_id = cursor.rsplit("_", 2)
+        key = (datetime.fromisoformat(timestamp), int(source), int(item_id))
+        unread_notifications = unread_notifications.filter(
+            _before("timestamp", NOTIFICATION_SOURCE, key)
+        )
+        unread_announcements = unread_announcements.filter(
+            _before("created_at", ANNOUNCEMENT_SOURCE, key)
+        )
+    except ValueError:
+        cursor = ""
+
+    # uma página de cada fonte basta para montar a página das duas juntas
+    page = sorted(
+        [
+            ((n.timestamp, NOTIFICATION_SOURCE, n.id), n)
+            for n in unread_notifications.order_by("-timestamp", "-id")[
+                : NOTIFICATIONS_PAGE_SIZE + 1
+            ]
+        ]
+        + [
+            ((a.created_at, ANNOUNCEMENT_SOURCE, a.id), a)
+            for a in unread_announcements.select_related("author").order_by(
+                "-created_at", "-id"
+            )[: NOTIFICATIONS_PAGE_SIZE + 1]
+        ],
+        key=lambda item: item[0],
+        reverse=True,
+    )
+    next_cursor = ""
+    if len(page) > NOTIFICATIONS_PAGE_SIZE:
+        page = page[:NOTIFICATIONS_PAGE_SIZE]
+        timestamp, source, item_id = page[-1][0]
+        next_cursor = f"{timestamp.isoformat()}_{source}_{item_id}"
+
+    # os avisos das turmas ficam no alto da página
+    announcements = [
+        item for (_, source, _), item in page if source == ANNOUNCEMENT_SOURCE
+    ]
+    notifications = [
+        item for (_, source, _), item in page if source == NOTIFICATION_SOURCE
+    ]
+    attach_senders(notifications)
 
     return render(
         request,
         "list_notifications.html",
-        {"notifications": unread_notifications, "subject": subject_teacher},
+        {
+            "announcements": announcements,
+            "notifications": notifications,
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+        },
+    )
+
+
+async def stream_notifications(request):
+    """
+    Canal de eventos (text/event-stream) do aluno: avisos novos das suas
+    turmas e notificações pessoais chegam na hora, sem recarregar a página.
+    Só funciona servido por ASGI; no WSGI responde 204, que faz o
+    EventSource desistir e a página segue com o contador da última carga.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if user.role != "aluno":
+        return HttpResponseForbidden()
+
+    team_ids = await sync_to_async(list)(
+        Team.members.through.objects.filter(customuser_id=user.pk).values_list(
+            "team_id", flat=True
+        )
     )
+    channels = [team_channel(team_id) for team_id in team_ids]
+    channels.append(user_channel(user.pk))
+    # o navegador manda Last-Event-ID ao reconectar: os eventos do intervalo
+    # se perderam, então a primeira mensagem é o contador atualizado
+    reconnecting = "Last-Event-ID" in request.headers
+
+    async def events():
+        config = event_stream_settings()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config["MAX_AGE"]
+        async with get_broker().subscribe(channels) as queue:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            if reconnecting:
+                total = await sync_to_async(unread_total)(user)
+                yield format_event(
+                    {"type": "contagem", "data": {"total": total}}, _event_id()
+                )
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), min(config["KEEPALIVE"], remaining)
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield format_event(event, _event_id())
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx: não acumular a resposta antes de enviar
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _event_id() -> str:
+    return str(time.time_ns() // 1_000_000)
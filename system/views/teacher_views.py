@@ -1,25 +1,35 @@
 import datetime
+import json
 import logging
-from collections import defaultdict
+import math
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Case, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from notifications.signals import notify
+from django.views.decorators.http import require_POST
 
+from system.analytics import class_analytics
+from system.attendance import save_roll_calls
+from system.attendance_sync import AttendanceSyncError, sync_roll_calls
 from system.decorators.decorators import professor_required
 from system.forms import GradeForm, GradeUpdateForm, NotificationForm
+from system.grades import results_model
 from system.models import (
+    Announcement,
     Attendance,
-    AttendanceRecord,
     Bimonthly,
     CustomUser,
     Grade,
     Subject,
     Team,
 )
-from system.utiuls.functions import is_aproved
+from system.notifications import publish_announcement
 
 logger = logging.getLogger(__name__)
 
@@ -74,75 +84,53 @@ def turmas(request):
 def turma_detail(request, team_id: int, subject_id: int):
     user = request.user
 
-    turma = get_object_or_404(Team.objects.prefetch_related("members"), id=team_id)
+    turma = get_object_or_404(Team, id=team_id)
 
     if user.role == "professor" and not user.is_superuser:
         subject = get_object_or_404(turma.subjects.filter(teachers=user), id=subject_id)
     else:
         subject = get_object_or_404(turma.subjects, id=subject_id)
 
-    alunos = list(turma.members.all())
+    bimes_count = Bimonthly.objects.filter(year=turma.year).count()
 
-    grades_qs = Grade.objects.filter(team=turma, subject=subject).select_related(
-        "bimonthly", "student"
+    summary = results_model(turma.year).objects.filter(
+        student=OuterRef("pk"), team=turma, subject=subject, year=turma.year
     )
 
-    grades_by_student = defaultdict(list)
-    for g in grades_qs:
-        value = g.average
-        try:
-            value_float = float(value)
-        except Exception:
-            logger.debug(
-                "Nota com valor inválido ignorada",
-                extra={
-                    "grade_id": getattr(g, "id", None),
-                    "student_id": getattr(g.student, "id", None),
-                    "raw_value": value,
-                },
-            )
-            continue
-
-        grades_by_student[g.student_id].append(
-            {"value": value_float, "bimonthly": str(g.bimonthly)}
+    # Status calculado no banco para filtrar, ordenar e paginar sem
+    # carregar a turma inteira em memória.
+    if bimes_count < 4:
+        status = Value("analise")
+    else:
+        status = Case(
+            When(total_notas__lt=4, then=Value("analise")),
+            When(is_approved=True, then=Value("aprovado")),
+            default=Value("reprovado"),
         )
 
-    bimestres_all = list(Bimonthly.objects.all().order_by("number"))
-    bimes_count = len(bimestres_all)
-
-    alunos_status = []
-    for aluno in alunos:
-        aluno_grades_info = grades_by_student.get(aluno.id, [])
-        grades_values = [item["value"] for item in aluno_grades_info]
-        bimes_list = [item["bimonthly"] for item in aluno_grades_info]
-
-        aluno.total_notas = len(grades_values)
-        aluno.is_under_review = bimes_count == 4 and aluno.total_notas < 4
-
-        if grades_values:
-            try:
-                aprovado = is_aproved(grades_values, bimes_list)
-            except Exception as e:
-                logger.error(
-                    "Erro em is_aproved",
-                    exc_info=True,
-                    extra={
-                        "student_id": aluno.id,
-                        "grades_values": grades_values,
-                        "bimes": bimes_list,
-                    },
-                )
-                aprovado = False
-
-            aluno.status = "aprovado" if aprovado else "reprovado"
-        else:
-            aluno.status = "reprovado"
+    alunos = (
+        turma.members.annotate(
+            total_notas=Coalesce(Subquery(summary.values("grade_count")[:1]), 0),
+            media=Subquery(summary.values("average")[:1]),
+            is_approved=Coalesce(
+                Subquery(summary.values("is_approved")[:1]), Value(False)
+            ),
+        )
+        .annotate(status=status)
+        .order_by("first_name", "last_name", "id")
+    )
 
-        alunos_status.append(aluno)
+    status_filter = request.GET.get("status", "").strip()
+    if status_filter in ("aprovado", "reprovado", "analise"):
+        alunos = alunos.filter(status=status_filter)
 
-    alunos_status.sort(key=lambda x: x.first_name)
+    search_value = request.GET.get("q", "").strip()
+    if search_value:
+        alunos = alunos.filter(
+            Q(first_name__icontains=search_value) | Q(last_name__icontains=search_value)
+        )
 
-    paginator = Paginator(alunos_status, 10)
+    paginator = Paginator(alunos, 10)
     page_obj = paginator.get_page(request.GET.get("page"))
 
     return render(
@@ -153,10 +141,48 @@ def turma_detail(request, team_id: int, subject_id: int):
             "subject": subject,
             "bimonthlys": bimes_count,
             "page_obj": page_obj,
+            "search_value": search_value,
+            "status_filter": status_filter,
         },
     )
 
 
+def _class_analytics(request, team_id: int, subject_id: int):
+    user = request.user
+    turma = get_object_or_404(Team, id=team_id)
+
+    if user.role == "professor" and not user.is_superuser:
+        subject = get_object_or_404(turma.subjects.filter(teachers=user), id=subject_id)
+    else:
+        subject = get_object_or_404(turma.subjects, id=subject_id)
+
+    try:
+        year = int(request.GET.get("year", turma.year))
+    except ValueError:
+        year = turma.year
+
+    return turma, subject, class_analytics(turma, subject, year)
+
+
+@login_required(login_url="login")
+@professor_required
+def turma_analytics(request, team_id: int, subject_id: int):
+    turma, subject, stats = _class_analytics(request, team_id, subject_id)
+
+    return render(
+        request,
+        "turma_analytics.html",
+        {"turma": turma, "subject": subject, "stats": stats},
+    )
+
+
+@login_required(login_url="login")
+@professor_required
+def turma_analytics_json(request, team_id: int, subject_id: int):
+    _, _, stats = _class_analytics(request, team_id, subject_id)
+    return JsonResponse(stats)
+
+
 @login_required(login_url="login")
 @professor_required
 def add_grade(request, team_id: int, subject_id: int, student_id: int):
@@ -175,12 +201,10 @@ def add_grade(request, team_id: int, subject_id: int, student_id: int):
             grade.subject = subject
             grade.team = team
 
-            if Grade.objects.filter(
-                student=student,
-                subject=subject,
-                team=team,
-                bimonthly=grade.bimonthly,
-            ).exists():
+            existing = Grade.objects.by_bimonthly(
+                student, subject, team, grade.bimonthly.year
+            )
+            if grade.bimonthly_id in existing:
                 messages.error(request, "Já existe uma nota para este bimestre.")
                 return render(
                     request,
@@ -209,6 +233,134 @@ def add_grade(request, team_id: int, subject_id: int, student_id: int):
     )
 
 
+def _parse_grade_value(raw: str):
+    raw = (raw or "").strip().replace(",", ".")
+    if not raw:
+        return None
+    value = float(raw)
+    # "nan" e "inf" passam pelo float() e pelas comparações do Grade.clean
+    if not math.isfinite(value):
+        raise ValueError(raw)
+    return value
+
+
+@login_required(login_url="login")
+@professor_required
+def gradebook(request, team_id: int, subject_id: int, bimonthly_id: int = None):
+    user = request.user
+    team = get_object_or_404(Team, id=team_id)
+
+    if user.role == "professor" and not user.is_superuser:
+        subject = get_object_or_404(team.subjects.filter(teachers=user), id=subject_id)
+    else:
+        subject = get_object_or_404(team.subjects, id=subject_id)
+
+    bimestres = list(Bimonthly.objects.filter(year=team.year).order_by("number"))
+    if bimonthly_id is None:
+        if not bimestres:
+            messages.warning(request, "Nenhum bimestre cadastrado para este ano.")
+            return redirect("turma_detail", team_id=team_id, subject_id=subject_id)
+        bimonthly = bimestres[0]
+    else:
+        bimonthly = next((b for b in bimestres if b.id == bimonthly_id), None)
+        if bimonthly is None:
+            # bimestre de outro ano não serve para a turma
+            bimonthly = get_object_or_404(Bimonthly, id=bimonthly_id, year=team.year)
+
+    alunos = list(team.members.order_by("first_name", "last_name"))
+    grades = {
+        g.student_id: g
+        for g in Grade.objects.filter(team=team, subject=subject, bimonthly=bimonthly)
+    }
+
+    errors = {}
+    if request.method == "POST":
+        to_create, to_update = [], []
+        for aluno in alunos:
+            raw_activity = request.POST.get(f"activity_{aluno.id}")
+            raw_proof = request.POST.get(f"proof_{aluno.id}")
+            try:
+                activity = _parse_grade_value(raw_activity)
+                proof = _parse_grade_value(raw_proof)
+            except ValueError:
+                errors[aluno.id] = "Informe notas numéricas."
+                continue
+
+            if activity is None and proof is None:
+                continue
+            if activity is None or proof is None:
+                errors[aluno.id] = "Informe a nota da atividade e da avaliação."
+                continue
+
+            grade = grades.get(aluno.id)
+            if grade is None:
+                grade = Grade(
+                    student=aluno, subject=subject, team=team, bimonthly=bimonthly
+                )
+                to_create.append(grade)
+            elif grade.value_activity == activity and grade.value_proof == proof:
+                continue
+            else:
+                to_update.append(grade)
+
+            grade.value_activity = activity
+            grade.value_proof = proof
+            try:
+                grade.clean()
+            except ValidationError as e:
+                errors[aluno.id] = " ".join(e.messages)
+                continue
+            grade.compute_average()
+
+        if errors:
+            messages.error(request, "Corrija as notas destacadas. Nada foi salvo.")
+        else:
+            Grade.objects.bulk_save(
+                to_create, to_update, ["value_activity", "value_proof", "average"]
+            )
+
+            messages.success(
+                request, f"{len(to_create) + len(to_update)} notas salvas com sucesso!"
+            )
+            return redirect(
+                "gradebook",
+                team_id=team_id,
+                subject_id=subject_id,
+                bimonthly_id=bimonthly.id,
+            )
+
+    linhas = []
+    for aluno in alunos:
+        grade = grades.get(aluno.id)
+        if request.method == "POST":
+            activity = request.POST.get(f"activity_{aluno.id}", "")
+            proof = request.POST.get(f"proof_{aluno.id}", "")
+        else:
+            activity = grade.value_activity if grade else ""
+            proof = grade.value_proof if grade else ""
+
+        linhas.append(
+            {
+                "aluno": aluno,
+                "activity": activity,
+                "proof": proof,
+                "error": errors.get(aluno.id),
+            }
+        )
+
+    return render(
+        request,
+        "gradebook.html",
+        {
+            "team": team,
+            "subject": subject,
+            "bimonthly": bimonthly,
+            "bimestres": bimestres,
+            "linhas": linhas,
+        },
+    )
+
+
 @login_required(login_url="login")
 @professor_required
 def update_grade(
@@ -222,15 +374,9 @@ def update_grade(
         return redirect("turma_detail", team_id=team_id, subject_id=subject_id)
 
     if bimonthly_id is None:
-        bimestres = Bimonthly.objects.all().order_by("number")
+        grades = Grade.objects.by_bimonthly(student, subject, team, team.year)
         info = [
-            {
-                "bimonthly": b,
-                "grade": Grade.objects.filter(
-                    student=student, subject=subject, team=team, bimonthly=b
-                ).first(),
-            }
-            for b in bimestres
+            {"bimonthly": grade.bimonthly, "grade": grade} for grade in grades.values()
         ]
 
         return render(
@@ -286,19 +432,23 @@ def fazer_chamada(request, team_id: int, subject_id: int):
     today = datetime.date.today()
 
     if request.method == "POST":
-        attendance, _ = Attendance.objects.get_or_create(
-            teacher=request.user,
-            team=team,
-            subject=subject,
-            date=today,
-        )
+        with transaction.atomic():
+            attendance, _ = Attendance.objects.get_or_create(
+                teacher=request.user,
+                team=team,
+                subject=subject,
+                date=today,
+            )
 
-        for aluno in alunos:
-            presente = request.POST.get(f"presente_{aluno.id}") == "on"
-            AttendanceRecord.objects.update_or_create(
-                attendance=attendance,
-                student=aluno,
-                defaults={"present": presente},
+            # A turma inteira gravada de uma vez (upsert em lote ou bitmap),
+            # qualquer que seja o tamanho da turma.
+            save_roll_calls(
+                {
+                    attendance: {
+                        aluno_id: request.POST.get(f"presente_{aluno_id}") == "on"
+                        for aluno_id in alunos.values_list("id", flat=True)
+                    }
+                }
             )
 
         return redirect("turma_detail", team_id=team.id, subject_id=subject.id)
@@ -311,11 +461,7 @@ def fazer_chamada(request, team_id: int, subject_id: int):
         .first()
     )
 
-    registros = (
-        {r.student_id: r.present for r in attendance.records.all()}
-        if attendance
-        else {}
-    )
+    registros = attendance.presence_map() if attendance else {}
 
     if attendance:
         messages.info(request, "Chamada já realizada hoje. Você pode atualizar.")
@@ -332,6 +478,30 @@ def fazer_chamada(request, team_id: int, subject_id: int):
     )
 
 
+@login_required(login_url="login")
+@professor_required
+@require_POST
+def sync_chamadas(request):
+    """
+    Recebe em JSON as chamadas feitas offline nos tablets:
+    {"items": [{"key", "team", "subject", "date", "records": [{"student",
+    "present"}]}]} e devolve um resultado por item.
+    """
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "JSON inválido."}, status=400)
+
+    try:
+        results = sync_roll_calls(
+            request.user, payload.get("items") if isinstance(payload, dict) else None
+        )
+    except AttendanceSyncError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"results": results})
+
+
 @login_required(login_url="login")
 @professor_required
 def enviar_avisos(request):
@@ -340,18 +510,14 @@ def enviar_avisos(request):
         if form.is_valid():
             title = form.cleaned_data["title"]
             content = form.cleaned_data["content"]
-            recipient = form.cleaned_data["recipient"]
-
-            # Enviar notificação para cada membro da turma selecionada
-            members = recipient.members.all() if recipient else []
-            for member in members:
-                notify.send(
-                    sender=request.user,
-                    verb=title,
-                    description=content,
-                    recipient=member,
-                    actor=request.user,
+            # Um aviso só para todas as turmas; cada aluno vê o aviso pela
+            # turma e a leitura é marcada quando ele lê (fan-out na leitura).
+            with transaction.atomic():
+                announcement = Announcement.objects.create(
+                    author=request.user, title=title, content=content
                 )
+                announcement.teams.add(*form.cleaned_data["recipients"])
+                publish_announcement(announcement, form.cleaned_data["recipients"])
 
             messages.success(request, "Aviso enviado com sucesso!")
             return redirect("create_notification")
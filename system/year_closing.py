@@ -0,0 +1,119 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .attendance import attendance_rates
+from .grading import get_grading_policy
+from .models import FinalResult, GradeSummary, YearClosing
+
+SUMMARY_FIELDS = ("pk", "student_id", "subject_id", "team_id", "bimonthly_averages")
+
+
+def _evaluate_chunk(policy, rows, attendance):
+    """Roda nos processos do pool: avalia a política de um bloco inteiro."""
+    result = policy.evaluate(
+        policy.grades_matrix([row[4] for row in rows]), attendance=attendance
+    )
+    return rows, attendance, result
+
+
+def _pending_summaries(year: int):
+    """Resumos do ano que ainda não têm resultado final gravado."""
+    snapshots = FinalResult.objects.filter(
+        student_id=OuterRef("student_id"),
+        subject_id=OuterRef("subject_id"),
+        year=year,
+    )
+    # team_id = NULL nunca é verdadeiro: resumos sem turma casam à parte
+    saved = Exists(snapshots.filter(team_id=OuterRef("team_id"))) | (
+        Q(team__isnull=True) & Exists(snapshots.filter(team__isnull=True))
+    )
+    return (
+        GradeSummary.objects.filter(year=year)
+        .exclude(saved)
+        .order_by("pk")
+        .values_list(*SUMMARY_FIELDS)
+    )
+
+
+def _chunks(year: int, chunk_size: int):
+    """Blocos por paginação de chave (pk), para não segurar cursor aberto."""
+    pending = _pending_summaries(year)
+    last_pk = 0
+    while rows := list(pending.filter(pk__gt=last_pk)[:chunk_size]):
+        last_pk = rows[-1][0]
+        rates = attendance_rates(year, {row[1] for row in rows})
+        attendance = np.array(
+            [rates.get((row[1], row[2]), np.nan) for row in rows],
+            dtype=float,
+        )
+        yield rows, attendance
+
+
+def _save_chunk(year: int, rows, attendance, result) -> int:
+    snapshots = []
+    for i, (_, student_id, subject_id, team_id, averages) in enumerate(rows):
+        average = result.average[i]
+        snapshots.append(
+            FinalResult(
+                student_id=student_id,
+                subject_id=subject_id,
+                team_id=team_id,
+                year=year,
+                grade_count=len(averages),
+                average=None if np.isnan(average) else float(average),
+                bimonthly_averages=averages,
+                attendance=None if np.isnan(attendance[i]) else float(attendance[i]),
+                is_approved=bool(result.approved[i]),
+                is_under_review=bool(result.under_review[i]),
+            )
+        )
+    with transaction.atomic():
+        FinalResult.objects.bulk_create(snapshots, ignore_conflicts=True)
+    return len(snapshots)
+
+
+def close_year(year: int, workers=None, chunk_size: int = 2000, progress=None):
+    """
+    Encerra o ano letivo: avalia a situação final de todas as combinações
+    (aluno, matéria, turma) em blocos distribuídos num pool de processos e
+    grava os resultados imutáveis em lote.
+
+    Pode ser interrompido e executado de novo: cada bloco é gravado em sua
+    própria transação e os resumos já gravados ficam de fora na retomada.
+    """
+    closing, _ = YearClosing.objects.get_or_create(year=year)
+    if closing.finished_at:
+        return closing
+
+    policy = get_grading_policy()
+    # o mesmo número que o pool usa quando workers é None
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    saved = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for rows, attendance in _chunks(year, chunk_size):
+            in_flight.add(pool.submit(_evaluate_chunk, policy, rows, attendance))
+            if len(in_flight) < max_in_flight:
+                continue
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                saved += _save_chunk(year, *future.result())
+                if progress:
+                    progress(saved)
+
+        for future in in_flight:
+            saved += _save_chunk(year, *future.result())
+            if progress:
+                progress(saved)
+
+    closing.total_results = FinalResult.objects.filter(year=year).count()
+    closing.finished_at = timezone.now()
+    closing.save(update_fields=["total_results", "finished_at"])
+    return closing